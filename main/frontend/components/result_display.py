@@ -8,17 +8,12 @@ import streamlit as st
 from streamlit_timeline import timeline
 from utils.api import (
     get_checklist_result,
-    get_checklist_status,
     get_cost_breakdown_result,
-    get_cost_breakdown_status,
     get_essay_result,
-    get_essay_status,
     get_interview_prep_result,
-    get_interview_prep_status,
     get_program_analysis_result,
-    get_program_analysis_status,
     get_timeline_result,
-    get_timeline_status,
+    wait_for_session,
 )
 
 
@@ -28,19 +23,12 @@ def stream_paragraph(paragraph):
         time.sleep(0.05)
 
 
-def display_essay_results(session_id: str, timeout: int = 60, interval: float = 2.0):
-    """Poll with a spinner, then render results for an essay-writing session."""
+def display_essay_results(session_id: str, timeout: int = 60):
+    """Wait with a spinner, then render results for an essay-writing session."""
     st.subheader("📝 Essay Writing Results")
 
-    status = None
-    start = time.time()
     with st.spinner("Essay agents in action…"):
-        while time.time() - start < timeout:
-            resp = get_essay_status(session_id)
-            if resp["status"] in ("completed", "failed"):
-                status = resp
-                break
-            time.sleep(interval)
+        status = wait_for_session("essay", session_id, timeout)
 
     if status is None:
         st.error("⏱️ Timed out waiting for results. Try refreshing.")
@@ -51,6 +39,9 @@ def display_essay_results(session_id: str, timeout: int = 60, interval: float =
     if status["status"] == "failed":
         st.error(f"⚠️ Error: {status.get('error', 'Unknown error')}")
         return
+    if status["status"] == "cancelled":
+        st.warning("🚫 This session was cancelled.")
+        return
 
     # Completed: fetch results
     res = get_essay_result(session_id)
@@ -80,33 +71,24 @@ def display_essay_results(session_id: str, timeout: int = 60, interval: float =
         st.markdown("")
 
 
-def display_program_analysis_results(
-    session_id: str, timeout: int = 120, interval: float = 2.0
-):
-    """Poll with a spinner, then nicely render program-analysis outputs."""
+def display_program_analysis_results(session_id: str, timeout: int = 120):
+    """Wait with a spinner, then nicely render program-analysis outputs."""
     st.subheader("📊 Program Analysis Results")
 
-    # --- Polling loop ---
-    status = None
-    start = time.time()
-    warned = False  # To track if the 1-minute message has been shown
-    info_box = st.empty()  # Placeholder for conditional info message
-
-    with st.spinner("Waiting for the program-analysis agents to finish…"):
-        while time.time() - start < timeout:
-            elapsed = time.time() - start
+    # --- Wait for the agents, following their progress events ---
+    info_box = st.empty()  # Placeholder for per-step progress
 
-            if elapsed > 60 and not warned:
-                info_box.info(
-                    "⏳ Still working... Extracting a large amount of content. Please wait a bit longer."
-                )
-                warned = True
+    def show_progress(event):
+        task = event.get("task")
+        if task:
+            info_box.info(
+                f"⏳ Still working... {task['agent']} finished step {task['completed']}. Please wait a bit longer."
+            )
 
-            resp = get_program_analysis_status(session_id)
-            if resp["status"] in ("completed", "failed"):
-                status = resp
-                break
-            time.sleep(interval)
+    with st.spinner("Waiting for the program-analysis agents to finish…"):
+        status = wait_for_session(
+            "program-analysis", session_id, timeout, on_event=show_progress
+        )
 
     # Clear the info message if shown
     info_box.empty()
@@ -120,6 +102,9 @@ def display_program_analysis_results(
     if status["status"] == "failed":
         st.error(f"⚠️ Error: {status.get('error', 'Unknown error')}")
         return
+    if status["status"] == "cancelled":
+        st.warning("🚫 This session was cancelled.")
+        return
 
     # --- Fetch results ---
     res = get_program_analysis_result(session_id)
@@ -133,22 +118,13 @@ def display_program_analysis_results(
         st.error(f"⚠️ Invalid comparison report: {report}")
 
 
-def display_cost_breakdown_results(
-    session_id: str, timeout: int = 60, interval: float = 2.0
-):
-    """Poll with a spinner, then nicely render program-analysis outputs."""
+def display_cost_breakdown_results(session_id: str, timeout: int = 60):
+    """Wait with a spinner, then nicely render program-analysis outputs."""
     st.subheader("📊 Cost Breakdown  Results")
 
     if "breakdown" not in st.session_state:
-        status = None
-        start = time.time()
         with st.spinner("Waiting for the cost breakdown agents to finish…"):
-            while time.time() - start < timeout:
-                resp = get_cost_breakdown_status(session_id)
-                if resp["status"] in ("completed", "failed"):
-                    status = resp
-                    break
-                time.sleep(interval)
+            status = wait_for_session("cost-breakdown", session_id, timeout)
 
         if status is None:
             st.error("⏱️ Timed out waiting for results. Try refreshing.")
@@ -159,6 +135,9 @@ def display_cost_breakdown_results(
         if status["status"] == "failed":
             st.error(f"⚠️ Error: {status.get('error', 'Unknown error')}")
             return
+        if status["status"] == "cancelled":
+            st.warning("🚫 This session was cancelled.")
+            return
 
         st.session_state.breakdown = get_cost_breakdown_result(session_id)
     # --- Fetch results ---
@@ -200,21 +179,12 @@ def display_cost_breakdown_results(
             st.info(expenses[selected_fee]["description"])
 
 
-def display_timeline_planner_results(
-    session_id: str, timeout: int = 60, interval: float = 2.0
-):
-    """Poll with a spinner, then nicely render program-analysis outputs."""
+def display_timeline_planner_results(session_id: str, timeout: int = 60):
+    """Wait with a spinner, then nicely render program-analysis outputs."""
     st.subheader("📊 Timeline Planner Results")
 
-    status = None
-    start = time.time()
     with st.spinner("Waiting for the program-analysis agents to finish…"):
-        while time.time() - start < timeout:
-            resp = get_timeline_status(session_id)
-            if resp["status"] in ("completed", "failed"):
-                status = resp
-                break
-            time.sleep(interval)
+        status = wait_for_session("timeline", session_id, timeout)
 
     if status is None:
         st.error("⏱️ Timed out waiting for results. Try refreshing.")
@@ -225,6 +195,9 @@ def display_timeline_planner_results(
     if status["status"] == "failed":
         st.error(f"⚠️ Error: {status.get('error', 'Unknown error')}")
         return
+    if status["status"] == "cancelled":
+        st.warning("🚫 This session was cancelled.")
+        return
 
     response = get_timeline_result(session_id)
 
@@ -322,21 +295,12 @@ def display_timeline_planner_results(
     st.markdown("\n".join(suggestion_lines))
 
 
-def display_checklist_results(
-    session_id: str, timeout: int = 60, interval: float = 2.0
-):
-    """Poll with a spinner, then render results for the dynamic application checklist."""
+def display_checklist_results(session_id: str, timeout: int = 60):
+    """Wait with a spinner, then render results for the dynamic application checklist."""
     st.subheader("📋 Application Checklist Results")
 
-    status = None
-    start = time.time()
     with st.spinner("Waiting for the checklist agents to finish…"):
-        while time.time() - start < timeout:
-            resp = get_checklist_status(session_id)
-            if resp["status"] in ("completed", "failed"):
-                status = resp
-                break
-            time.sleep(interval)
+        status = wait_for_session("checklist", session_id, timeout)
 
     if status is None:
         st.error("⏱️ Timed out waiting for results. Try refreshing.")
@@ -347,6 +311,9 @@ def display_checklist_results(
     if status["status"] == "failed":
         st.error(f"⚠️ Error: {status.get('error', 'Unknown error')}")
         return
+    if status["status"] == "cancelled":
+        st.warning("🚫 This session was cancelled.")
+        return
 
     # Completed: fetch results
     response = get_checklist_result(session_id)
@@ -371,21 +338,12 @@ def display_checklist_results(
         st.markdown("---")
 
 
-def display_interview_prep_results(
-    session_id: str, timeout: int = 60, interval: float = 2.0
-):
-    """Poll with a spinner, then render results for the interview prep Q&A."""
+def display_interview_prep_results(session_id: str, timeout: int = 60):
+    """Wait with a spinner, then render results for the interview prep Q&A."""
     st.subheader(" Interview Q&A Results")
 
-    status = None
-    start = time.time()
     with st.spinner("Waiting for the interview prep agents to finish…"):
-        while time.time() - start < timeout:
-            resp = get_interview_prep_status(session_id)
-            if resp["status"] in ("completed", "failed"):
-                status = resp
-                break
-            time.sleep(interval)
+        status = wait_for_session("interview-prep", session_id, timeout)
 
     if status is None:
         st.error("⏱️ Timed out waiting for results. Try refreshing.")
@@ -396,6 +354,9 @@ def display_interview_prep_results(
     if status["status"] == "failed":
         st.error(f"⚠️ Error: {status.get('error', 'Unknown error')}")
         return
+    if status["status"] == "cancelled":
+        st.warning("🚫 This session was cancelled.")
+        return
 
     # Completed: fetch results
     response = get_interview_prep_result(session_id)
@@ -20,7 +20,7 @@ else:
         else:
             with st.spinner("Fetching Reddit posts and summarizing…"):
                 try:
-                    result = sentiment_analysis([review.strip()])
+                    result = sentiment_analysis(user_id, [review.strip()])
                 except Exception as e:
                     st.error(f"Failed: {e}")
                 else:
@@ -1,7 +1,44 @@
+import json
+import time
+from typing import Callable, Optional
+
 import httpx
 from utils.constants import API_BASE_URL
 
 
+def wait_for_session(
+    flow: str,
+    session_id: str,
+    timeout: float = 60.0,
+    on_event: Optional[Callable[[dict], None]] = None,
+) -> Optional[dict]:
+    """
+    GET /sessions/{flow}/{session_id}/events
+    Follow the session's event stream until it completes, fails or is
+    cancelled, calling on_event for every event. Returns the final
+    {"session_id", "status", ...} event, or None if the timeout runs out first.
+    """
+    deadline = time.monotonic() + timeout
+    url = f"{API_BASE_URL}/sessions/{flow}/{session_id}/events"
+    try:
+        timeouts = httpx.Timeout(10.0, read=timeout)
+        with httpx.stream("GET", url, timeout=timeouts) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if time.monotonic() > deadline:
+                    return None
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:") :])
+                if on_event:
+                    on_event(event)
+                if event["status"] in ("completed", "failed", "cancelled"):
+                    return event
+    except httpx.ReadTimeout:
+        return None
+    return None
+
+
 def create_essay_session(
     user_id: str, essay_text: str, target_university: str, style_guidelines: str
 ) -> str:
@@ -77,21 +114,45 @@ def get_program_analysis_result(session_id: str) -> dict:
     return resp.json()
 
 
-def sentiment_analysis(reviews: list[str]) -> dict:
+def create_sentiment_session(user_id: str, reviews: list[str]) -> str:
     """
-    POST /sentiment-analysis
-    Input: {"reviews": [...]}
-    Output: {"reddit_posts": [...], "summary": "..."}
+    POST /sessions/sentiment
+    Returns the new session_id.
+    """
+    payload = {"user_id": user_id, "reviews": reviews}
+    resp = httpx.post(f"{API_BASE_URL}/sessions/sentiment", json=payload)
+    resp.raise_for_status()
+    return resp.json()["session_id"]
+
+
+def get_sentiment_result(session_id: str) -> dict:
+    """
+    GET /sessions/sentiment/{session_id}/result
+    Returns {"reddit_posts": [...], "summary": "..."}.
     """
-    resp = httpx.post(
-        f"{API_BASE_URL}/sentiment-analysis",
-        json={"reviews": reviews},
-        timeout=60.0,
-    )
+    resp = httpx.get(f"{API_BASE_URL}/sessions/sentiment/{session_id}/result")
     resp.raise_for_status()
     return resp.json()
 
 
+def sentiment_analysis(
+    user_id: str, reviews: list[str], timeout: float = 120.0
+) -> dict:
+    """
+    Run a sentiment session and wait for it.
+    Input: the user's id and the reviews
+    Output: {"reddit_posts": [...], "summary": "..."}
+    Raises RuntimeError if the session fails or times out.
+    """
+    session_id = create_sentiment_session(user_id, reviews)
+    final = wait_for_session("sentiment", session_id, timeout)
+    if final is None:
+        raise RuntimeError("Timed out waiting for the analysis")
+    if final["status"] != "completed":
+        raise RuntimeError(final.get("error", f"Session {final['status']}"))
+    return get_sentiment_result(session_id)
+
+
 def create_cost_breakdown_session(
     user_id: str,
     university: str,
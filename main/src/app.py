@@ -1,15 +1,29 @@
-from typing import Any, Dict, List
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
 
 import db
-from config.models import RedditPost, SentimentRequest, SentimentResponse
-from fastapi import BackgroundTasks, FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from generate_run import (
-    generate_application_planning_background,
-    generate_college_exploration_background,
+import events
+import idempotency
+import jobs
+import metrics
+import recovery
+import retention
+import sentiment
+from db import aio
+from config.models import (
+    BatchStatusRequest,
+    RedditPost,
+    SentimentRequest,
+    SentimentResponse,
 )
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from generate_run import run_session
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 from pydantic import BaseModel
-from utils.sentiment_utils import sentiment_reddit_summary
 
 app = FastAPI(
     title="AI College Exploration (AICE) API",
@@ -26,9 +40,334 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# once per process: startup may run again (e.g. one TestClient per test), and
+# the registry refuses a second collector for the same metric names
+REGISTRY.register(metrics.StorageCollector(db.count_sessions, jobs.counts))
+
+# Idle event streams and long-polls re-read the stored status this often, to
+# catch a transition whose event they missed; other processes' events
+# arrive through the event log (see events.share)
+EVENTS_KEEPALIVE_SECONDS = 15
+# Longest a status request may be held open with ?wait=
+MAX_STATUS_WAIT_SECONDS = 60
+# Most sessions one /sessions/status:batch request may ask about
+MAX_BATCH_STATUS = 200
+
+
+@app.on_event("startup")
+def init_datastore():
+    """Create/migrate the datastore once so request paths stay read-only."""
+    db.init_db()
+    events.share(follow=True)
+    retention.start_sweeper()
+    if jobs.WORKER_MODE == "inline":
+        recovery.recover()
+        recovery.start_monitor()
+        jobs.start_workers(run_session)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Prometheus metrics: this process's, plus session and job counts read from
+    storage. External workers serve theirs on worker.py --metrics-port.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _submission(
+    flow: str, payload: Dict[str, Any], idempotency_key: Optional[str]
+) -> idempotency.Submission:
+    """idempotency.submission, with its errors as HTTP 422 / 409."""
+    try:
+        return idempotency.submission(flow, payload, idempotency_key)
+    except idempotency.KeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except idempotency.InFlight as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+def _enqueue(
+    flow: str, session_id: str, session_data: Dict[str, Any], user_id: str
+) -> None:
+    """Queue a new session's crew run; drop the session and 429 if full."""
+    try:
+        jobs.submit(flow, session_id, session_data, user_id)
+    except jobs.QueueFull as e:
+        db.delete_sessions([(flow, session_id)])
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@app.get("/users/{user_id}/sessions")
+async def list_user_sessions(
+    user_id: str,
+    flow: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+):
+    """
+    List a user's sessions across all flows, newest first.
+    Query params:
+      - flow: one of essay, program-analysis, checklist, cost-breakdown,
+        timeline, interview-prep, sentiment
+      - status: pending | in_progress | completed | failed | cancelled
+      - cursor: next_cursor from the previous page
+      - limit: page size (1–100)
+    Returns:
+      - sessions: [{session_id, flow, status, created_at}, …]
+      - next_cursor: str | null
+    """
+    if not 1 <= limit <= 100:
+        raise HTTPException(status_code=400, detail="limit must be 1–100")
+    try:
+        sessions, next_cursor = await aio.list_user_sessions(
+            user_id, flow=flow, status=status, cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+def _status_event(session_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    event = {"session_id": session_id, "status": record.get("status")}
+    if event["status"] == "failed":
+        event["error"] = record.get("error", "Unknown error")
+    return event
+
+
+async def _session_event_stream(
+    flow: str, session_id: str, record: Dict[str, Any], queue: asyncio.Queue
+):
+    try:
+        event = _status_event(session_id, record)
+        yield events.format_sse(event)
+        while event["status"] not in events.TERMINAL_STATUSES:
+            try:
+                event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                records = await aio.get_sessions([(flow, session_id)])
+                record = records.get((flow, session_id))
+                if record is None:
+                    return
+                if record.get("status") == event["status"]:
+                    yield ": keepalive\n\n"
+                    continue
+                event = _status_event(session_id, record)
+            yield events.format_sse(event)
+    finally:
+        events.unsubscribe(session_id, queue)
+
+
+async def _queue_info(
+    flow: str, session_id: str, record: Dict[str, Any]
+) -> Dict[str, int]:
+    """Queue position and depth for a pending session, else {}."""
+    if record.get("status") != "pending":
+        return {}
+    return await aio.run(jobs.position, flow, session_id)
+
+
+async def _long_poll(
+    flow: str,
+    session_id: str,
+    record: Dict[str, Any],
+    wait: float,
+    since: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Hold a status request until the session's status differs from ``since``
+    or ``wait`` seconds pass, then return the latest session record. Waits
+    on the event bus, so no thread is tied up meanwhile.
+    """
+    wait = min(max(wait, 0.0), MAX_STATUS_WAIT_SECONDS)
+    if since is None or not wait or record.get("status") != since:
+        return record
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    queue = events.subscribe(session_id)
+    try:
+        while True:
+            # re-read on every wake-up: catches a change made before we
+            # subscribed, or whose event was missed
+            records = await aio.get_sessions([(flow, session_id)])
+            record = records.get((flow, session_id), record)
+            remaining = deadline - loop.time()
+            if record.get("status") != since or remaining <= 0:
+                return record
+            try:
+                await asyncio.wait_for(
+                    queue.get(), min(remaining, EVENTS_KEEPALIVE_SECONDS)
+                )
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        events.unsubscribe(session_id, queue)
+
+
+@app.get("/sessions/{flow}/{session_id}/events")
+async def session_events(flow: str, session_id: str):
+    """
+    Stream a session's progress as server-sent events, ending once it
+    completes, fails or is cancelled. The first event is the current status.
+    Each event's data is JSON:
+      - session_id: str
+      - status: pending | in_progress | completed | failed | cancelled
+      - task: {agent, completed} on per-task progress events
+      - error: str when failed
+    """
+    if flow not in db.FLOWS:
+        raise HTTPException(status_code=404, detail=f"Unknown flow: {flow}")
+    # subscribe before reading so no transition slips in between
+    queue = events.subscribe(session_id)
+    records = await aio.get_sessions([(flow, session_id)])
+    if (flow, session_id) not in records:
+        events.unsubscribe(session_id, queue)
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return StreamingResponse(
+        _session_event_stream(flow, session_id, records[(flow, session_id)], queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/sessions/status:batch")
+async def get_status_batch(payload: BatchStatusRequest):
+    """
+    Statuses of many sessions, across flows, from one storage read.
+    Expects JSON with:
+      - sessions: [{flow, session_id}, …] (at most 200)
+    Returns:
+      - statuses: [{flow, session_id, status, error?}, …] in request order;
+        status is "not_found" for unknown sessions
+    """
+    if len(payload.sessions) > MAX_BATCH_STATUS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_STATUS} sessions per batch"
+        )
+    pairs = [(ref.flow, ref.session_id) for ref in payload.sessions]
+    unknown = sorted({flow for flow, _ in pairs if flow not in db.FLOWS})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown flow: {unknown[0]}")
+
+    records = await aio.get_sessions(pairs)
+    statuses = []
+    for flow, session_id in pairs:
+        entry = {"flow": flow, "session_id": session_id, "status": "not_found"}
+        record = records.get((flow, session_id))
+        if record is not None:
+            entry["status"] = record.get("status")
+            if entry["status"] == "failed":
+                entry["error"] = record.get("error", "Unknown error")
+        statuses.append(entry)
+    return {"statuses": statuses}
+
+
+# flow → the body its /result endpoint returns, built from
+# {result collection: record} as returned by db.get_session_with_results
+RESULT_VIEWS = {
+    "essay": lambda r: {
+        "outline": r["essay_results"]["outline"],
+        "refined_draft": r["essay_results"]["refined_draft"],
+    },
+    "program-analysis": lambda r: {
+        "raw_admissions_data": r.get("raw_admissions_data"),
+        "structured_admissions_data": r.get("structured_admissions_data"),
+        "program_comparison_report": r.get("program_comparison_reports"),
+    },
+    "checklist": lambda r: {
+        "dynamic_checklist": r["dynamic_checklists"].get("checklist"),
+    },
+    "cost-breakdown": lambda r: r["cost_breakdown_results"].get("breakdown"),
+    "timeline": lambda r: {
+        "deadlines": r["timeline_results"].get("deadlines"),
+        "timeline": r["timeline_results"].get("timeline"),
+    },
+    "interview-prep": lambda r: r["interview_prep_results"].get("Interview_QA"),
+    "sentiment": lambda r: {
+        "reddit_posts": r["sentiment_results"]["reddit_posts"],
+        "summary": r["sentiment_results"]["summary"],
+    },
+}
+
+
+@app.get("/sessions/{flow}/{session_id}")
+async def get_session(
+    flow: str,
+    session_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Status of any session, with its result inline once completed, read in
+    one storage access. Same body as the flow's /status endpoint, including
+    queue_position and queue_depth while pending, plus:
+      - flow: str
+      - result: the flow's /result body (only when completed)
+    Sends an ETag; a request with a matching If-None-Match gets 304. Tags
+    compare weakly, so W/"…" matches too.
+    """
+    if flow not in db.FLOWS:
+        raise HTTPException(status_code=404, detail=f"Unknown flow: {flow}")
+    try:
+        sess, results = await aio.get_session_with_results(flow, session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+    body = {"session_id": session_id, "flow": flow, "status": sess["status"]}
+    if sess["status"] == "failed":
+        body["error"] = sess.get("error", "Unknown error")
+    elif sess["status"] == "completed":
+        body["result"] = RESULT_VIEWS[flow](results)
+    body.update(await _queue_info(flow, session_id, sess))
+
+    encoded = json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+    etag = f'"{hashlib.sha1(encoded).hexdigest()}"'
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    ):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return body
+
+
+@app.delete("/sessions/{flow}/{session_id}")
+@app.post("/sessions/{flow}/{session_id}/cancel")
+def cancel_session(flow: str, session_id: str):
+    """
+    Cancel a pending or running session. A queued crew never starts; a
+    running one gives its worker back at once and stops at its next agent
+    step or tool call, abandoning any outbound request in flight.
+    Returns:
+      - session_id: str
+      - status: "cancelled"
+    409 if the session has already finished.
+    """
+    if flow not in db.FLOWS:
+        raise HTTPException(status_code=404, detail=f"Unknown flow: {flow}")
+    # mark it cancelled first, only if it has not finished: from then on the
+    # worker's own status and result writes fail and stop the run
+    try:
+        db.set_session_status(db.FLOWS[flow][0], session_id, "cancelled")
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    except db.SessionClosed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    jobs.cancel(session_id)
+    events.publish(session_id, "cancelled")
+    return {"session_id": session_id, "status": "cancelled"}
+
 
 @app.post("/sessions/essay")
-def start_essay_session(payload: Dict[str, Any], background_tasks: BackgroundTasks):
+def start_essay_session(
+    payload: Dict[str, Any], idempotency_key: Optional[str] = Header(None)
+):
     """
     Start an essay-writing session.
     Expects JSON with:
@@ -38,6 +377,8 @@ def start_essay_session(payload: Dict[str, Any], background_tasks: BackgroundTas
       - style_guidelines: str
     Returns:
       - session_id: str
+    An Idempotency-Key header, or the same request repeated soon after,
+    gets the first request's session_id back instead of a new crew.
     """
     user_id = payload.get("user_id")
     essay_text = payload.get("essay_text")
@@ -47,50 +388,64 @@ def start_essay_session(payload: Dict[str, Any], background_tasks: BackgroundTas
     if not all([user_id, essay_text, target_university, style_guidelines]):
         raise HTTPException(status_code=400, detail="Missing required fields")
 
-    # Create DB session
-    session_id = db.create_essay_session(user_id, essay_text, target_university)
-
-    # Kick off background flow
-    background_tasks.add_task(
-        generate_college_exploration_background,
-        session_id,
-        {
-            "flow_type": "essay",
-            "essay_text": essay_text,
-            "target_university": target_university,
-            "style_guidelines": style_guidelines,
-        },
-    )
+    with _submission("essay", payload, idempotency_key) as submission:
+        if submission.duplicate_of:
+            return {"session_id": submission.duplicate_of}
+
+        # Create DB session
+        session_id = db.create_essay_session(user_id, essay_text, target_university)
+
+        # Queue the crew run
+        _enqueue(
+            "essay",
+            session_id,
+            {
+                "flow_type": "essay",
+                "essay_text": essay_text,
+                "target_university": target_university,
+                "style_guidelines": style_guidelines,
+            },
+            user_id,
+        )
+        submission.session_id = session_id
 
     # return immediately
     return {"session_id": session_id}
 
 
 @app.get("/sessions/essay/{session_id}/status")
-def get_essay_status(session_id: str):
+async def get_essay_status(
+    session_id: str, wait: float = 0, since: Optional[str] = None
+):
     """
     Get the current status of an essay-writing session.
-    Returns status = one of ["pending","in_progress","completed","failed"].
-    """
-    sess = db.get_essay_session(session_id)
+    Returns status = one of ["pending","in_progress","completed","failed",
+    "cancelled"].
+    Long-poll with ?wait=<seconds>&since=<status>: held until the status
+    differs from `since` or `wait` runs out. While queued, the response
+    also has queue_position and queue_depth.
+    """
+    sess = await aio.get_essay_session(session_id)
+    sess = await _long_poll("essay", session_id, sess, wait, since)
     resp = {
         "session_id": session_id,
         "status": sess["status"],
     }
     if sess["status"] == "failed":
         resp["error"] = sess.get("error", "Unknown error")
+    resp.update(await _queue_info("essay", session_id, sess))
     return resp
 
 
 @app.get("/sessions/essay/{session_id}/result")
-def get_essay_result(session_id: str):
+async def get_essay_result(session_id: str):
     """
     Fetch outline + refined draft after completion.
     Returns:
       - outline: Any
       - refined_draft: str
     """
-    results = db.get_essay_results(session_id)
+    results = await aio.get_essay_results(session_id)
     return {
         "outline": results["outline"],
         "refined_draft": results["refined_draft"],
@@ -98,7 +453,9 @@ def get_essay_result(session_id: str):
 
 
 @app.post("/sessions/program-analysis")
-def start_program_analysis(payload: Dict[str, Any], background_tasks: BackgroundTasks):
+def start_program_analysis(
+    payload: Dict[str, Any], idempotency_key: Optional[str] = Header(None)
+):
     """
     Start a program-analysis session.
     Expects JSON with:
@@ -107,6 +464,8 @@ def start_program_analysis(payload: Dict[str, Any], background_tasks: Background
       - comparison_criteria: List[str]
     Returns:
       - session_id: str
+    An Idempotency-Key header, or the same request repeated soon after,
+    gets the first request's session_id back instead of a new crew.
     """
     user_id = payload.get("user_id")
     university_list = payload.get("university_list")
@@ -119,40 +478,56 @@ def start_program_analysis(payload: Dict[str, Any], background_tasks: Background
     ):
         raise HTTPException(status_code=400, detail="Missing or invalid fields")
 
-    session_id = db.create_program_analysis_session(
-        user_id, university_list, comparison_criteria
-    )
+    with _submission("program-analysis", payload, idempotency_key) as submission:
+        if submission.duplicate_of:
+            return {"session_id": submission.duplicate_of}
 
-    background_tasks.add_task(
-        generate_college_exploration_background,
-        session_id,
-        {
-            "flow_type": "program_analysis",
-            "university_list": university_list,
-            "comparison_criteria": comparison_criteria,
-        },
-    )
+        session_id = db.create_program_analysis_session(
+            user_id, university_list, comparison_criteria
+        )
+
+        _enqueue(
+            "program-analysis",
+            session_id,
+            {
+                "flow_type": "program_analysis",
+                "university_list": university_list,
+                "comparison_criteria": comparison_criteria,
+            },
+            user_id,
+        )
+        submission.session_id = session_id
 
     return {"session_id": session_id}
 
 
 @app.get("/sessions/program-analysis/{session_id}/status")
-def get_program_analysis_status(session_id: str):
+async def get_program_analysis_status(
+    session_id: str, wait: float = 0, since: Optional[str] = None
+):
     """
     Get the current status of a program-analysis session.
+    Long-poll with ?wait=<seconds>&since=<status>: held until the status
+    differs from `since` or `wait` runs out. While queued, the response
+    also has queue_position and queue_depth.
     """
-    sess = db.get_program_analysis_session(session_id)
-    return {"session_id": session_id, "status": sess["status"]}
+    sess = await aio.get_program_analysis_session(session_id)
+    sess = await _long_poll("program-analysis", session_id, sess, wait, since)
+    return {
+        "session_id": session_id,
+        "status": sess["status"],
+        **(await _queue_info("program-analysis", session_id, sess)),
+    }
 
 
 @app.get("/sessions/program-analysis/{session_id}/result")
-def get_program_analysis_result(session_id: str):
+async def get_program_analysis_result(session_id: str):
     """
     Fetch raw data, structured data, and comparison report after completion.
     """
-    raw = db.get_raw_admissions_data(session_id)
-    structured = db.get_structured_admissions_data(session_id)
-    report = db.get_program_comparison_report(session_id)
+    raw = await aio.get_raw_admissions_data(session_id)
+    structured = await aio.get_structured_admissions_data(session_id)
+    report = await aio.get_program_comparison_report(session_id)
     return {
         "raw_admissions_data": raw,
         "structured_admissions_data": structured,
@@ -164,7 +539,9 @@ def get_program_analysis_result(session_id: str):
 
 
 @app.post("/sessions/checklist")
-def start_dynamic_checklist(payload: Dict[str, Any], background_tasks: BackgroundTasks):
+def start_dynamic_checklist(
+    payload: Dict[str, Any], idempotency_key: Optional[str] = Header(None)
+):
     """
     Start a Dynamic Application Checklist session.
     Expects JSON with:
@@ -174,6 +551,8 @@ def start_dynamic_checklist(payload: Dict[str, Any], background_tasks: Backgroun
       - university_list: List[str]
     Returns:
       - session_id: str
+    An Idempotency-Key header, or the same request repeated soon after,
+    gets the first request's session_id back instead of a new crew.
     """
     user_id = payload.get("user_id")
     nationality = payload.get("nationality")
@@ -188,39 +567,55 @@ def start_dynamic_checklist(payload: Dict[str, Any], background_tasks: Backgroun
     ):
         raise HTTPException(status_code=400, detail="Missing or invalid fields")
 
-    session_id = db.create_checklist_session(
-        user_id, nationality, program_level, university_list
-    )
+    with _submission("checklist", payload, idempotency_key) as submission:
+        if submission.duplicate_of:
+            return {"session_id": submission.duplicate_of}
 
-    background_tasks.add_task(
-        generate_application_planning_background,
-        session_id,
-        {
-            "flow_type": "dynamic_checklist",
-            "nationality": nationality,
-            "program_level": program_level,
-            "university_list": university_list,
-        },
-    )
+        session_id = db.create_checklist_session(
+            user_id, nationality, program_level, university_list
+        )
+
+        _enqueue(
+            "checklist",
+            session_id,
+            {
+                "flow_type": "dynamic_checklist",
+                "nationality": nationality,
+                "program_level": program_level,
+                "university_list": university_list,
+            },
+            user_id,
+        )
+        submission.session_id = session_id
 
     return {"session_id": session_id}
 
 
 @app.get("/sessions/checklist/{session_id}/status")
-def get_dynamic_checklist_status(session_id: str):
+async def get_dynamic_checklist_status(
+    session_id: str, wait: float = 0, since: Optional[str] = None
+):
     """
     Get the current status of a Dynamic Checklist session.
+    Long-poll with ?wait=<seconds>&since=<status>: held until the status
+    differs from `since` or `wait` runs out. While queued, the response
+    also has queue_position and queue_depth.
     """
-    sess = db.get_checklist_session(session_id)
-    return {"session_id": session_id, "status": sess["status"]}
+    sess = await aio.get_checklist_session(session_id)
+    sess = await _long_poll("checklist", session_id, sess, wait, since)
+    return {
+        "session_id": session_id,
+        "status": sess["status"],
+        **(await _queue_info("checklist", session_id, sess)),
+    }
 
 
 @app.get("/sessions/checklist/{session_id}/result")
-def get_dynamic_checklist_result(session_id: str):
+async def get_dynamic_checklist_result(session_id: str):
     """
     Fetch the final checklist after completion.
     """
-    checklist = db.get_dynamic_checklist(session_id)
+    checklist = await aio.get_dynamic_checklist(session_id)
     return {"dynamic_checklist": checklist}
 
 
@@ -228,7 +623,9 @@ def get_dynamic_checklist_result(session_id: str):
 
 
 @app.post("/sessions/cost-breakdown")
-def start_cost_breakdown(payload: Dict[str, Any], background_tasks: BackgroundTasks):
+def start_cost_breakdown(
+    payload: Dict[str, Any], idempotency_key: Optional[str] = Header(None)
+):
     """
     Start a Personalized Cost Breakdown session.
     Expects JSON with:
@@ -240,6 +637,8 @@ def start_cost_breakdown(payload: Dict[str, Any], background_tasks: BackgroundTa
       - preferences: str
     Returns:
       - session_id: str
+    An Idempotency-Key header, or the same request repeated soon after,
+    gets the first request's session_id back instead of a new crew.
     """
     user_id = payload.get("user_id")
     university = payload.get("university")
@@ -256,40 +655,56 @@ def start_cost_breakdown(payload: Dict[str, Any], background_tasks: BackgroundTa
             status_code=400, detail="Missing or invalid required fields"
         )
 
-    session_id = db.create_cost_breakdown_session(
-        user_id, university, course, applicant_type, location, preferences
-    )
+    with _submission("cost-breakdown", payload, idempotency_key) as submission:
+        if submission.duplicate_of:
+            return {"session_id": submission.duplicate_of}
 
-    background_tasks.add_task(
-        generate_application_planning_background,
-        session_id,
-        {
-            "flow_type": "cost_breakdown",
-            "university": university,
-            "course": course,
-            "applicant_type": applicant_type,
-            "location": location,
-            "preferences": preferences,
-        },
-    )
+        session_id = db.create_cost_breakdown_session(
+            user_id, university, course, applicant_type, location, preferences
+        )
+
+        _enqueue(
+            "cost-breakdown",
+            session_id,
+            {
+                "flow_type": "cost_breakdown",
+                "university": university,
+                "course": course,
+                "applicant_type": applicant_type,
+                "location": location,
+                "preferences": preferences,
+            },
+            user_id,
+        )
+        submission.session_id = session_id
 
     return {"session_id": session_id}
 
 
 @app.get("/sessions/cost-breakdown/{session_id}/status")
-def get_cost_breakdown_status(session_id: str):
+async def get_cost_breakdown_status(
+    session_id: str, wait: float = 0, since: Optional[str] = None
+):
     """
     Get the current status of a Cost Breakdown session.
     Returns:
       - session_id: str
       - status: str
+    Long-poll with ?wait=<seconds>&since=<status>: held until the status
+    differs from `since` or `wait` runs out. While queued, the response
+    also has queue_position and queue_depth.
     """
-    sess = db.get_cost_breakdown_session(session_id)
-    return {"session_id": session_id, "status": sess["status"]}
+    sess = await aio.get_cost_breakdown_session(session_id)
+    sess = await _long_poll("cost-breakdown", session_id, sess, wait, since)
+    return {
+        "session_id": session_id,
+        "status": sess["status"],
+        **(await _queue_info("cost-breakdown", session_id, sess)),
+    }
 
 
 @app.get("/sessions/cost-breakdown/{session_id}/result")
-def get_cost_breakdown_result(session_id: str):
+async def get_cost_breakdown_result(session_id: str):
     """
     Fetch summarized cost breakdown after completion.
     Returns:
@@ -297,7 +712,7 @@ def get_cost_breakdown_result(session_id: str):
       - expenses: dict
       - total_cost: integer
     """
-    result = db.get_cost_breakdown(session_id)
+    result = await aio.get_cost_breakdown(session_id)
     return result
 
 
@@ -305,7 +720,9 @@ def get_cost_breakdown_result(session_id: str):
 
 
 @app.post("/sessions/timeline")
-def start_timeline_planner(payload: Dict[str, Any], background_tasks: BackgroundTasks):
+def start_timeline_planner(
+    payload: Dict[str, Any], idempotency_key: Optional[str] = Header(None)
+):
     """
     Start an Interactive Application Timeline session.
     Expects JSON with:
@@ -318,6 +735,8 @@ def start_timeline_planner(payload: Dict[str, Any], background_tasks: Background
       - applicant_availability: Optional[str]
     Returns:
       - session_id: str
+    An Idempotency-Key header, or the same request repeated soon after,
+    gets the first request's session_id back instead of a new crew.
     """
     user_id = payload.get("user_id")
     universities = payload.get("universities")
@@ -330,49 +749,65 @@ def start_timeline_planner(payload: Dict[str, Any], background_tasks: Background
     if not all([user_id, universities, level, applicant_type, nationality]):
         raise HTTPException(status_code=400, detail="Missing required fields")
 
-    session_id = db.create_timeline_session(
-        user_id=user_id,
-        universities=universities,
-        level=level,
-        applicant_type=applicant_type,
-        nationality=nationality,
-        intake=intake,
-        applicant_availability=applicant_availability,
-    )
+    with _submission("timeline", payload, idempotency_key) as submission:
+        if submission.duplicate_of:
+            return {"session_id": submission.duplicate_of}
+
+        session_id = db.create_timeline_session(
+            user_id=user_id,
+            universities=universities,
+            level=level,
+            applicant_type=applicant_type,
+            nationality=nationality,
+            intake=intake,
+            applicant_availability=applicant_availability,
+        )
 
-    background_tasks.add_task(
-        generate_application_planning_background,
-        session_id,
-        {
-            "flow_type": "timeline",
-            "universities": universities,
-            "level": level,
-            "applicant_type": applicant_type,
-            "nationality": nationality,
-            "intake": intake,
-            "applicant_availability": applicant_availability,
-        },
-    )
+        _enqueue(
+            "timeline",
+            session_id,
+            {
+                "flow_type": "timeline",
+                "universities": universities,
+                "level": level,
+                "applicant_type": applicant_type,
+                "nationality": nationality,
+                "intake": intake,
+                "applicant_availability": applicant_availability,
+            },
+            user_id,
+        )
+        submission.session_id = session_id
 
     return {"session_id": session_id}
 
 
 @app.get("/sessions/timeline/{session_id}/status")
-def get_timeline_status(session_id: str):
+async def get_timeline_status(
+    session_id: str, wait: float = 0, since: Optional[str] = None
+):
     """
     Get the current status of a Timeline Planner session.
+    Long-poll with ?wait=<seconds>&since=<status>: held until the status
+    differs from `since` or `wait` runs out. While queued, the response
+    also has queue_position and queue_depth.
     """
-    sess = db.get_timeline_session(session_id)
-    return {"session_id": session_id, "status": sess["status"]}
+    sess = await aio.get_timeline_session(session_id)
+    sess = await _long_poll("timeline", session_id, sess, wait, since)
+    return {
+        "session_id": session_id,
+        "status": sess["status"],
+        **(await _queue_info("timeline", session_id, sess)),
+    }
 
 
 @app.get("/sessions/timeline/{session_id}/result")
-def get_timeline_result(session_id: str):
+async def get_timeline_result(session_id: str):
     """
     Fetch extracted deadlines and generated timeline after completion.
     """
-    deadlines = db.get_deadline_data(session_id)
-    timeline = db.get_timeline(session_id)
+    deadlines = await aio.get_deadline_data(session_id)
+    timeline = await aio.get_timeline(session_id)
     return {
         "deadlines": deadlines,
         "timeline": timeline,
@@ -394,15 +829,100 @@ async def sentiment_analysis(payload: SentimentRequest):
           "reddit_posts": [ {"title": ..., "url": ...}, … ],
           "summary": "3–4 sentence summary …"
         }
+    Answers inside the request; POST /sessions/sentiment runs the same
+    analysis as a background session instead.
     """
-    return sentiment_reddit_summary(payload.reviews)
+    return await sentiment.summarize(payload.reviews)
+
+
+@app.post("/sessions/sentiment")
+def start_sentiment_session(
+    payload: Dict[str, Any], idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Start a sentiment-analysis session. Reviews analysed recently complete
+    at once from the cache.
+    Expects JSON with:
+      - user_id: str
+      - reviews: list[str] (at least one)
+    Returns:
+      - session_id: str
+    An Idempotency-Key header, or the same request repeated soon after,
+    gets the first request's session_id back instead of a new crew.
+    """
+    user_id = payload.get("user_id")
+    reviews = payload.get("reviews")
+
+    if (
+        not user_id
+        or not isinstance(reviews, list)
+        or not reviews
+        or not all(isinstance(r, str) and r.strip() for r in reviews)
+    ):
+        raise HTTPException(status_code=400, detail="Missing or invalid fields")
+
+    with _submission("sentiment", payload, idempotency_key) as submission:
+        if submission.duplicate_of:
+            return {"session_id": submission.duplicate_of}
+
+        session_id = db.create_sentiment_session(user_id, reviews)
+
+        cached = sentiment.cached_result(reviews)
+        if cached is not None:
+            db.save_sentiment_result(session_id, cached)
+        else:
+            _enqueue(
+                "sentiment",
+                session_id,
+                {"flow_type": "sentiment", "reviews": reviews},
+                user_id,
+            )
+        submission.session_id = session_id
+
+    return {"session_id": session_id}
+
+
+@app.get("/sessions/sentiment/{session_id}/status")
+async def get_sentiment_status(
+    session_id: str, wait: float = 0, since: Optional[str] = None
+):
+    """
+    Get the current status of a sentiment-analysis session.
+    Returns:
+      - session_id: str
+      - status: str
+      - error: str (only if failed)
+    Long-poll with ?wait=<seconds>&since=<status>: held until the status
+    differs from `since` or `wait` runs out. While queued, the response
+    also has queue_position and queue_depth.
+    """
+    sess = await aio.get_sentiment_session(session_id)
+    sess = await _long_poll("sentiment", session_id, sess, wait, since)
+    resp = {"session_id": session_id, "status": sess["status"]}
+    if sess["status"] == "failed":
+        resp["error"] = sess.get("error", "Unknown error")
+    resp.update(await _queue_info("sentiment", session_id, sess))
+    return resp
+
+
+@app.get("/sessions/sentiment/{session_id}/result", response_model=SentimentResponse)
+async def get_sentiment_result(session_id: str):
+    """
+    Fetch the related Reddit posts and sentiment summary after completion.
+    Returns:
+      - reddit_posts: [{"title": ..., "url": ...}, …]
+      - summary: str
+    """
+    return await aio.get_sentiment_result(session_id)
 
 
 # --- Interview preperation (Feature 7) ------------------------------------------
 
 
 @app.post("/sessions/interview-prep")
-def start_interview_prep(payload: Dict[str, Any], background_tasks: BackgroundTasks):
+def start_interview_prep(
+    payload: Dict[str, Any], idempotency_key: Optional[str] = Header(None)
+):
     """
     Start an Interview Preparation session.
     Expects JSON with:
@@ -412,6 +932,8 @@ def start_interview_prep(payload: Dict[str, Any], background_tasks: BackgroundTa
       - program_level: str
     Returns:
       - session_id: str
+    An Idempotency-Key header, or the same request repeated soon after,
+    gets the first request's session_id back instead of a new crew.
     """
     user_id = payload.get("user_id")
     university_name = payload.get("university_name")
@@ -426,42 +948,58 @@ def start_interview_prep(payload: Dict[str, Any], background_tasks: BackgroundTa
             status_code=400, detail="Missing or invalid required fields"
         )
 
-    session_id = db.create_interview_prep_session(
-        user_id, university_name, course_name, program_level
-    )
+    with _submission("interview-prep", payload, idempotency_key) as submission:
+        if submission.duplicate_of:
+            return {"session_id": submission.duplicate_of}
 
-    background_tasks.add_task(
-        generate_application_planning_background,
-        session_id,
-        {
-            "flow_type": "interview_prep",
-            "university_name": university_name,
-            "course_name": course_name,
-            "program_level": program_level,
-        },
-    )
+        session_id = db.create_interview_prep_session(
+            user_id, university_name, course_name, program_level
+        )
+
+        _enqueue(
+            "interview-prep",
+            session_id,
+            {
+                "flow_type": "interview_prep",
+                "university_name": university_name,
+                "course_name": course_name,
+                "program_level": program_level,
+            },
+            user_id,
+        )
+        submission.session_id = session_id
 
     return {"session_id": session_id}
 
 
 @app.get("/sessions/interview-prep/{session_id}/status")
-def get_interview_prep_status(session_id: str):
+async def get_interview_prep_status(
+    session_id: str, wait: float = 0, since: Optional[str] = None
+):
     """
     Get the current status of an Interview Preparation session.
     Returns:
       - session_id: str
       - status: str
+    Long-poll with ?wait=<seconds>&since=<status>: held until the status
+    differs from `since` or `wait` runs out. While queued, the response
+    also has queue_position and queue_depth.
     """
-    sess = db.get_interview_prep_session(session_id)
-    return {"session_id": session_id, "status": sess["status"]}
+    sess = await aio.get_interview_prep_session(session_id)
+    sess = await _long_poll("interview-prep", session_id, sess, wait, since)
+    return {
+        "session_id": session_id,
+        "status": sess["status"],
+        **(await _queue_info("interview-prep", session_id, sess)),
+    }
 
 
 @app.get("/sessions/interview-prep/{session_id}/result")
-def get_interview_prep_result(session_id: str):
+async def get_interview_prep_result(session_id: str):
     """
     Fetch prepared interview questions and response guidelines.
     Returns:
       - questions: list of dicts with {"question": ..., "response_guideline": ...}
     """
-    result = db.get_interview_prep(session_id)
+    result = await aio.get_interview_prep(session_id)
     return result
@@ -0,0 +1,86 @@
+"""
+Concurrency stress test for the datastore.
+
+Runs N sessions in each of several worker processes against one shared
+store, mimicking request handlers and background crews in a multi-worker
+uvicorn deployment, then checks that no update was lost.
+
+    cd main/src
+    python -m benchmarks.concurrency --backend json --workers 4 --sessions 50
+
+Exits non-zero if any session or status update is missing.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+from typing import List, Tuple
+
+
+def _use_store(backend: str, directory: str) -> None:
+    """Point a freshly imported db module at the stress-test files."""
+    import db
+
+    db.use_backend(backend, directory)
+
+
+def _run_worker(args: Tuple[str, str, int, int]) -> List[str]:
+    backend, directory, worker, sessions = args
+    _use_store(backend, directory)
+    import db
+
+    user_id = f"stress-user-{worker}"
+    session_ids = []
+    for i in range(sessions):
+        session_id = db.create_checklist_session(user_id, "LK", "undergraduate", [])
+        db.set_session_status("checklist_sessions", session_id, "in_progress")
+        db.save_dynamic_checklist(session_id, {"worker": worker, "item": i})
+        session_ids.append(session_id)
+    return session_ids
+
+
+def run(backend: str, workers: int, sessions: int) -> int:
+    """Run the stress test and return the number of lost updates."""
+    with tempfile.TemporaryDirectory() as directory:
+        _use_store(backend, directory)
+        import db
+
+        db.init_db()
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers) as pool:
+            results = pool.map(
+                _run_worker,
+                [(backend, directory, w, sessions) for w in range(workers)],
+            )
+
+        lost = 0
+        for worker, session_ids in enumerate(results):
+            for i, session_id in enumerate(session_ids):
+                try:
+                    status = db.get_checklist_session(session_id)["status"]
+                    checklist = db.get_dynamic_checklist(session_id)
+                except KeyError:
+                    lost += 1
+                    continue
+                if status != "completed" or checklist != {"worker": worker, "item": i}:
+                    lost += 1
+        return lost
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="json")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    lost = run(args.backend, args.workers, args.sessions)
+    total = args.workers * args.sessions
+    print(f"{args.backend}: {total} sessions, {lost} lost updates")
+    sys.exit(1 if lost else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Datastore latency versus database size.
+
+Fills a fresh store with synthetic sessions spread over every flow, then
+times the create_*_session, get_*_session and save_* functions of each flow
+and delete_user, reporting p50/p99 per function as JSON. Runs every
+requested backend at every size, so a regression or a scaling cliff shows
+up as one number growing with ``sessions``.
+
+    cd main/src
+    python -m benchmarks.datastore [--backends json sqlite] \
+        [--sizes 1000 10000 100000] [--samples 50] [--output results.json]
+
+The fill is built through the db API on the memory backend and loaded into
+the target store in one write, so even the JSON backends fill quickly.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import db
+
+SESSIONS_PER_USER = 10
+
+Call = Tuple[str, Callable[..., Any]]
+
+
+def _payload(i: int) -> Dict[str, Any]:
+    # small enough to stay inline, like most status-sized results
+    return {"item": i, "notes": ["synthetic"] * 8, "score": i % 100}
+
+
+# flow → (create, get, save) as (name, fn) pairs; create(user_id) returns a
+# session_id, get(session_id), save(session_id, i)
+FLOW_CALLS: Dict[str, Tuple[Call, Call, Call]] = {
+    "essay": (
+        (
+            "create_essay_session",
+            lambda u: db.create_essay_session(u, "Essay text " * 20, "Uni"),
+        ),
+        ("get_essay_session", db.get_essay_session),
+        (
+            "save_essay_results",
+            lambda sid, i: db.save_essay_results(sid, _payload(i), "Draft " * 20),
+        ),
+    ),
+    "program-analysis": (
+        (
+            "create_program_analysis_session",
+            lambda u: db.create_program_analysis_session(u, ["Uni A"], ["fees"]),
+        ),
+        ("get_program_analysis_session", db.get_program_analysis_session),
+        (
+            "save_program_comparison_report",
+            lambda sid, i: db.save_program_comparison_report(sid, _payload(i)),
+        ),
+    ),
+    "checklist": (
+        (
+            "create_checklist_session",
+            lambda u: db.create_checklist_session(u, "LK", "undergraduate", ["Uni"]),
+        ),
+        ("get_checklist_session", db.get_checklist_session),
+        (
+            "save_dynamic_checklist",
+            lambda sid, i: db.save_dynamic_checklist(sid, _payload(i)),
+        ),
+    ),
+    "cost-breakdown": (
+        (
+            "create_cost_breakdown_session",
+            lambda u: db.create_cost_breakdown_session(
+                u, "Uni", "CS", "international", "London", "none"
+            ),
+        ),
+        ("get_cost_breakdown_session", db.get_cost_breakdown_session),
+        (
+            "save_cost_breakdown",
+            lambda sid, i: db.save_cost_breakdown(sid, _payload(i)),
+        ),
+    ),
+    "timeline": (
+        (
+            "create_timeline_session",
+            lambda u: db.create_timeline_session(
+                u, ["Uni"], "undergraduate", "international", "LK", "fall", None
+            ),
+        ),
+        ("get_timeline_session", db.get_timeline_session),
+        (
+            "save_timeline",
+            lambda sid, i: db.save_timeline(sid, _payload(i), ["step"] * 4),
+        ),
+    ),
+    "interview-prep": (
+        (
+            "create_interview_prep_session",
+            lambda u: db.create_interview_prep_session(u, "Uni", "CS", "undergraduate"),
+        ),
+        ("get_interview_prep_session", db.get_interview_prep_session),
+        (
+            "save_interview_prep",
+            lambda sid, i: db.save_interview_prep(sid, _payload(i)),
+        ),
+    ),
+    "sentiment": (
+        (
+            "create_sentiment_session",
+            lambda u: db.create_sentiment_session(u, ["Great lecturers " * 10]),
+        ),
+        ("get_sentiment_session", db.get_sentiment_session),
+        (
+            "save_sentiment_result",
+            lambda sid, i: db.save_sentiment_result(
+                sid, {"reddit_posts": [], "summary": f"Summary {i}"}
+            ),
+        ),
+    ),
+}
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(samples),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def _timed(fn: Callable, *args: Any) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def _build_fill(sessions: int) -> Tuple[Dict[str, Any], Dict[str, List[str]]]:
+    """Create ``sessions`` synthetic sessions in memory; half get results."""
+    db.use_backend("memory")
+    db.init_db()
+    flows = list(FLOW_CALLS)
+    by_flow: Dict[str, List[str]] = {flow: [] for flow in flows}
+    for i in range(sessions):
+        flow = flows[i % len(flows)]
+        (_, create), _, (_, save) = FLOW_CALLS[flow]
+        session_id = create(f"fill-user-{i // SESSIONS_PER_USER}")
+        if i % 2:
+            save(session_id, i)
+        by_flow[flow].append(session_id)
+    return db.read_db(), by_flow
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run(backend: str, sessions: int, samples: int) -> Dict[str, Any]:
+    """Benchmark one backend at one database size."""
+    snapshot, by_flow = _build_fill(sessions)
+    rng = random.Random(sessions)
+    with tempfile.TemporaryDirectory() as directory:
+        db.use_backend(backend, directory)
+        db.init_db()
+        start = time.perf_counter()
+        db.update_db(snapshot)
+        fill_seconds = time.perf_counter() - start
+
+        timings: Dict[str, List[float]] = {}
+        for flow, calls in FLOW_CALLS.items():
+            (create_name, create), (get_name, get), (save_name, save) = calls
+            created = []
+            for i in range(samples):
+                elapsed, session_id = _timed(create, f"bench-user-{i}")
+                timings.setdefault(create_name, []).append(elapsed)
+                created.append(session_id)
+            for session_id in rng.choices(by_flow[flow], k=samples):
+                timings.setdefault(get_name, []).append(_timed(get, session_id)[0])
+            for i, session_id in enumerate(created):
+                timings.setdefault(save_name, []).append(_timed(save, session_id, i)[0])
+
+        fill_users = max(1, sessions // SESSIONS_PER_USER)
+        users = rng.sample(range(fill_users), min(samples, fill_users))
+        timings["delete_user"] = [
+            _timed(db.delete_user, f"fill-user-{u}")[0] for u in users
+        ]
+
+        return {
+            "backend": backend,
+            "sessions": sessions,
+            "fill_seconds": round(fill_seconds, 3),
+            "store_bytes": _dir_size(directory),
+            "functions": {name: _summary(t) for name, t in timings.items()},
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(db.BACKENDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument(
+        "--samples", type=int, default=50, help="calls timed per function"
+    )
+    parser.add_argument("--output", help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends:
+        for sessions in args.sizes:
+            result = run(backend, sessions, args.samples)
+            print(
+                f"{backend}: {sessions} sessions done "
+                f"({result['store_bytes']} bytes on disk)",
+                file=sys.stderr,
+            )
+            results.append(result)
+
+    report = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,3 +15,12 @@ class RedditPost(BaseModel):
 class SentimentResponse(BaseModel):
     reddit_posts: List[RedditPost]
     summary: str
+
+
+class SessionRef(BaseModel):
+    flow: str
+    session_id: str
+
+
+class BatchStatusRequest(BaseModel):
+    sessions: List[SessionRef]
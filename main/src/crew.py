@@ -1,7 +1,9 @@
 import os
-from typing import List, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 
+import metrics
 from agents import create_college_exploration_agents, create_university_planning_agents
+from config.report_paths import LOG_DIR
 from crewai import Crew, Process
 from tasks import create_college_exploration_tasks, create_university_planning_tasks
 
@@ -11,6 +13,8 @@ def create_essay_writing_crew(
     essay_text: str,
     target_university: str,
     style_guidelines: str,
+    task_callback: Optional[Callable[[Any], None]] = None,
+    step_callback: Optional[Callable[[Any], None]] = None,
 ) -> tuple:
     """
     Create and run a Crew for the Essay Writing flow.
@@ -20,7 +24,7 @@ def create_essay_writing_crew(
       2. essay_refinement_agent
     """
     # prepare log directory
-    log_dir = f"data/logs/{session_id}/essay"
+    log_dir = os.path.join(LOG_DIR.format(session_id=session_id), "essay")
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "crew.log")
 
@@ -50,8 +54,11 @@ def create_essay_writing_crew(
         Process=Process.sequential,
         output_log_file=log_file,
         full_output=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
     result = crew.kickoff()
+    metrics.record_crew_usage("essay", crew, result)
     return result, tasks
 
 
@@ -59,6 +66,8 @@ def create_program_analysis_crew(
     session_id: str,
     university_list: list[str],
     comparison_criteria: list[str],
+    task_callback: Optional[Callable[[Any], None]] = None,
+    step_callback: Optional[Callable[[Any], None]] = None,
 ) -> tuple:
     """
     Create and run a Crew for Program Analysis flow (Features 2 & 3).
@@ -69,7 +78,7 @@ def create_program_analysis_crew(
       3. program_comparison_agent
     """
     # prepare log directory
-    log_dir = f"data/logs/{session_id}/program_analysis"
+    log_dir = os.path.join(LOG_DIR.format(session_id=session_id), "program_analysis")
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "crew.log")
 
@@ -103,8 +112,11 @@ def create_program_analysis_crew(
         Process=Process.sequential,
         output_log_file=log_file,
         full_output=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
     result = crew.kickoff()
+    metrics.record_crew_usage("program-analysis", crew, result)
     return result, tasks
 
 
@@ -113,6 +125,8 @@ def create_dynamic_checklist_crew(
     nationality: str,
     program_level: str,
     university_list: List[str],
+    task_callback: Optional[Callable[[Any], None]] = None,
+    step_callback: Optional[Callable[[Any], None]] = None,
 ) -> Tuple:
     """
     Create and run a Crew for the Dynamic Application Checklist flow (Feature 4).
@@ -121,7 +135,7 @@ def create_dynamic_checklist_crew(
       1. dynamic_checklist_agent
     """
     # prepare log directory
-    log_dir = f"data/logs/{session_id}/checklist"
+    log_dir = os.path.join(LOG_DIR.format(session_id=session_id), "checklist")
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "crew.log")
 
@@ -154,8 +168,11 @@ def create_dynamic_checklist_crew(
         Process=Process.sequential,
         output_log_file=log_file,
         full_output=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
     result = crew.kickoff()
+    metrics.record_crew_usage("checklist", crew, result)
     return result, tasks
 
 
@@ -166,6 +183,8 @@ def cost_breakdown_crew(
     applicant_type: str,
     location: str,
     preferences: str,
+    task_callback: Optional[Callable[[Any], None]] = None,
+    step_callback: Optional[Callable[[Any], None]] = None,
 ) -> Tuple:
     """
     Create and run a Crew for the Personalized Cost Breakdown flow (Feature 5).
@@ -175,7 +194,7 @@ def cost_breakdown_crew(
       2. cost_breakdown_generator_agent
     """
     # prepare log directory
-    log_dir = f"data/logs/{session_id}/cost_breakdown"
+    log_dir = os.path.join(LOG_DIR.format(session_id=session_id), "cost_breakdown")
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "crew.log")
 
@@ -210,8 +229,11 @@ def cost_breakdown_crew(
         Process=Process.sequential,
         output_log_file=log_file,
         full_output=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
     result = crew.kickoff()
+    metrics.record_crew_usage("cost-breakdown", crew, result)
     return result, tasks
 
 
@@ -223,6 +245,8 @@ def create_timeline_generator_crew(
     nationality: str,
     intake: str,
     applicant_availability: str = None,
+    task_callback: Optional[Callable[[Any], None]] = None,
+    step_callback: Optional[Callable[[Any], None]] = None,
 ) -> Tuple:
     """
     Create and run a Crew for the Interactive Application Timeline flow (Feature 6).
@@ -232,7 +256,7 @@ def create_timeline_generator_crew(
       2. timeline_generator_agent
     """
     # prepare log directory
-    log_dir = f"data/logs/{session_id}/timeline_planner"
+    log_dir = os.path.join(LOG_DIR.format(session_id=session_id), "timeline_planner")
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "crew.log")
 
@@ -265,8 +289,11 @@ def create_timeline_generator_crew(
         Process=Process.sequential,
         output_log_file=log_file,
         full_output=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
     result = crew.kickoff()
+    metrics.record_crew_usage("timeline", crew, result)
     return result, tasks
 
 
@@ -275,6 +302,8 @@ def create_interview_prep_crew(
     university_name: str,
     course_name: str,
     program_level: str,
+    task_callback: Optional[Callable[[Any], None]] = None,
+    step_callback: Optional[Callable[[Any], None]] = None,
 ) -> Tuple:
     """
     Create and run a Crew for the Interview Preparation flow.
@@ -284,7 +313,7 @@ def create_interview_prep_crew(
       2. interview_question_generator_agent
     """
     # prepare log directory
-    log_dir = f"data/logs/{session_id}/interview_prep"
+    log_dir = os.path.join(LOG_DIR.format(session_id=session_id), "interview_prep")
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, "crew.log")
 
@@ -318,7 +347,10 @@ def create_interview_prep_crew(
         Process=Process.sequential,
         output_log_file=log_file,
         full_output=True,
+        task_callback=task_callback,
+        step_callback=step_callback,
     )
 
     result = crew.kickoff()
+    metrics.record_crew_usage("interview-prep", crew, result)
     return result, tasks
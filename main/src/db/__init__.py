@@ -1,54 +1,511 @@
+import base64
+import contextlib
 import datetime
-import json
 import os
+import threading
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import metrics
+from db.base import StorageBackend
+from db.blobs import BlobStore, MemoryBlobStore, encode, is_blob_ref
+from db.journal_store import JournalStore
+from db.json_store import JsonStore
+from db.memory_store import MemoryStore
+from db.ops import (
+    DELETE,
+    LINK,
+    PUT,
+    REQUIRE,
+    UNLINK,
+    UPDATE,
+    Conflict,
+    MissingRecord,
+    Op,
+)
+from db.sqlite_store import SQLiteStore
 
 # Path to JSON‐backed datastore
 DB_FILENAME = os.path.join(os.path.dirname(__file__), "aice_db.json")
+# Path to SQLite datastore, used when AICE_DB_BACKEND=sqlite
+SQLITE_FILENAME = os.path.join(os.path.dirname(__file__), "aice_db.sqlite3")
+# "json" (default), "journal" (aice_db.json + append-only aice_db.json.journal),
+# "sqlite" or "memory" (process-local, no disk I/O); see BACKENDS
+DB_BACKEND = os.getenv("AICE_DB_BACKEND", "json").lower()
+# Large result payloads live here as <sha>.json.gz; records keep a reference
+BLOB_DIR = os.path.join(os.path.dirname(__file__), "blobs")
+# Payloads whose JSON encoding is at least this many bytes become blobs
+BLOB_THRESHOLD = 1024
+
+COLLECTIONS = [
+    "users",
+    "essay_writing_sessions",
+    "essay_results",
+    "program_analysis_sessions",
+    "raw_admissions_data",
+    "structured_admissions_data",
+    "program_comparison_reports",
+    "checklist_sessions",
+    "dynamic_checklists",
+    "cost_breakdown_sessions",
+    "cost_breakdown_results",
+    "timeline_sessions",
+    "timeline_results",
+    "interview_prep_sessions",
+    "interview_prep_results",
+    "sentiment_sessions",
+    "sentiment_results",
+    # user_id → {"user_id": ..., "sessions": {session_id: {"flow", "created_at"}}}
+    "user_sessions",
+]
+
+# API flow name → (session collection, result collections)
+FLOWS = {
+    "essay": ("essay_writing_sessions", ["essay_results"]),
+    "program-analysis": (
+        "program_analysis_sessions",
+        [
+            "raw_admissions_data",
+            "structured_admissions_data",
+            "program_comparison_reports",
+        ],
+    ),
+    "checklist": ("checklist_sessions", ["dynamic_checklists"]),
+    "cost-breakdown": ("cost_breakdown_sessions", ["cost_breakdown_results"]),
+    "timeline": ("timeline_sessions", ["timeline_results"]),
+    "interview-prep": ("interview_prep_sessions", ["interview_prep_results"]),
+    "sentiment": ("sentiment_sessions", ["sentiment_results"]),
+}
 
+# A session in one of these states may still change status; the others
+# (completed, failed, cancelled) are final
+ACTIVE_STATUSES = ["pending", "in_progress"]
 
-def read_db() -> Dict[str, Any]:
-    """Load the entire database, creating defaults if necessary."""
-
-    default = {
-        "users": {},
-        "essay_writing_sessions": {},
-        "essay_results": {},
-        "program_analysis_sessions": {},
-        "raw_admissions_data": {},
-        "structured_admissions_data": {},
-        "program_comparison_reports": {},
-        "checklist_sessions": {},
-        "dynamic_checklists": {},
-        "cost_breakdown_sessions": {},
-        "cost_breakdown_results": {},
-        "timeline_sessions": {},
-        "timeline_results": {},
-        "interview_prep_sessions": {},
-        "interview_prep_results": {},
-    }
 
-    if not os.path.exists(DB_FILENAME):
-        update_db(default)
-        return default
+class SessionClosed(Exception):
+    """A status change or result save found the session already finished."""
 
-    with open(DB_FILENAME, "r") as f:
-        db = json.load(f)
 
-    # Add any missing keys from default
-    for key, value in default.items():
-        if key not in db:
-            db[key] = value
+#
+# Schema migrations
+#
+def _create_collections(store) -> None:
+    store.create_collections(COLLECTIONS)
+
+
+def _index_user_sessions(store) -> None:
+    """Build the user_sessions index from existing session records."""
+    _create_collections(store)
+    db = store.dump()
+    ops = []
+    for flow, (collection, _) in FLOWS.items():
+        for session_id, record in db.get(collection, {}).items():
+            if isinstance(record, dict) and record.get("user_id"):
+                ops.append(_link(record["user_id"], flow, session_id, record))
+    if ops:
+        store.apply(ops)
+
+
+# (version, step) pairs, applied in order to stores below that version.
+# Append a new step (never edit an old one) when the layout changes.
+MIGRATIONS = [
+    (1, _create_collections),
+    (2, _index_user_sessions),
+    # sentiment_sessions / sentiment_results
+    (3, _create_collections),
+    # SQLite stores that imported aice_db.json after step 2 had run lacked
+    # the imported sessions in user_sessions
+    (4, _index_user_sessions),
+]
+
+_store_instance = None
+_blob_store = None
+# per-thread stack of pending (ops, not_found) writes; see transaction()
+_tx = threading.local()
+
+
+def _migrate(store) -> None:
+    version = store.schema_version()
+    for target, step in MIGRATIONS:
+        if version < target:
+            step(store)
+            store.set_schema_version(target)
+            version = target
+
+
+def _open_sqlite() -> SQLiteStore:
+    store = SQLiteStore(SQLITE_FILENAME, COLLECTIONS)
+    store.create_collections(COLLECTIONS)
+    # carry over an existing JSON datastore the first time, before migrating
+    # so that steps like the user index see the imported sessions
+    if os.path.exists(DB_FILENAME):
+        store.load_if_empty(JsonStore(DB_FILENAME, COLLECTIONS).read())
+    _migrate(store)
+    return store
+
+
+# AICE_DB_BACKEND value → factory for that StorageBackend
+BACKENDS = {
+    "json": lambda: JsonStore(DB_FILENAME, COLLECTIONS),
+    "journal": lambda: JournalStore(DB_FILENAME, COLLECTIONS),
+    "sqlite": _open_sqlite,
+    "memory": lambda: MemoryStore(COLLECTIONS),
+}
+
+
+class TimedStore:
+    """
+    A StorageBackend that records how long each read and write of the store
+    it wraps takes, in metrics.DB_SECONDS by method name.
+    """
+
+    TIMED = (
+        "get",
+        "get_many",
+        "scan",
+        "count_by_status",
+        "find_by_status",
+        "apply",
+        "dump",
+        "load",
+    )
+
+    def __init__(self, store: StorageBackend):
+        self.store = store
+        self.collections = store.collections
+        for name in self.TIMED:
+            timer = metrics.DB_SECONDS.labels(name)
+            setattr(self, name, self._timed(timer, getattr(store, name)))
+
+    @staticmethod
+    def _timed(timer, method):
+        def call(*args, **kwargs):
+            with timer.time():
+                return method(*args, **kwargs)
+
+        return call
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
+
+
+def _store() -> StorageBackend:
+    """Return the configured store, opening and migrating it on first use."""
+    global _store_instance
+    if _store_instance is None:
+        if DB_BACKEND not in BACKENDS:
+            raise ValueError(f"Unknown AICE_DB_BACKEND: {DB_BACKEND}")
+        store = BACKENDS[DB_BACKEND]()
+        _migrate(store)
+        _store_instance = TimedStore(store)
+    return _store_instance
+
+
+def use_backend(backend: str, directory: Optional[str] = None) -> None:
+    """
+    Switch this process to another backend, optionally keeping its files
+    (and blobs) under ``directory``. For tools, benchmarks and tests; the
+    API picks its backend from AICE_DB_BACKEND.
+    """
+    global DB_BACKEND, DB_FILENAME, SQLITE_FILENAME, BLOB_DIR
+    global _blob_store
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    close()
+    DB_BACKEND = backend
+    if directory is not None:
+        DB_FILENAME = os.path.join(directory, "aice_db.json")
+        SQLITE_FILENAME = os.path.join(directory, "aice_db.sqlite3")
+        BLOB_DIR = os.path.join(directory, "blobs")
+    _blob_store = None
+
+
+def close() -> None:
+    """Close the open store, if any; the next db call opens it again."""
+    global _store_instance
+    if _store_instance is not None:
+        _store_instance.close()
+        _store_instance = None
+
+
+def init_db() -> None:
+    """Open the datastore and apply pending migrations. Call once at startup."""
+    _store()
+
+
+def _blobs():
+    global _blob_store
+    if _blob_store is None:
+        if DB_BACKEND == "memory":
+            _blob_store = MemoryBlobStore()
+        else:
+            _blob_store = BlobStore(BLOB_DIR)
+    return _blob_store
+
+
+def _offload(value: Any) -> Any:
+    """Swap a large payload for a blob reference; small values stay inline."""
+    if value is None:
+        return value
+    data = encode(value)
+    if len(data) < BLOB_THRESHOLD:
+        return value
+    return _blobs().put(value, data)
+
+
+def _inline(value: Any) -> Any:
+    """Resolve a blob reference back to its payload."""
+    if is_blob_ref(value):
+        return _blobs().get(value["$blob"])
+    return value
+
+
+def _get(collection: str, key: str, not_found: str) -> Any:
+    """Fetch one record, raising KeyError(not_found) if it does not exist."""
+    try:
+        return _store().get(collection, key)
+    except MissingRecord:
+        raise KeyError(not_found) from None
+
+
+def _write(ops: List[Op], not_found: Optional[str] = None) -> None:
+    """Apply ops atomically, raising KeyError(not_found) if a target is missing."""
+    pending = getattr(_tx, "pending", None)
+    if pending is not None:
+        pending.append((ops, not_found))
+        return
+    try:
+        _store().apply(ops)
+    except MissingRecord:
+        raise KeyError(not_found) from None
+    except Conflict as e:
+        raise SessionClosed(f"Session {e.key} is already {e.value}") from None
+
+
+def _commit(pending: List[Tuple[List[Op], Optional[str]]]) -> None:
+    try:
+        _store().apply([op for ops, _ in pending for op in ops])
+    except MissingRecord as e:
+        # report the message of the write that referenced the missing record
+        for ops, not_found in pending:
+            if any((c, k) == (e.collection, e.key) for _, c, k, _ in ops):
+                raise KeyError(not_found) from None
+        raise
+    except Conflict as e:
+        raise SessionClosed(f"Session {e.key} is already {e.value}") from None
+
+
+@contextlib.contextmanager
+def transaction() -> Iterator[None]:
+    """
+    Batch every write made inside the block into one atomic commit.
+
+    Writes are buffered and applied together when the block exits; if the
+    block raises, or any buffered write targets a missing session, nothing
+    is written. Reads inside the block see the last committed state, not
+    the buffered writes. Nested blocks join the outermost transaction.
+    """
+    if getattr(_tx, "pending", None) is not None:
+        yield
+        return
+    _tx.pending = []
+    try:
+        yield
+        pending = _tx.pending
+    finally:
+        _tx.pending = None
+    if pending:
+        _commit(pending)
+
+
+def _still_active(collection: str, session_id: str) -> Op:
+    """Condition failing the write (SessionClosed) once the session finished."""
+    return (REQUIRE, collection, session_id, {"status": ACTIVE_STATUSES})
+
+
+def _link(user_id: str, flow: str, session_id: str, record: Dict[str, Any]) -> Op:
+    entry = {"flow": flow, "created_at": record.get("created_at")}
+    return (LINK, "user_sessions", user_id, {session_id: entry})
+
+
+def _create_session(flow: str, record: Dict[str, Any]) -> str:
+    """Store a new session record, index it under its user, return its id."""
+    session_id = str(uuid.uuid4())
+    collection, _ = FLOWS[flow]
+    _write(
+        [
+            (PUT, collection, session_id, record),
+            _link(record["user_id"], flow, session_id, record),
+        ]
+    )
+    return session_id
+
+
+def _delete_session_ops(flow: str, session_id: str, record: Any) -> List[Op]:
+    collection, result_collections = FLOWS[flow]
+    ops = [(DELETE, c, session_id, None) for c in [collection] + result_collections]
+    user_id = record.get("user_id") if isinstance(record, dict) else None
+    if user_id:
+        ops.append((UNLINK, "user_sessions", user_id, [session_id]))
+    return ops
+
+
+def _delete_session(flow: str, session_id: str) -> None:
+    """Delete a session, its results and its user-index entry."""
+    try:
+        record = _store().get(FLOWS[flow][0], session_id)
+    except MissingRecord:
+        record = None
+    _write(_delete_session_ops(flow, session_id, record))
+
+
+def _encode_cursor(created_at: str, session_id: str) -> str:
+    raw = f"{created_at}|{session_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, session_id = (
+            base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        )
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}") from None
+    return created_at, session_id
+
+
+def get_sessions(
+    sessions: List[Tuple[str, str]],
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Fetch several session records, given as (flow, session_id) pairs, in one
+    storage read. Missing sessions are left out of the result.
+    """
+    keys = {
+        (FLOWS[flow][0], session_id): (flow, session_id)
+        for flow, session_id in sessions
+    }
+    return {keys[key]: record for key, record in _store().get_many(keys).items()}
+
+
+def get_session_with_results(
+    flow: str, session_id: str
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Fetch a session and all of its result records in one storage read.
+    Returns (session, {result collection: record}) with blob payloads
+    resolved; results not written yet are left out.
+    """
+    collection, result_collections = FLOWS[flow]
+    found = _store().get_many(
+        [(c, session_id) for c in [collection] + result_collections]
+    )
+    if (collection, session_id) not in found:
+        raise KeyError(f"Session {session_id} not found in {collection}")
+    results = {}
+    for c in result_collections:
+        if (c, session_id) not in found:
+            continue
+        record = found[(c, session_id)]
+        if isinstance(record, dict) and not is_blob_ref(record):
+            record = {key: _inline(value) for key, value in record.items()}
+        results[c] = _inline(record)
+    return found[(collection, session_id)], results
+
+
+def delete_sessions(sessions: List[Tuple[str, str]]) -> int:
+    """
+    Delete several (flow, session_id) sessions with their results and index
+    entries in one write. Returns how many existed.
+    """
+    records = get_sessions(sessions)
+    ops = []
+    for (flow, session_id), record in records.items():
+        ops.extend(_delete_session_ops(flow, session_id, record))
+    if ops:
+        _write(ops)
+    return len(records)
+
+
+def find_sessions(statuses: List[str]) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """
+    (flow, session_id, record) for every session whose status is listed, in
+    one read.
+    """
+    flows = {collection: flow for flow, (collection, _) in FLOWS.items()}
+    return [
+        (flows[collection], session_id, record)
+        for collection, session_id, record in _store().find_by_status(
+            list(flows), statuses
+        )
+    ]
+
+
+def count_sessions() -> Dict[Tuple[str, str], int]:
+    """{(flow, status): number of sessions} across every flow, in one read."""
+    flows = {collection: flow for flow, (collection, _) in FLOWS.items()}
+    counts: Dict[Tuple[str, str], int] = {}
+    for (collection, status), count in _store().count_by_status(list(flows)).items():
+        key = (flows[collection], status or "unknown")
+        counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def iter_user_sessions() -> Iterator[Tuple[str, Dict[str, Dict[str, Any]]]]:
+    """Yield (user_id, {session_id: {"flow", "created_at"}}) for every user."""
+    for user_id, record in _store().scan("user_sessions"):
+        yield user_id, record.get("sessions", {})
+
+
+def sweep_blobs(min_age: float = 3600.0) -> Tuple[int, int]:
+    """
+    Delete blobs no longer referenced by any result record and older than
+    ``min_age`` seconds. Returns (blobs removed, bytes reclaimed).
+    """
+    keep = set()
+    for _, result_collections in FLOWS.values():
+        for collection in result_collections:
+            for _, record in _store().scan(collection):
+                values = record.values() if isinstance(record, dict) else []
+                for value in [record, *values]:
+                    if is_blob_ref(value):
+                        keep.add(value["$blob"])
+    return _blobs().sweep(keep, min_age)
+
 
-    update_db(db)  # Save any new keys added
-    return db
+def read_db() -> Dict[str, Any]:
+    """Load the entire database. Read-only; large payloads appear as blob refs."""
+    return _store().dump()
 
 
 def update_db(db: Dict[str, Any]) -> None:
-    """Persist the given database state to disk."""
-    with open(DB_FILENAME, "w") as f:
-        json.dump(db, f, indent=4, default=str)
+    """
+    Replace the entire database with ``db``.
+
+    A read_db()/update_db() pair is not atomic across processes; use the
+    save_*/set_session_status helpers or transaction() for updates.
+    """
+    _store().load(db)
+
+
+def set_session_status(
+    collection: str, session_id: str, status: str, error: Optional[str] = None
+) -> None:
+    """
+    Atomically set a session's status (and error message) in place. Raises
+    SessionClosed if the session already finished: completed, failed and
+    cancelled are final.
+    """
+    fields = {"status": status}
+    if error is not None:
+        fields["error"] = error
+    _write(
+        [
+            _still_active(collection, session_id),
+            (UPDATE, collection, session_id, fields),
+        ],
+        f"Session {session_id} not found in {collection}",
+    )
 
 
 #
@@ -56,105 +513,138 @@ def update_db(db: Dict[str, Any]) -> None:
 #
 def create_user(user_data: Dict[str, Any]) -> str:
     """Register a new user and return its user_id."""
-    db = read_db()
     user_id = str(uuid.uuid4())
-    db["users"][user_id] = user_data
-    update_db(db)
+    _write([(PUT, "users", user_id, user_data)])
     return user_id
 
 
 def get_user(user_id: str) -> Dict[str, Any]:
     """Retrieve a user record, or raise if not found."""
-    db = read_db()
-    if user_id not in db["users"]:
-        raise KeyError(f"User {user_id} not found")
-    return db["users"][user_id]
+    return _get("users", user_id, f"User {user_id} not found")
 
 
 def update_user(user_id: str, updates: Dict[str, Any]) -> None:
     """Apply updates to an existing user."""
-    db = read_db()
-    if user_id not in db["users"]:
-        raise KeyError(f"User {user_id} not found")
-    db["users"][user_id].update(updates)
-    update_db(db)
+    _write([(UPDATE, "users", user_id, updates)], f"User {user_id} not found")
 
 
 def delete_user(user_id: str) -> None:
     """Remove a user and all their related sessions/results."""
-    db = read_db()
-    db["users"].pop(user_id, None)
-    # also cascade‐delete any sessions/results for that user
-    for collection in (
-        "essay_writing_sessions",
-        "essay_results",
-        "program_analysis_sessions",
-        "raw_admissions_data",
-        "structured_admissions_data",
-        "program_comparison_reports",
-    ):
-        to_remove = [
-            sid
-            for sid, record in db.get(collection, {}).items()
-            if record.get("user_id") == user_id
-        ]
-        for sid in to_remove:
-            db[collection].pop(sid, None)
-    update_db(db)
+    try:
+        sessions = _store().get("user_sessions", user_id)["sessions"]
+    except MissingRecord:
+        sessions = {}
+    ops = [
+        (DELETE, "users", user_id, None),
+        (DELETE, "user_sessions", user_id, None),
+    ]
+    # also cascade‐delete every session/result for that user via the index
+    for session_id, entry in sessions.items():
+        collection, result_collections = FLOWS[entry["flow"]]
+        for c in [collection] + result_collections:
+            ops.append((DELETE, c, session_id, None))
+    _write(ops)
+
+
+def list_user_sessions(
+    user_id: str,
+    flow: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    List a user's sessions, newest first, optionally filtered by flow/status.
+    Returns (page, next_cursor); next_cursor is None on the last page.
+    """
+    if flow is not None and flow not in FLOWS:
+        raise ValueError(f"Unknown flow: {flow}")
+    try:
+        sessions = _store().get("user_sessions", user_id)["sessions"]
+    except MissingRecord:
+        return [], None
+
+    entries = sorted(
+        (
+            (entry.get("created_at") or "", session_id, entry["flow"])
+            for session_id, entry in sessions.items()
+            if flow is None or entry["flow"] == flow
+        ),
+        reverse=True,
+    )
+    if cursor is not None:
+        after = _decode_cursor(cursor)
+        entries = [e for e in entries if (e[0], e[1]) < after]
+
+    # one read for every candidate's current status
+    records = _store().get_many([(FLOWS[f][0], sid) for _, sid, f in entries])
+    page = []
+    for created_at, session_id, f in entries:
+        record = records.get((FLOWS[f][0], session_id))
+        if record is None or (status is not None and record.get("status") != status):
+            continue
+        if len(page) == limit:
+            last = page[-1]
+            return page, _encode_cursor(last["created_at"], last["session_id"])
+        page.append(
+            {
+                "session_id": session_id,
+                "flow": f,
+                "status": record.get("status"),
+                "created_at": created_at,
+            }
+        )
+    return page, None
 
 
 def create_essay_session(user_id: str, essay_text: str, target_university: str) -> str:
     """Start a new essay-writing session and return its session_id."""
-    db = read_db()
-    session_id = str(uuid.uuid4())
-    db["essay_writing_sessions"][session_id] = {
+    record = {
         "user_id": user_id,
         "essay_text": essay_text,
         "target_university": target_university,
         "created_at": datetime.datetime.utcnow().isoformat(),
         "status": "pending",
     }
-    update_db(db)
-    return session_id
+    return _create_session("essay", record)
 
 
 def get_essay_session(session_id: str) -> Dict[str, Any]:
     """Fetch essay-writing session details."""
-    db = read_db()
-    if session_id not in db["essay_writing_sessions"]:
-        raise KeyError(f"Essay session {session_id} not found")
-    return db["essay_writing_sessions"][session_id]
+    return _get(
+        "essay_writing_sessions", session_id, f"Essay session {session_id} not found"
+    )
 
 
 def save_essay_results(session_id: str, outline: Any, refined_draft: str) -> None:
     """Store outline and refined draft, and mark the session completed."""
-    db = read_db()
-    if session_id not in db["essay_writing_sessions"]:
-        raise KeyError(f"Essay session {session_id} not found")
-    db["essay_results"][session_id] = {
-        "outline": outline,
-        "refined_draft": refined_draft,
+    results = {
+        "outline": _offload(outline),
+        "refined_draft": _offload(refined_draft),
         "completed_at": datetime.datetime.utcnow().isoformat(),
     }
-    # mark session completed
-    db["essay_writing_sessions"][session_id]["status"] = "completed"
-    update_db(db)
+    _write(
+        [
+            _still_active("essay_writing_sessions", session_id),
+            (PUT, "essay_results", session_id, results),
+            # mark session completed
+            (UPDATE, "essay_writing_sessions", session_id, {"status": "completed"}),
+        ],
+        f"Essay session {session_id} not found",
+    )
 
 
 def get_essay_results(session_id: str) -> Dict[str, Any]:
     """Retrieve saved essay results (outline + refined draft)."""
-    db = read_db()
-    if session_id not in db["essay_results"]:
-        raise KeyError(f"No results for essay session {session_id}")
-    return db["essay_results"][session_id]
+    results = _get(
+        "essay_results", session_id, f"No results for essay session {session_id}"
+    )
+    return {key: _inline(value) for key, value in results.items()}
 
 
 def delete_essay_session(session_id: str) -> None:
     """Delete an essay-writing session and its results."""
-    db = read_db()
-    db["essay_writing_sessions"].pop(session_id, None)
-    db["essay_results"].pop(session_id, None)
-    update_db(db)
+    _delete_session("essay", session_id)
 
 
 #
@@ -164,96 +654,98 @@ def create_program_analysis_session(
     user_id: str, university_list: List[str], criteria: List[str]
 ) -> str:
     """Start a new program-analysis session."""
-    db = read_db()
-    session_id = str(uuid.uuid4())
-    db["program_analysis_sessions"][session_id] = {
+    record = {
         "user_id": user_id,
         "university_list": university_list,
         "comparison_criteria": criteria,
         "created_at": datetime.datetime.utcnow().isoformat(),
         "status": "pending",
     }
-    update_db(db)
-    return session_id
+    return _create_session("program-analysis", record)
 
 
 def get_program_analysis_session(session_id: str) -> Dict[str, Any]:
     """Fetch a program-analysis session record."""
-    db = read_db()
-    if session_id not in db["program_analysis_sessions"]:
-        raise KeyError(f"Analysis session {session_id} not found")
-    return db["program_analysis_sessions"][session_id]
+    return _get(
+        "program_analysis_sessions",
+        session_id,
+        f"Analysis session {session_id} not found",
+    )
 
 
 def save_raw_admissions_data(session_id: str, raw_data: Any) -> None:
     """Store scraped admissions data for a session."""
-    db = read_db()
-    if session_id not in db["program_analysis_sessions"]:
-        raise KeyError(f"Analysis session {session_id} not found")
-    db["raw_admissions_data"][session_id] = raw_data
-    update_db(db)
+    _write(
+        [
+            _still_active("program_analysis_sessions", session_id),
+            (PUT, "raw_admissions_data", session_id, _offload(raw_data)),
+        ],
+        f"Analysis session {session_id} not found",
+    )
 
 
 def get_raw_admissions_data(session_id: str) -> Any:
     """Retrieve stored raw admissions data."""
-    db = read_db()
-    if session_id not in db["raw_admissions_data"]:
-        raise KeyError(f"No raw data for session {session_id}")
-    return db["raw_admissions_data"][session_id]
+    return _inline(
+        _get("raw_admissions_data", session_id, f"No raw data for session {session_id}")
+    )
 
 
 def save_structured_admissions_data(session_id: str, structured: Any) -> None:
     """Store processed admissions data for a session."""
-    db = read_db()
-    if session_id not in db["program_analysis_sessions"]:
-        raise KeyError(f"Analysis session {session_id} not found")
-    db["structured_admissions_data"][session_id] = structured
-    update_db(db)
+    _write(
+        [
+            _still_active("program_analysis_sessions", session_id),
+            (PUT, "structured_admissions_data", session_id, _offload(structured)),
+        ],
+        f"Analysis session {session_id} not found",
+    )
 
 
 def get_structured_admissions_data(session_id: str) -> Any:
     """Retrieve stored structured admissions data."""
-    db = read_db()
-    if session_id not in db["structured_admissions_data"]:
-        raise KeyError(f"No structured data for session {session_id}")
-    return db["structured_admissions_data"][session_id]
+    return _inline(
+        _get(
+            "structured_admissions_data",
+            session_id,
+            f"No structured data for session {session_id}",
+        )
+    )
 
 
 def save_program_comparison_report(session_id: str, report: Any) -> None:
     """Store final comparison report for a session."""
-    db = read_db()
-    if session_id not in db["program_analysis_sessions"]:
-        raise KeyError(f"Analysis session {session_id} not found")
-    db["program_comparison_reports"][session_id] = report
-    db["program_analysis_sessions"][session_id]["status"] = "completed"
-    update_db(db)
+    _write(
+        [
+            _still_active("program_analysis_sessions", session_id),
+            (PUT, "program_comparison_reports", session_id, _offload(report)),
+            (UPDATE, "program_analysis_sessions", session_id, {"status": "completed"}),
+        ],
+        f"Analysis session {session_id} not found",
+    )
 
 
 def get_program_comparison_report(session_id: str) -> Any:
     """Retrieve stored program comparison report."""
-    db = read_db()
-    if session_id not in db["program_comparison_reports"]:
-        raise KeyError(f"No comparison report for session {session_id}")
-    return db["program_comparison_reports"][session_id]
+    return _inline(
+        _get(
+            "program_comparison_reports",
+            session_id,
+            f"No comparison report for session {session_id}",
+        )
+    )
 
 
 def delete_program_analysis_session(session_id: str) -> None:
     """Delete a program-analysis session and its associated data."""
-    db = read_db()
-    db["program_analysis_sessions"].pop(session_id, None)
-    db["raw_admissions_data"].pop(session_id, None)
-    db["structured_admissions_data"].pop(session_id, None)
-    db["program_comparison_reports"].pop(session_id, None)
-    update_db(db)
+    _delete_session("program-analysis", session_id)
 
 
 # dynamic checklist
 def create_checklist_session(
     user_id: str, nationality: str, program_level: str, university_list: List[str]
 ) -> str:
-    db = read_db()
-    session_id = str(uuid.uuid4())
-    db["checklist_sessions"][session_id] = {
+    record = {
         "user_id": user_id,
         "nationality": nationality,
         "program_level": program_level,
@@ -261,41 +753,39 @@ def create_checklist_session(
         "created_at": datetime.datetime.utcnow().isoformat(),
         "status": "pending",
     }
-    update_db(db)
-    return session_id
+    return _create_session("checklist", record)
 
 
 def get_checklist_session(session_id: str) -> Dict[str, Any]:
-    db = read_db()
-    if session_id not in db["checklist_sessions"]:
-        raise KeyError(f"Checklist session {session_id} not found")
-    return db["checklist_sessions"][session_id]
+    return _get(
+        "checklist_sessions", session_id, f"Checklist session {session_id} not found"
+    )
 
 
 def save_dynamic_checklist(session_id: str, checklist: Any) -> None:
-    db = read_db()
-    if session_id not in db["checklist_sessions"]:
-        raise KeyError(f"Checklist session {session_id} not found")
-    db["dynamic_checklists"][session_id] = {
-        "checklist": checklist,
+    results = {
+        "checklist": _offload(checklist),
         "completed_at": datetime.datetime.utcnow().isoformat(),
     }
-    db["checklist_sessions"][session_id]["status"] = "completed"
-    update_db(db)
+    _write(
+        [
+            _still_active("checklist_sessions", session_id),
+            (PUT, "dynamic_checklists", session_id, results),
+            (UPDATE, "checklist_sessions", session_id, {"status": "completed"}),
+        ],
+        f"Checklist session {session_id} not found",
+    )
 
 
 def get_dynamic_checklist(session_id: str) -> Dict[str, Any]:
-    db = read_db()
-    if session_id not in db["dynamic_checklists"]:
-        raise KeyError(f"No checklist for session {session_id}")
-    return db["dynamic_checklists"][session_id].get("checklist")
+    results = _get(
+        "dynamic_checklists", session_id, f"No checklist for session {session_id}"
+    )
+    return _inline(results.get("checklist"))
 
 
 def delete_checklist_session(session_id: str) -> None:
-    db = read_db()
-    db["checklist_sessions"].pop(session_id, None)
-    db["dynamic_checklists"].pop(session_id, None)
-    update_db(db)
+    _delete_session("checklist", session_id)
 
 
 # cost breakdown
@@ -307,11 +797,7 @@ def create_cost_breakdown_session(
     location: str,
     preferences: str,
 ) -> str:
-    db = read_db()
-
-    session_id = str(uuid.uuid4())
-
-    db["cost_breakdown_sessions"][session_id] = {
+    record = {
         "user_id": user_id,
         "university": university,
         "course": course,
@@ -322,42 +808,43 @@ def create_cost_breakdown_session(
         "status": "pending",
     }
 
-    update_db(db)
-    return session_id
+    return _create_session("cost-breakdown", record)
 
 
 def get_cost_breakdown_session(session_id: str) -> Dict[str, Any]:
-    db = read_db()
-    if session_id not in db.get("cost_breakdown_sessions", {}):
-        raise KeyError(f"Cost breakdown session {session_id} not found")
-    return db["cost_breakdown_sessions"][session_id]
+    return _get(
+        "cost_breakdown_sessions",
+        session_id,
+        f"Cost breakdown session {session_id} not found",
+    )
 
 
 def save_cost_breakdown(session_id: str, breakdown: Dict[str, Any]) -> None:
-    db = read_db()
-    if session_id not in db.get("cost_breakdown_sessions", {}):
-        raise KeyError(f"Cost breakdown session {session_id} not found")
-
-    db["cost_breakdown_results"][session_id] = {
-        "breakdown": breakdown,
+    results = {
+        "breakdown": _offload(breakdown),
         "completed_at": datetime.datetime.utcnow().isoformat(),
     }
-    db["cost_breakdown_sessions"][session_id]["status"] = "completed"
-    update_db(db)
+    _write(
+        [
+            _still_active("cost_breakdown_sessions", session_id),
+            (PUT, "cost_breakdown_results", session_id, results),
+            (UPDATE, "cost_breakdown_sessions", session_id, {"status": "completed"}),
+        ],
+        f"Cost breakdown session {session_id} not found",
+    )
 
 
 def get_cost_breakdown(session_id: str) -> Dict[str, Any]:
-    db = read_db()
-    if session_id not in db.get("cost_breakdown_results", {}):
-        raise KeyError(f"No cost breakdown for session {session_id}")
-    return db["cost_breakdown_results"][session_id].get("breakdown")
+    results = _get(
+        "cost_breakdown_results",
+        session_id,
+        f"No cost breakdown for session {session_id}",
+    )
+    return _inline(results.get("breakdown"))
 
 
 def delete_cost_breakdown_session(session_id: str) -> None:
-    db = read_db()
-    db.get("cost_breakdown_sessions", {}).pop(session_id, None)
-    db.get("cost_breakdown_results", {}).pop(session_id, None)
-    update_db(db)
+    _delete_session("cost-breakdown", session_id)
 
 
 def create_timeline_session(
@@ -369,9 +856,7 @@ def create_timeline_session(
     intake: str,
     applicant_availability: Optional[str],
 ) -> str:
-    db = read_db()
-    session_id = str(uuid.uuid4())
-    db["timeline_sessions"][session_id] = {
+    record = {
         "user_id": user_id,
         "universities": universities,
         "level": level,
@@ -382,49 +867,47 @@ def create_timeline_session(
         "created_at": datetime.datetime.utcnow().isoformat(),
         "status": "pending",
     }
-    update_db(db)
-    return session_id
+    return _create_session("timeline", record)
 
 
 def get_timeline_session(session_id: str) -> Dict[str, Any]:
-    db = read_db()
-    if session_id not in db["timeline_sessions"]:
-        raise KeyError(f"Timeline session {session_id} not found")
-    return db["timeline_sessions"][session_id]
+    return _get(
+        "timeline_sessions", session_id, f"Timeline session {session_id} not found"
+    )
 
 
 def save_timeline(session_id: str, deadlines: Any, timeline: Any) -> None:
-    db = read_db()
-    if session_id not in db["timeline_sessions"]:
-        raise KeyError(f"Timeline session {session_id} not found")
-    db["timeline_results"][session_id] = {
-        "deadlines": deadlines,
-        "timeline": timeline,
+    results = {
+        "deadlines": _offload(deadlines),
+        "timeline": _offload(timeline),
         "completed_at": datetime.datetime.utcnow().isoformat(),
     }
-    db["timeline_sessions"][session_id]["status"] = "completed"
-    update_db(db)
+    _write(
+        [
+            _still_active("timeline_sessions", session_id),
+            (PUT, "timeline_results", session_id, results),
+            (UPDATE, "timeline_sessions", session_id, {"status": "completed"}),
+        ],
+        f"Timeline session {session_id} not found",
+    )
 
 
 def get_deadline_data(session_id: str) -> Any:
-    db = read_db()
-    if session_id not in db["timeline_results"]:
-        raise KeyError(f"No deadlines for session {session_id}")
-    return db["timeline_results"][session_id].get("deadlines")
+    results = _get(
+        "timeline_results", session_id, f"No deadlines for session {session_id}"
+    )
+    return _inline(results.get("deadlines"))
 
 
 def get_timeline(session_id: str) -> Any:
-    db = read_db()
-    if session_id not in db["timeline_results"]:
-        raise KeyError(f"No timeline for session {session_id}")
-    return db["timeline_results"][session_id].get("timeline")
+    results = _get(
+        "timeline_results", session_id, f"No timeline for session {session_id}"
+    )
+    return _inline(results.get("timeline"))
 
 
 def delete_timeline_session(session_id: str) -> None:
-    db = read_db()
-    db["timeline_sessions"].pop(session_id, None)
-    db["timeline_results"].pop(session_id, None)
-    update_db(db)
+    _delete_session("timeline", session_id)
 
 
 def create_interview_prep_session(
@@ -433,10 +916,7 @@ def create_interview_prep_session(
     course_name: str,
     program_level: str,
 ) -> str:
-    db = read_db()
-    session_id = str(uuid.uuid4())
-
-    db["interview_prep_sessions"][session_id] = {
+    record = {
         "user_id": user_id,
         "university_name": university_name,
         "course_name": course_name,
@@ -445,39 +925,93 @@ def create_interview_prep_session(
         "status": "pending",
     }
 
-    update_db(db)
-    return session_id
+    return _create_session("interview-prep", record)
 
 
 def get_interview_prep_session(session_id: str) -> Dict[str, Any]:
-    db = read_db()
-    if session_id not in db.get("interview_prep_sessions", {}):
-        raise KeyError(f"Interview prep session {session_id} not found")
-    return db["interview_prep_sessions"][session_id]
+    return _get(
+        "interview_prep_sessions",
+        session_id,
+        f"Interview prep session {session_id} not found",
+    )
 
 
 def save_interview_prep(session_id: str, Interview_QA: Dict[str, Any]) -> None:
-    db = read_db()
-    if session_id not in db.get("interview_prep_sessions", {}):
-        raise KeyError(f"Interview prep session {session_id} not found")
-
-    db["interview_prep_results"][session_id] = {
-        "Interview_QA": Interview_QA,
+    results = {
+        "Interview_QA": _offload(Interview_QA),
         "completed_at": datetime.datetime.utcnow().isoformat(),
     }
-    db["interview_prep_sessions"][session_id]["status"] = "completed"
-    update_db(db)
+    _write(
+        [
+            _still_active("interview_prep_sessions", session_id),
+            (PUT, "interview_prep_results", session_id, results),
+            (UPDATE, "interview_prep_sessions", session_id, {"status": "completed"}),
+        ],
+        f"Interview prep session {session_id} not found",
+    )
 
 
 def get_interview_prep(session_id: str) -> Dict[str, Any]:
-    db = read_db()
-    if session_id not in db.get("interview_prep_results", {}):
-        raise KeyError(f"No interview prep data for session {session_id}")
-    return db["interview_prep_results"][session_id].get("Interview_QA")
+    results = _get(
+        "interview_prep_results",
+        session_id,
+        f"No interview prep data for session {session_id}",
+    )
+    return _inline(results.get("Interview_QA"))
 
 
 def delete_interview_prep_session(session_id: str) -> None:
-    db = read_db()
-    db.get("interview_prep_sessions", {}).pop(session_id, None)
-    db.get("interview_prep_results", {}).pop(session_id, None)
-    update_db(db)
+    _delete_session("interview-prep", session_id)
+
+
+#
+# Sentiment analysis
+#
+def create_sentiment_session(user_id: str, reviews: List[str]) -> str:
+    """Start a new sentiment-analysis session and return its session_id."""
+    record = {
+        "user_id": user_id,
+        "reviews": reviews,
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "status": "pending",
+    }
+    return _create_session("sentiment", record)
+
+
+def get_sentiment_session(session_id: str) -> Dict[str, Any]:
+    return _get(
+        "sentiment_sessions", session_id, f"Sentiment session {session_id} not found"
+    )
+
+
+def save_sentiment_result(session_id: str, result: Dict[str, Any]) -> None:
+    """Store {"reddit_posts", "summary"} and mark the session completed."""
+    results = {
+        "reddit_posts": _offload(result["reddit_posts"]),
+        "summary": _offload(result["summary"]),
+        "completed_at": datetime.datetime.utcnow().isoformat(),
+    }
+    _write(
+        [
+            _still_active("sentiment_sessions", session_id),
+            (PUT, "sentiment_results", session_id, results),
+            (UPDATE, "sentiment_sessions", session_id, {"status": "completed"}),
+        ],
+        f"Sentiment session {session_id} not found",
+    )
+
+
+def get_sentiment_result(session_id: str) -> Dict[str, Any]:
+    results = _get(
+        "sentiment_results",
+        session_id,
+        f"No sentiment result for session {session_id}",
+    )
+    return {
+        "reddit_posts": _inline(results["reddit_posts"]),
+        "summary": _inline(results["summary"]),
+    }
+
+
+def delete_sentiment_session(session_id: str) -> None:
+    _delete_session("sentiment", session_id)
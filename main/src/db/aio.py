@@ -0,0 +1,64 @@
+"""
+Async variants of the db read API for ``async def`` endpoints.
+
+Store I/O is blocking, so each call runs on a small executor dedicated to
+the datastore instead of the event loop or anyio's shared threadpool. A
+burst of status polls then queues here for a few milliseconds each rather
+than pinning one request thread apiece.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import db
+
+# Datastore calls are short; a few threads keep up with many pollers
+IO_THREADS = int(os.getenv("AICE_DB_IO_THREADS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="aice-db")
+
+
+async def run(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking db function on the datastore executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _async(fn: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+list_user_sessions = _async(db.list_user_sessions)
+get_sessions = _async(db.get_sessions)
+get_session_with_results = _async(db.get_session_with_results)
+
+get_essay_session = _async(db.get_essay_session)
+get_essay_results = _async(db.get_essay_results)
+
+get_program_analysis_session = _async(db.get_program_analysis_session)
+get_raw_admissions_data = _async(db.get_raw_admissions_data)
+get_structured_admissions_data = _async(db.get_structured_admissions_data)
+get_program_comparison_report = _async(db.get_program_comparison_report)
+
+get_checklist_session = _async(db.get_checklist_session)
+get_dynamic_checklist = _async(db.get_dynamic_checklist)
+
+get_cost_breakdown_session = _async(db.get_cost_breakdown_session)
+get_cost_breakdown = _async(db.get_cost_breakdown)
+
+get_timeline_session = _async(db.get_timeline_session)
+get_deadline_data = _async(db.get_deadline_data)
+get_timeline = _async(db.get_timeline)
+
+get_interview_prep_session = _async(db.get_interview_prep_session)
+get_interview_prep = _async(db.get_interview_prep)
+
+get_sentiment_session = _async(db.get_sentiment_session)
+get_sentiment_result = _async(db.get_sentiment_result)
@@ -0,0 +1,61 @@
+from typing import Any, Dict, Iterable, List, Protocol, Tuple
+
+from db.ops import Op
+
+
+class StorageBackend(Protocol):
+    """
+    What the db module needs from a store. Records are JSON-serialisable
+    values keyed by (collection, key); sessions, results, statuses and the
+    user index are all plain records on top of this.
+
+    Every backend must pass ``python -m db.conformance``.
+    """
+
+    collections: List[str]
+
+    def create_collections(self, collections: List[str]) -> None:
+        """Make sure each collection exists. Idempotent."""
+
+    def schema_version(self) -> int:
+        """Last migration applied, 0 for a new store."""
+
+    def set_schema_version(self, version: int) -> None: ...
+
+    def get(self, collection: str, key: str) -> Any:
+        """Return a private copy of one record; raise MissingRecord if absent."""
+
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        """Return the present records among (collection, key) pairs, in one read."""
+
+    def scan(self, collection: str) -> List[Tuple[str, Any]]:
+        """Return every (key, record) in a collection."""
+
+    def count_by_status(self, collections: List[str]) -> Dict[Tuple[str, Any], int]:
+        """
+        {(collection, status): records} over ``collections`` in one read;
+        status is None for records without one.
+        """
+
+    def find_by_status(
+        self, collections: List[str], statuses: List[str]
+    ) -> List[Tuple[str, str, Any]]:
+        """
+        (collection, key, record) for every record in ``collections`` whose
+        status is in ``statuses``, in one read.
+        """
+
+    def apply(self, ops: Iterable[Op]) -> None:
+        """
+        Apply ops all-or-nothing; raise MissingRecord for a missing target and
+        Conflict for a failed REQUIRE condition.
+        """
+
+    def dump(self) -> Dict[str, Any]:
+        """Return the whole store as {collection: {key: record}}."""
+
+    def load(self, db: Dict[str, Any]) -> None:
+        """Replace the whole store with ``db``."""
+
+    def close(self) -> None:
+        """Stop background work and release handles; the store is not reused."""
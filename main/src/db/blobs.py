@@ -0,0 +1,136 @@
+import contextlib
+import functools
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+BLOB_REF_KEY = "$blob"
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and BLOB_REF_KEY in value
+
+
+def encode(value: Any) -> bytes:
+    """JSON encoding a blob stores; keeps the payload's key order."""
+    return json.dumps(value, default=str).encode("utf-8")
+
+
+def content_hash(value: Any) -> str:
+    """Blob name: hash of the canonical (key-sorted) JSON encoding."""
+    canonical = json.dumps(value, default=str, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(canonical).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed, gzip-compressed JSON blobs: ``<directory>/<sha>.json.gz``.
+
+    Records hold ``{"$blob": sha}`` in place of the payload. Blobs are
+    immutable, so identical payloads share one file and decompressed reads
+    are cached.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._read = functools.lru_cache(maxsize=32)(self._read_uncached)
+
+    def path(self, sha: str) -> str:
+        return os.path.join(self.directory, f"{sha}.json.gz")
+
+    def put(self, value: Any, data: Optional[bytes] = None) -> dict:
+        """
+        Store ``value`` (if not already present) and return its reference;
+        ``data`` is its encode(), if the caller already has it.
+        """
+        sha = content_hash(value)
+        path = self.path(sha)
+        try:
+            # make a present blob young again, so a sweep running now (whose
+            # keep set predates the record about to refer to it) spares it
+            os.utime(path)
+            return {BLOB_REF_KEY: sha}
+        except FileNotFoundError:
+            pass
+        os.makedirs(self.directory, exist_ok=True)
+        if data is None:
+            data = encode(value)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(data))
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        return {BLOB_REF_KEY: sha}
+
+    def get(self, sha: str) -> Any:
+        # parse on every call so callers never share a mutable cached value
+        return json.loads(self._read(sha))
+
+    def _read_uncached(self, sha: str) -> bytes:
+        with gzip.open(self.path(sha), "rb") as f:
+            return f.read()
+
+    def sweep(self, keep: Set[str], min_age: float) -> Tuple[int, int]:
+        """
+        Delete blobs not in ``keep`` that are older than ``min_age`` seconds
+        (younger ones may belong to a write still in flight). Returns
+        (blobs removed, bytes reclaimed).
+        """
+        removed = reclaimed = 0
+        if not os.path.isdir(self.directory):
+            return removed, reclaimed
+        cutoff = time.time() - min_age
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json.gz") or name[: -len(".json.gz")] in keep:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+                if st.st_mtime > cutoff:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            reclaimed += st.st_size
+        return removed, reclaimed
+
+
+class MemoryBlobStore:
+    """BlobStore stand-in that keeps blobs in process memory."""
+
+    def __init__(self):
+        self._blobs: Dict[str, bytes] = {}
+        # sha → time of its latest put, the stand-in for a blob file's mtime
+        self._written: Dict[str, float] = {}
+
+    def put(self, value: Any, data: Optional[bytes] = None) -> dict:
+        sha = content_hash(value)
+        if sha not in self._blobs:
+            self._blobs[sha] = encode(value) if data is None else data
+        self._written[sha] = time.time()
+        return {BLOB_REF_KEY: sha}
+
+    def get(self, sha: str) -> Any:
+        return json.loads(self._blobs[sha])
+
+    def sweep(self, keep: Set[str], min_age: float) -> Tuple[int, int]:
+        cutoff = time.time() - min_age
+        removed = [
+            sha
+            for sha in list(self._blobs)
+            if sha not in keep and self._written.get(sha, 0) <= cutoff
+        ]
+        reclaimed = 0
+        for sha in removed:
+            reclaimed += len(self._blobs.pop(sha))
+            self._written.pop(sha, None)
+        return len(removed), reclaimed
@@ -0,0 +1,418 @@
+"""
+Conformance suite every StorageBackend must pass.
+
+Store-level checks run against a fresh store from each factory in
+STORE_FACTORIES; API-level checks run the public db functions on top of
+each backend registered in db.BACKENDS.
+
+    cd main/src
+    python -m db.conformance [backend ...]
+
+Exits non-zero if any check fails. A new backend should be added to both
+db.BACKENDS and STORE_FACTORIES.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List
+
+import db
+from db.journal_store import JournalStore
+from db.json_store import JsonStore
+from db.memory_store import MemoryStore
+from db.ops import (
+    DELETE,
+    LINK,
+    PUT,
+    REQUIRE,
+    UNLINK,
+    UPDATE,
+    Conflict,
+    MissingRecord,
+)
+from db.sqlite_store import SQLiteStore
+
+COLLECTIONS = ["a", "b", "user_sessions"]
+
+# backend name → factory(directory) returning an empty, unmigrated store
+STORE_FACTORIES: Dict[str, Callable[[str], object]] = {
+    "json": lambda d: JsonStore(os.path.join(d, "db.json"), COLLECTIONS),
+    "journal": lambda d: JournalStore(
+        os.path.join(d, "db.json"), COLLECTIONS, compact_interval=None
+    ),
+    "sqlite": lambda d: SQLiteStore(os.path.join(d, "db.sqlite3"), COLLECTIONS),
+    "memory": lambda d: MemoryStore(COLLECTIONS),
+}
+
+
+def _raises_missing(fn: Callable[[], object]) -> None:
+    try:
+        fn()
+    except MissingRecord:
+        return
+    raise AssertionError("expected MissingRecord")
+
+
+#
+# Store-level checks
+#
+def check_schema_version(store) -> None:
+    assert store.schema_version() == 0
+    store.set_schema_version(3)
+    assert store.schema_version() == 3
+
+
+def check_put_get(store) -> None:
+    _raises_missing(lambda: store.get("a", "k"))
+    store.apply([(PUT, "a", "k", {"user_id": "u", "status": "pending", "n": [1]})])
+    assert store.get("a", "k") == {"user_id": "u", "status": "pending", "n": [1]}
+    store.apply([(PUT, "a", "none", None), (PUT, "a", "str", "text")])
+    assert store.get("a", "none") is None
+    assert store.get("a", "str") == "text"
+
+
+def check_get_returns_copy(store) -> None:
+    store.apply([(PUT, "a", "k", {"status": "pending"})])
+    store.get("a", "k")["status"] = "mutated"
+    assert store.get("a", "k")["status"] == "pending"
+
+
+def check_update_merges(store) -> None:
+    store.apply([(PUT, "a", "k", {"status": "pending", "x": 1})])
+    store.apply([(UPDATE, "a", "k", {"status": "failed", "error": "e"})])
+    assert store.get("a", "k") == {"status": "failed", "x": 1, "error": "e"}
+
+
+def check_missing_target_is_atomic(store) -> None:
+    for kind in (UPDATE, REQUIRE):
+        _raises_missing(
+            lambda: store.apply([(PUT, "b", "new", 1), (kind, "a", "nope", {})])
+        )
+        _raises_missing(lambda: store.get("b", "new"))
+
+
+def check_require_condition(store) -> None:
+    store.apply([(PUT, "a", "k", {"status": "pending"})])
+    pending_only = (REQUIRE, "a", "k", {"status": ["pending"]})
+    store.apply([pending_only, (UPDATE, "a", "k", {"status": "done"})])
+    assert store.get("a", "k")["status"] == "done"
+    try:
+        store.apply([pending_only, (PUT, "b", "new", 1)])
+    except Conflict:
+        pass
+    else:
+        raise AssertionError("expected Conflict")
+    _raises_missing(lambda: store.get("b", "new"))
+
+
+def check_delete(store) -> None:
+    store.apply([(PUT, "a", "k", 1), (PUT, "b", "k", 2)])
+    store.apply([(DELETE, "a", "k", None), (DELETE, "a", "absent", None)])
+    _raises_missing(lambda: store.get("a", "k"))
+    assert store.get("b", "k") == 2
+
+
+def check_link_unlink(store) -> None:
+    store.apply([(LINK, "user_sessions", "u", {"s1": {"flow": "essay"}})])
+    store.apply([(LINK, "user_sessions", "u", {"s2": {"flow": "timeline"}})])
+    assert set(store.get("user_sessions", "u")["sessions"]) == {"s1", "s2"}
+    store.apply([(UNLINK, "user_sessions", "u", ["s1"])])
+    assert store.get("user_sessions", "u")["sessions"] == {"s2": {"flow": "timeline"}}
+
+
+def check_get_many_and_scan(store) -> None:
+    store.apply([(PUT, "a", "1", 1), (PUT, "a", "2", 2), (PUT, "b", "1", "b1")])
+    found = store.get_many([("a", "1"), ("a", "missing"), ("b", "1")])
+    assert found == {("a", "1"): 1, ("b", "1"): "b1"}
+    assert sorted(store.scan("a")) == [("1", 1), ("2", 2)]
+
+
+def check_count_by_status(store) -> None:
+    store.apply(
+        [
+            (PUT, "a", "1", {"status": "pending"}),
+            (PUT, "a", "2", {"status": "pending"}),
+            (PUT, "a", "3", {"status": "failed"}),
+            (PUT, "a", "4", {"user_id": "u"}),
+            (PUT, "b", "1", {"status": "pending"}),
+        ]
+    )
+    assert store.count_by_status(["a"]) == {
+        ("a", "pending"): 2,
+        ("a", "failed"): 1,
+        ("a", None): 1,
+    }
+    assert store.count_by_status(["a", "b"])[("b", "pending")] == 1
+
+
+def check_find_by_status(store) -> None:
+    store.apply(
+        [
+            (PUT, "a", "1", {"status": "pending", "n": 1}),
+            (PUT, "a", "2", {"status": "completed"}),
+            (PUT, "a", "3", {"status": "in_progress"}),
+            (PUT, "a", "4", {"user_id": "u"}),
+            (PUT, "b", "1", {"status": "pending"}),
+        ]
+    )
+    found = store.find_by_status(["a", "b"], ["pending", "in_progress"])
+    assert sorted(found) == [
+        ("a", "1", {"status": "pending", "n": 1}),
+        ("a", "3", {"status": "in_progress"}),
+        ("b", "1", {"status": "pending"}),
+    ]
+    found[0][2]["n"] = 2
+    assert store.get("a", "1")["n"] == 1, "find_by_status returned a live record"
+
+
+def check_dump_load(store) -> None:
+    store.apply([(PUT, "a", "1", {"v": 1})])
+    snapshot = store.dump()
+    assert snapshot["a"] == {"1": {"v": 1}}
+    store.apply([(PUT, "a", "2", 2)])
+    store.load(snapshot)
+    _raises_missing(lambda: store.get("a", "2"))
+    assert store.get("a", "1") == {"v": 1}
+
+
+STORE_CHECKS = [
+    check_put_get,
+    check_get_returns_copy,
+    check_update_merges,
+    check_missing_target_is_atomic,
+    check_require_condition,
+    check_delete,
+    check_link_unlink,
+    check_get_many_and_scan,
+    check_count_by_status,
+    check_find_by_status,
+    check_dump_load,
+]
+
+
+#
+# Backend-specific checks, given an empty directory
+#
+def check_journal_crash_mid_compaction(directory: str) -> None:
+    # compaction dies after writing the new snapshot, before the new journal
+    store = STORE_FACTORIES["journal"](directory)
+    other = STORE_FACTORIES["journal"](directory)
+    store.create_collections(COLLECTIONS)
+    store.apply([(PUT, "a", "k", 1)])
+
+    def crash(generation: int) -> None:
+        raise OSError("simulated crash")
+
+    store._reset_journal = crash
+    try:
+        store.compact()
+    except OSError:
+        pass
+    del store._reset_journal
+
+    def within(fn: Callable[[], object], what: str) -> object:
+        result: List[object] = []
+        thread = threading.Thread(target=lambda: result.append(fn()), daemon=True)
+        thread.start()
+        thread.join(10)
+        assert result, f"{what} hangs after a crashed compaction"
+        return result[0]
+
+    assert within(lambda: store.get("a", "k"), "reading") == 1
+    # writes acknowledged after the crash must survive finishing it
+    other.apply([(PUT, "a", "k2", 2)])
+    store.apply([(PUT, "a", "k3", 3)])
+    expected = [("k", 1), ("k2", 2), ("k3", 3)]
+    reopened = within(lambda: STORE_FACTORIES["journal"](directory), "reopening")
+    assert sorted(reopened.scan("a")) == expected
+    assert sorted(other.scan("a")) == expected
+    reopened.apply([(PUT, "a", "k4", 4)])
+    assert store.get("a", "k4") == 4
+    assert sorted(other.scan("a")) == expected + [("k4", 4)]
+
+
+def check_journal_reader_during_write(directory: str) -> None:
+    # a reader that must finish another process's crashed compaction while
+    # a writer in its own process waits to append
+    store = STORE_FACTORIES["journal"](directory)
+    other = STORE_FACTORIES["journal"](directory)
+    store.create_collections(COLLECTIONS)
+    other.apply([(PUT, "a", "k", 1)])
+    other.compact()
+    other._reset_journal = lambda generation: None
+    other.compact()
+    writer = threading.Thread(
+        target=lambda: store.apply([(PUT, "a", "k2", 2)]), daemon=True
+    )
+    result: List[object] = []
+
+    def read_while_writing() -> None:
+        with store._mutex:
+            writer.start()
+            time.sleep(0.1)  # let the writer take whatever it takes first
+            result.append(store.get("a", "k"))
+        writer.join()
+
+    reader = threading.Thread(target=read_while_writing, daemon=True)
+    reader.start()
+    reader.join(10)
+    assert result == [1] and not writer.is_alive(), "reader and writer deadlocked"
+    assert store.get("a", "k2") == 2
+
+
+def check_journal_close_stops_compactor(directory: str) -> None:
+    path = os.path.join(directory, "db.json")
+    store = JournalStore(path, COLLECTIONS, compact_interval=60)
+    compactor = store._compactor
+    assert compactor.is_alive()
+    store.close()
+    assert not compactor.is_alive(), "compactor still running after close()"
+
+
+# backend name → checks only that backend needs
+BACKEND_CHECKS: Dict[str, List[Callable[[str], None]]] = {
+    "journal": [
+        check_journal_crash_mid_compaction,
+        check_journal_reader_during_write,
+        check_journal_close_stops_compactor,
+    ],
+}
+
+
+#
+# API-level checks (run through the public db functions)
+#
+def check_api_session_lifecycle() -> None:
+    sid = db.create_timeline_session("u", ["X"], "ug", "intl", "LK", "fall", None)
+    assert db.get_timeline_session(sid)["status"] == "pending"
+    db.set_session_status("timeline_sessions", sid, "in_progress")
+    db.save_timeline(sid, {"d": 1}, ["step"] * 500)  # large enough to be a blob
+    assert db.get_timeline_session(sid)["status"] == "completed"
+    assert db.get_timeline(sid) == ["step"] * 500
+    assert db.get_deadline_data(sid) == {"d": 1}
+    db.delete_timeline_session(sid)
+    try:
+        db.get_timeline_session(sid)
+    except KeyError:
+        return
+    raise AssertionError("session survived delete")
+
+
+def check_api_final_status() -> None:
+    sid = db.create_checklist_session("u", "LK", "ug", [])
+    db.set_session_status("checklist_sessions", sid, "cancelled")
+    for write in (
+        lambda: db.set_session_status("checklist_sessions", sid, "in_progress"),
+        lambda: db.save_dynamic_checklist(sid, {"item": 1}),
+    ):
+        try:
+            write()
+        except db.SessionClosed:
+            continue
+        raise AssertionError("wrote over a finished session")
+    assert db.get_checklist_session(sid)["status"] == "cancelled"
+    assert db.get_session_with_results("checklist", sid)[1] == {}
+
+
+def check_api_transaction() -> None:
+    sid = db.create_program_analysis_session("u", ["X"], ["fees"])
+    try:
+        with db.transaction():
+            db.save_raw_admissions_data(sid, {"raw": 1})
+            db.save_structured_admissions_data("missing", {})
+    except KeyError:
+        pass
+    try:
+        db.get_raw_admissions_data(sid)
+        raise AssertionError("partial transaction was committed")
+    except KeyError:
+        pass
+
+
+def check_api_user_index() -> None:
+    ids = [db.create_checklist_session("v", "LK", "ug", []) for _ in range(5)]
+    page, cursor = db.list_user_sessions("v", limit=3)
+    rest, end = db.list_user_sessions("v", limit=3, cursor=cursor)
+    assert end is None
+    assert {s["session_id"] for s in page + rest} == set(ids)
+    db.delete_user("v")
+    assert db.list_user_sessions("v") == ([], None)
+
+
+def check_api_session_with_results() -> None:
+    sid = db.create_essay_session("u", "text", "Uni")
+    assert db.get_session_with_results("essay", sid)[1] == {}
+    db.save_essay_results(sid, {"intro": ["point"] * 200}, "draft")
+    session, results = db.get_session_with_results("essay", sid)
+    assert session["status"] == "completed"
+    assert results["essay_results"]["outline"] == {"intro": ["point"] * 200}
+
+
+def check_api_blob_sweep_spares_young() -> None:
+    # a blob written by a save that has not yet committed its reference
+    ref = db._offload(["pending"] * 500)
+    assert db.sweep_blobs(min_age=60) == (0, 0)
+    assert db._inline(ref) == ["pending"] * 500
+    assert db.sweep_blobs(min_age=0)[0] == 1
+
+
+def check_api_blob_keeps_key_order() -> None:
+    expenses = {"tuition": 1, "housing": 2, "books": 3, "pad": ["x"] * 500}
+    value = db._inline(db._offload(expenses))
+    assert list(value) == list(expenses), "blob reordered the payload's keys"
+    # payloads equal as JSON still share one blob
+    reordered = dict(reversed(list(expenses.items())))
+    assert db._offload(reordered) == db._offload(expenses)
+
+
+API_CHECKS = [
+    check_api_session_lifecycle,
+    check_api_final_status,
+    check_api_transaction,
+    check_api_user_index,
+    check_api_session_with_results,
+    check_api_blob_sweep_spares_young,
+    check_api_blob_keeps_key_order,
+]
+
+
+def run(backends: List[str]) -> int:
+    """Run every check against each backend; return the number of failures."""
+    failures = 0
+    for backend in backends:
+        checks = [(c.__name__, c, True) for c in [check_schema_version] + STORE_CHECKS]
+        checks += [(c.__name__, c, False) for c in API_CHECKS]
+        checks += [(c.__name__, c, None) for c in BACKEND_CHECKS.get(backend, [])]
+        for name, check, store_level in checks:
+            with tempfile.TemporaryDirectory() as directory:
+                try:
+                    if store_level is None:
+                        check(directory)
+                    elif store_level:
+                        store = STORE_FACTORIES[backend](directory)
+                        try:
+                            if check is not check_schema_version:
+                                store.create_collections(COLLECTIONS)
+                            check(store)
+                        finally:
+                            store.close()
+                    else:
+                        db.use_backend(backend, directory)
+                        try:
+                            check()
+                        finally:
+                            db.close()
+                    print(f"PASS {backend:8} {name}")
+                except Exception:
+                    failures += 1
+                    print(f"FAIL {backend:8} {name}")
+                    traceback.print_exc()
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run(sys.argv[1:] or list(STORE_FACTORIES)) else 0)
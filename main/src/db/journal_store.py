@@ -0,0 +1,327 @@
+import contextlib
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from db.json_store import SCHEMA_VERSION_KEY, JsonStore
+from db.ops import (
+    Conflict,
+    MissingRecord,
+    Op,
+    apply_ops,
+    check_ops,
+    count_by_status,
+    find_by_status,
+)
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "_journal_generation"
+# byte offset of the previous generation's journal folded into a snapshot
+FOLDED_KEY = "_journal_folded"
+# How often the background compactor wakes up, in seconds
+COMPACT_INTERVAL = 60.0
+# Compact once the journal has grown past this many bytes
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+def _replay(db: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """Apply one journal entry to ``db``."""
+    if "ops" in entry:
+        try:
+            apply_ops(db, [tuple(op) for op in entry["ops"]])
+        except (MissingRecord, Conflict) as e:
+            logger.warning(f"Skipping journal entry that no longer applies: {e}")
+    db.update(entry.get("meta", {}))
+
+
+class JournalStore:
+    """
+    Plain-file store that appends one JSON line per write instead of
+    rewriting the whole document.
+
+    State is an in-memory index rebuilt at startup from the snapshot
+    (``<path>``, same format as JsonStore) plus the journal
+    (``<path>.journal``). A background thread periodically folds the journal
+    into a fresh snapshot and starts a new, empty journal; both files carry a
+    generation number so other processes notice and reload.
+
+    Writes are serialised across processes with the JsonStore lock. Reads
+    first replay any lines other processes appended since the last read. A
+    torn last line left by a crash is ignored and truncated by the next write.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        collections: List[str],
+        compact_interval: Optional[float] = COMPACT_INTERVAL,
+    ):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.collections = collections
+        self._snapshot = JsonStore(path, collections)
+        self._mutex = threading.RLock()
+        self._db: Dict[str, Any] = {}
+        self._generation: Optional[int] = None
+        self._offset = 0
+        self._stat: Optional[Tuple[int, int]] = None
+        # snapshot file as of the last check for an interrupted compaction
+        self._snapshot_stat: Optional[Tuple[int, int, int]] = None
+        # True while this store holds the inter-process lock (under _mutex)
+        self._holds_lock = False
+
+        with self._locked():
+            if not os.path.exists(self.journal_path):
+                generation = self._snapshot.read().get(GENERATION_KEY, 0)
+                self._reset_journal(generation)
+            self._refresh()
+
+        self._closed = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        if compact_interval:
+            self._compactor = threading.Thread(
+                target=self._compact_loop,
+                args=(compact_interval,),
+                name="aice-journal-compactor",
+                daemon=True,
+            )
+            self._compactor.start()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        In-process index lock, then the inter-process write lock; readers
+        that must take the latter already hold the former.
+        """
+        with self._mutex, self._snapshot.locked():
+            self._holds_lock = True
+            try:
+                yield
+            finally:
+                self._holds_lock = False
+
+    #
+    # Journal I/O
+    #
+    def _reset_journal(self, generation: int) -> None:
+        """Atomically replace the journal with an empty one for ``generation``."""
+        directory = os.path.dirname(os.path.abspath(self.journal_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps({"generation": generation}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _snapshot_changed(self) -> bool:
+        """Whether the snapshot file was replaced since the last call."""
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat = None
+        changed = stat != self._snapshot_stat
+        self._snapshot_stat = stat
+        return changed
+
+    def _finish_compaction(self) -> None:
+        """
+        Start the journal of a snapshot whose compaction died before doing
+        so, first folding in the lines other writers appended to the old
+        journal after the snapshot was taken. Caller holds the inter-process
+        lock, so no compaction is running.
+        """
+        snapshot = self._snapshot.read()
+        generation = snapshot.get(GENERATION_KEY, 0)
+        with open(self.journal_path, "rb") as f:
+            header = f.readline()
+            if generation <= json.loads(header)["generation"]:
+                return
+            f.seek(snapshot.get(FOLDED_KEY, len(header)))
+            data = f.read()
+        logger.warning(
+            f"Finishing an interrupted compaction of {self.path} "
+            f"(generation {generation})"
+        )
+        end = data.rfind(b"\n") + 1  # ignore a trailing partial line
+        if end:
+            for line in data[:end].splitlines():
+                _replay(snapshot, json.loads(line))
+            snapshot[FOLDED_KEY] = snapshot.get(FOLDED_KEY, len(header)) + end
+            self._snapshot.write(snapshot)
+        self._reset_journal(generation)
+        self._snapshot_changed()
+
+    def _reload(self) -> None:
+        """Rebuild the in-memory index from snapshot + journal."""
+        while True:
+            with open(self.journal_path, "rb") as f:
+                header = f.readline()
+                generation = json.loads(header)["generation"]
+                snapshot = self._snapshot.read()
+                if snapshot.get(GENERATION_KEY, 0) != generation:
+                    # a compaction is between writing the snapshot and the
+                    # new journal, or died there; whoever holds the lock
+                    # can tell which and finish it
+                    if self._holds_lock:
+                        self._finish_compaction()
+                    else:
+                        with self._locked():
+                            self._finish_compaction()
+                    continue
+                self._db = snapshot
+                self._generation = generation
+                self._offset = len(header)
+                self._stat = None
+                return
+
+    def _refresh(self) -> None:
+        """Apply journal lines appended (by any process) since the last read."""
+        with open(self.journal_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if (st.st_ino, st.st_size) == self._stat:
+                return
+            generation = json.loads(f.readline())["generation"]
+            if generation != self._generation:
+                self._reload()
+                return self._refresh()
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # ignore a trailing partial line
+        for line in data[:end].splitlines():
+            _replay(self._db, json.loads(line))
+        self._offset += end
+        self._stat = (st.st_ino, self._offset if end < len(data) else st.st_size)
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        """Durably append one entry and apply it in memory. Caller holds the lock."""
+        # never append to the journal of a snapshot that has been superseded
+        if self._snapshot_changed():
+            self._finish_compaction()
+        self._refresh()
+        line = (json.dumps(entry, default=str) + "\n").encode("utf-8")
+        with open(self.journal_path, "r+b") as f:
+            f.truncate(self._offset)  # drop a torn line from a crashed writer
+            f.seek(self._offset)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        # apply the decoded form so memory matches what a replay would build
+        _replay(self._db, json.loads(line))
+        self._offset += len(line)
+        self._stat = (st.st_ino, st.st_size)
+
+    #
+    # Compaction
+    #
+    def _write_snapshot(self, db: Dict[str, Any]) -> None:
+        """Make ``db`` the snapshot of a new generation. Caller holds the lock."""
+        generation = self._generation + 1
+        snapshot = dict(db)
+        snapshot[GENERATION_KEY] = generation
+        snapshot[FOLDED_KEY] = self._offset
+        self._snapshot.write(snapshot)
+        self._snapshot_changed()
+        self._reset_journal(generation)
+        self._refresh()
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot and start an empty journal."""
+        with self._locked():
+            self._refresh()
+            self._write_snapshot(self._db)
+
+    def _compact_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            try:
+                if os.path.getsize(self.journal_path) >= COMPACT_MIN_BYTES:
+                    self.compact()
+            except Exception:
+                logger.exception("Journal compaction failed")
+
+    #
+    # Store interface
+    #
+    def create_collections(self, collections: List[str]) -> None:
+        with self._locked():
+            self._refresh()
+            missing = [name for name in collections if name not in self._db]
+            if missing:
+                self._append({"meta": {name: {} for name in missing}})
+
+    def schema_version(self) -> int:
+        with self._mutex:
+            self._refresh()
+            return self._db.get(SCHEMA_VERSION_KEY, 0)
+
+    def set_schema_version(self, version: int) -> None:
+        with self._locked():
+            self._append({"meta": {SCHEMA_VERSION_KEY: version}})
+
+    def get(self, collection: str, key: str) -> Any:
+        with self._mutex:
+            self._refresh()
+            records = self._db.get(collection, {})
+            if key not in records:
+                raise MissingRecord(collection, key)
+            return copy.deepcopy(records[key])
+
+    def scan(self, collection: str) -> List[Tuple[str, Any]]:
+        with self._mutex:
+            self._refresh()
+            return copy.deepcopy(list(self._db.get(collection, {}).items()))
+
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        with self._mutex:
+            self._refresh()
+            return {
+                (c, k): copy.deepcopy(self._db[c][k])
+                for c, k in keys
+                if k in self._db.get(c, {})
+            }
+
+    def count_by_status(self, collections: List[str]) -> Dict[Tuple[str, Any], int]:
+        with self._mutex:
+            self._refresh()
+            return count_by_status(self._db, collections)
+
+    def find_by_status(
+        self, collections: List[str], statuses: List[str]
+    ) -> List[Tuple[str, str, Any]]:
+        with self._mutex:
+            self._refresh()
+            return copy.deepcopy(find_by_status(self._db, collections, statuses))
+
+    def apply(self, ops: Iterable[Op]) -> None:
+        ops = list(ops)
+        with self._locked():
+            self._refresh()
+            # a missing target must never reach the journal
+            check_ops(self._db, ops)
+            self._append({"ops": ops})
+
+    def dump(self) -> Dict[str, Any]:
+        with self._mutex:
+            self._refresh()
+            db = copy.deepcopy(self._db)
+        db.pop(GENERATION_KEY, None)
+        db.pop(FOLDED_KEY, None)
+        return db
+
+    def load(self, db: Dict[str, Any]) -> None:
+        """Replace the stored contents with ``db`` as a new snapshot."""
+        with self._locked():
+            self._refresh()
+            self._write_snapshot(db)
+
+    def close(self) -> None:
+        """Stop the compactor, letting a compaction in progress finish."""
+        self._closed.set()
+        if self._compactor and self._compactor is not threading.current_thread():
+            self._compactor.join()
@@ -0,0 +1,121 @@
+import contextlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from db.ops import MissingRecord, Op, apply_ops, count_by_status, find_by_status
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+SCHEMA_VERSION_KEY = "_schema_version"
+
+
+class JsonStore:
+    """
+    The original single-document store: the whole database in one JSON file.
+
+    Every read-modify-write holds an exclusive flock on ``<path>.lock`` so
+    several worker processes can share the file without losing updates, and
+    the file is replaced atomically (temp file + rename) so readers never
+    see a half-written document and need no lock.
+    """
+
+    def __init__(self, path: str, collections: List[str]):
+        self.path = path
+        self.collections = collections
+        self._thread_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the inter-process write lock for the duration of the block."""
+        with self._thread_lock, open(self.path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self) -> Dict[str, Any]:
+        """Load the entire database. Never writes; see create_collections()."""
+        if not os.path.exists(self.path):
+            return {name: {} for name in self.collections}
+
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def write(self, db: Dict[str, Any]) -> None:
+        """Atomically persist the given database state to disk."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(db, f, indent=4, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    def create_collections(self, collections: List[str]) -> None:
+        """Add any missing collections to the file, creating it if needed."""
+        with self.locked():
+            db = self.read()
+            for name in collections:
+                db.setdefault(name, {})
+            self.write(db)
+
+    def schema_version(self) -> int:
+        return self.read().get(SCHEMA_VERSION_KEY, 0)
+
+    def set_schema_version(self, version: int) -> None:
+        with self.locked():
+            db = self.read()
+            db[SCHEMA_VERSION_KEY] = version
+            self.write(db)
+
+    def get(self, collection: str, key: str) -> Any:
+        records = self.read().get(collection, {})
+        if key not in records:
+            raise MissingRecord(collection, key)
+        return records[key]
+
+    def scan(self, collection: str) -> List[Tuple[str, Any]]:
+        return list(self.read().get(collection, {}).items())
+
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        """Fetch several (collection, key) records from one read of the file."""
+        db = self.read()
+        return {(c, k): db[c][k] for c, k in keys if k in db.get(c, {})}
+
+    def count_by_status(self, collections: List[str]) -> Dict[Tuple[str, Any], int]:
+        return count_by_status(self.read(), collections)
+
+    def find_by_status(
+        self, collections: List[str], statuses: List[str]
+    ) -> List[Tuple[str, str, Any]]:
+        return find_by_status(self.read(), collections, statuses)
+
+    def apply(self, ops: Iterable[Op]) -> None:
+        with self.locked():
+            db = self.read()
+            apply_ops(db, ops)
+            self.write(db)
+
+    def dump(self) -> Dict[str, Any]:
+        return self.read()
+
+    def load(self, db: Dict[str, Any]) -> None:
+        with self.locked():
+            self.write(db)
+
+    def close(self) -> None:
+        pass
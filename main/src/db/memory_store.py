@@ -0,0 +1,87 @@
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from db.ops import MissingRecord, Op, apply_ops, count_by_status, find_by_status
+
+SCHEMA_VERSION_KEY = "_schema_version"
+
+
+def _clone(value: Any) -> Any:
+    # round-trip through JSON so values behave exactly as after a disk store
+    return json.loads(json.dumps(value, default=str))
+
+
+class MemoryStore:
+    """
+    Process-local store with no disk I/O, for tests and for benchmarking API
+    and crew-orchestration overhead. Contents vanish with the process.
+    """
+
+    def __init__(self, collections: List[str]):
+        self.collections = collections
+        self._db: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def create_collections(self, collections: List[str]) -> None:
+        with self._lock:
+            for name in collections:
+                self._db.setdefault(name, {})
+
+    def schema_version(self) -> int:
+        return self._db.get(SCHEMA_VERSION_KEY, 0)
+
+    def set_schema_version(self, version: int) -> None:
+        with self._lock:
+            self._db[SCHEMA_VERSION_KEY] = version
+
+    def get(self, collection: str, key: str) -> Any:
+        with self._lock:
+            records = self._db.get(collection, {})
+            if key not in records:
+                raise MissingRecord(collection, key)
+            return _clone(records[key])
+
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        with self._lock:
+            return {
+                (c, k): _clone(self._db[c][k])
+                for c, k in keys
+                if k in self._db.get(c, {})
+            }
+
+    def scan(self, collection: str) -> List[Tuple[str, Any]]:
+        with self._lock:
+            records = self._db.get(collection, {})
+            return [(key, _clone(record)) for key, record in records.items()]
+
+    def count_by_status(self, collections: List[str]) -> Dict[Tuple[str, Any], int]:
+        with self._lock:
+            return count_by_status(self._db, collections)
+
+    def find_by_status(
+        self, collections: List[str], statuses: List[str]
+    ) -> List[Tuple[str, str, Any]]:
+        with self._lock:
+            return [
+                (collection, key, _clone(record))
+                for collection, key, record in find_by_status(
+                    self._db, collections, statuses
+                )
+            ]
+
+    def apply(self, ops: Iterable[Op]) -> None:
+        ops = [tuple(op) for op in _clone(list(ops))]
+        with self._lock:
+            apply_ops(self._db, ops)
+
+    def dump(self) -> Dict[str, Any]:
+        with self._lock:
+            return _clone(self._db)
+
+    def load(self, db: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db = _clone(db)
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,119 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# A write is a list of (kind, collection, key, payload) tuples that a store
+# applies all-or-nothing.
+PUT = "put"  # payload: the full record
+UPDATE = "update"  # payload: dict of fields merged into an existing record
+DELETE = "delete"  # payload: unused
+# payload: None, or {field: [allowed values]}; fails the write if key is
+# missing or (Conflict) a listed field holds another value. Conditions see the
+# record as stored before the write, so put them ahead of ops that change it.
+REQUIRE = "require"
+LINK = "link"  # payload: {member: entry} merged into record["sessions"]
+UNLINK = "unlink"  # payload: list of members removed from record["sessions"]
+
+Op = Tuple[str, str, str, Any]
+
+
+class MissingRecord(KeyError):
+    """Raised by a store when a read or a REQUIRE/UPDATE target is absent."""
+
+    def __init__(self, collection: str, key: str):
+        super().__init__(f"{collection}/{key}")
+        self.collection = collection
+        self.key = key
+
+
+class Conflict(Exception):
+    """Raised by a store when a REQUIRE condition on a record does not hold."""
+
+    def __init__(self, collection: str, key: str, field: str, value: Any):
+        super().__init__(f"{collection}/{key}: {field} is {value!r}")
+        self.collection = collection
+        self.key = key
+        self.field = field
+        self.value = value
+
+
+def check_condition(
+    collection: str, key: str, record: Any, condition: Optional[Dict[str, Any]]
+) -> None:
+    """Raise Conflict unless each field in ``condition`` has an allowed value."""
+    for field, allowed in (condition or {}).items():
+        value = record.get(field) if isinstance(record, dict) else None
+        if value not in allowed:
+            raise Conflict(collection, key, field, value)
+
+
+def link_record(record: Any, kind: str, key: str, payload: Any) -> Any:
+    """Return ``record`` (or a new index record) with a LINK/UNLINK applied."""
+    if record is None:
+        record = {"user_id": key, "sessions": {}}
+    if kind == LINK:
+        record["sessions"].update(payload)
+    else:
+        for member in payload:
+            record["sessions"].pop(member, None)
+    return record
+
+
+def check_ops(db: Dict[str, Dict[str, Any]], ops: Iterable[Op]) -> None:
+    """
+    Raise MissingRecord if a REQUIRE/UPDATE target would not exist, or
+    Conflict if a REQUIRE condition does not hold.
+    """
+    present = set()
+    for kind, collection, key, payload in ops:
+        if kind == PUT:
+            present.add((collection, key))
+        elif kind in (REQUIRE, UPDATE):
+            records = db.get(collection, {})
+            if (collection, key) not in present and key not in records:
+                raise MissingRecord(collection, key)
+            if kind == REQUIRE:
+                check_condition(collection, key, records.get(key), payload)
+
+
+def count_by_status(
+    db: Dict[str, Dict[str, Any]], collections: Iterable[str]
+) -> Dict[Tuple[str, Any], int]:
+    """{(collection, status): records} in an in-memory mapping."""
+    counts: Dict[Tuple[str, Any], int] = {}
+    for collection in collections:
+        for record in db.get(collection, {}).values():
+            status = record.get("status") if isinstance(record, dict) else None
+            counts[(collection, status)] = counts.get((collection, status), 0) + 1
+    return counts
+
+
+def find_by_status(
+    db: Dict[str, Dict[str, Any]], collections: Iterable[str], statuses: List[Any]
+) -> List[Tuple[str, str, Any]]:
+    """(collection, key, record) of records with a listed status, uncopied."""
+    return [
+        (collection, key, record)
+        for collection in collections
+        for key, record in db.get(collection, {}).items()
+        if isinstance(record, dict) and record.get("status") in statuses
+    ]
+
+
+def apply_ops(db: Dict[str, Dict[str, Any]], ops: Iterable[Op]) -> None:
+    """Apply ops to an in-memory {collection: {key: record}} mapping.
+
+    Every REQUIRE/UPDATE target is checked before anything is mutated, so a
+    missing record or a failed condition leaves ``db`` untouched.
+    """
+    ops = list(ops)
+    check_ops(db, ops)
+
+    for kind, collection, key, payload in ops:
+        records = db.setdefault(collection, {})
+        if kind == PUT:
+            records[key] = payload
+        elif kind == UPDATE:
+            records[key].update(payload)
+        elif kind == DELETE:
+            records.pop(key, None)
+        elif kind in (LINK, UNLINK):
+            records[key] = link_record(records.get(key), kind, key, payload)
@@ -0,0 +1,262 @@
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from db.ops import (
+    DELETE,
+    LINK,
+    PUT,
+    REQUIRE,
+    UNLINK,
+    UPDATE,
+    MissingRecord,
+    Op,
+    check_condition,
+    link_record,
+)
+
+
+class SQLiteStore:
+    """
+    SQLite store in WAL mode with one table per collection.
+
+    Each row holds the record as JSON in ``data``; ``user_id`` and ``status``
+    are copied out of dict records so they can be indexed. ``id`` is the
+    session_id (or user_id for the ``users`` table) and is the primary key.
+    """
+
+    def __init__(self, path: str, collections: List[str]):
+        self.path = path
+        self.collections = collections
+        self._local = threading.local()
+        # every thread's connection, so close() can reach them all
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit mode; writes open their own BEGIN IMMEDIATE. Only
+            # this thread uses it, but close() may close it from another.
+            conn = sqlite3.connect(
+                self.path, timeout=30.0, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    def _table(self, collection: str) -> str:
+        if collection not in self.collections:
+            raise ValueError(f"Unknown collection: {collection}")
+        return f'"{collection}"'
+
+    def create_collections(self, collections: List[str]) -> None:
+        """Create the table and indexes for each collection if missing."""
+        conn = self._conn()
+        for collection in collections:
+            table = self._table(collection)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "id TEXT PRIMARY KEY, user_id TEXT, status TEXT, data TEXT NOT NULL)"
+            )
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "ix_{collection}_user_id" '
+                f"ON {table} (user_id)"
+            )
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "ix_{collection}_status" '
+                f"ON {table} (status)"
+            )
+
+    @staticmethod
+    def _columns(record: Any) -> Tuple[Optional[str], Optional[str], str]:
+        if isinstance(record, dict):
+            user_id, status = record.get("user_id"), record.get("status")
+        else:
+            user_id, status = None, None
+        return user_id, status, json.dumps(record, default=str)
+
+    def _put(self, conn: sqlite3.Connection, collection: str, key: str, record: Any):
+        user_id, status, data = self._columns(record)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self._table(collection)} "
+            "(id, user_id, status, data) VALUES (?, ?, ?, ?)",
+            (key, user_id, status, data),
+        )
+
+    def _fetch(self, conn: sqlite3.Connection, collection: str, key: str) -> Any:
+        row = conn.execute(
+            f"SELECT data FROM {self._table(collection)} WHERE id = ?", (key,)
+        ).fetchone()
+        if row is None:
+            raise MissingRecord(collection, key)
+        return json.loads(row[0])
+
+    def schema_version(self) -> int:
+        return self._conn().execute("PRAGMA user_version").fetchone()[0]
+
+    def set_schema_version(self, version: int) -> None:
+        self._conn().execute(f"PRAGMA user_version = {int(version)}")
+
+    def _is_empty(self, conn: sqlite3.Connection) -> bool:
+        return not any(
+            conn.execute(f"SELECT 1 FROM {self._table(c)} LIMIT 1").fetchone()
+            for c in self.collections
+        )
+
+    def get(self, collection: str, key: str) -> Any:
+        return self._fetch(self._conn(), collection, key)
+
+    def scan(self, collection: str) -> List[Tuple[str, Any]]:
+        rows = self._conn().execute(f"SELECT id, data FROM {self._table(collection)}")
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Any]:
+        """Fetch several (collection, key) records in one read transaction."""
+        by_collection: Dict[str, List[str]] = {}
+        for collection, key in keys:
+            by_collection.setdefault(collection, []).append(key)
+        found = {}
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            for collection, ids in by_collection.items():
+                table = self._table(collection)
+                # stay well under SQLite's bound-parameter limit
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i : i + 500]
+                    marks = ",".join("?" * len(chunk))
+                    for key, data in conn.execute(
+                        f"SELECT id, data FROM {table} WHERE id IN ({marks})", chunk
+                    ):
+                        found[(collection, key)] = json.loads(data)
+        finally:
+            conn.execute("COMMIT")
+        return found
+
+    def count_by_status(self, collections: List[str]) -> Dict[Tuple[str, Any], int]:
+        """Count from the indexed status column, in one read transaction."""
+        counts = {}
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            for collection in collections:
+                for status, count in conn.execute(
+                    f"SELECT status, COUNT(*) FROM {self._table(collection)} "
+                    "GROUP BY status"
+                ):
+                    counts[(collection, status)] = count
+        finally:
+            conn.execute("COMMIT")
+        return counts
+
+    def find_by_status(
+        self, collections: List[str], statuses: List[str]
+    ) -> List[Tuple[str, str, Any]]:
+        """Select on the indexed status column, in one read transaction."""
+        found = []
+        marks = ",".join("?" * len(statuses))
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            for collection in collections:
+                for key, data in conn.execute(
+                    f"SELECT id, data FROM {self._table(collection)} "
+                    f"WHERE status IN ({marks})",
+                    statuses,
+                ):
+                    found.append((collection, key, json.loads(data)))
+        finally:
+            conn.execute("COMMIT")
+        return found
+
+    def apply(self, ops: Iterable[Op]) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for kind, collection, key, payload in ops:
+                table = self._table(collection)
+                if kind == PUT:
+                    self._put(conn, collection, key, payload)
+                elif kind == UPDATE:
+                    record = self._fetch(conn, collection, key)
+                    record.update(payload)
+                    self._put(conn, collection, key, record)
+                elif kind == REQUIRE and payload:
+                    record = self._fetch(conn, collection, key)
+                    check_condition(collection, key, record, payload)
+                elif kind == REQUIRE:
+                    if not conn.execute(
+                        f"SELECT 1 FROM {table} WHERE id = ?", (key,)
+                    ).fetchone():
+                        raise MissingRecord(collection, key)
+                elif kind == DELETE:
+                    conn.execute(f"DELETE FROM {table} WHERE id = ?", (key,))
+                elif kind in (LINK, UNLINK):
+                    try:
+                        record = self._fetch(conn, collection, key)
+                    except MissingRecord:
+                        record = None
+                    record = link_record(record, kind, key, payload)
+                    self._put(conn, collection, key, record)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def dump(self) -> Dict[str, Any]:
+        conn = self._conn()
+        return {
+            c: {
+                key: json.loads(data)
+                for key, data in conn.execute(f"SELECT id, data FROM {self._table(c)}")
+            }
+            for c in self.collections
+        }
+
+    def load(self, db: Dict[str, Any]) -> None:
+        """Replace the stored contents with ``db``."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for collection in self.collections:
+                conn.execute(f"DELETE FROM {self._table(collection)}")
+                for key, record in db.get(collection, {}).items():
+                    self._put(conn, collection, key, record)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def load_if_empty(self, db: Dict[str, Any]) -> bool:
+        """
+        Import ``db`` only if no collection holds a record yet, checking and
+        writing in one transaction so that of several processes opening the
+        same file only the first imports. Returns whether it imported.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not self._is_empty(conn):
+                conn.execute("ROLLBACK")
+                return False
+            for collection in self.collections:
+                for key, record in db.get(collection, {}).items():
+                    self._put(conn, collection, key, record)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return True
+
+    def close(self) -> None:
+        """Close every thread's connection; a later call opens a new one."""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+            self._local = threading.local()
+        for conn in conns:
+            conn.close()
@@ -0,0 +1,175 @@
+"""
+Event bus for session progress.
+
+Background flows publish status transitions and per-task progress here, and
+the SSE endpoint subscribes per session. A process that calls share() also
+appends its events to the host-wide event log, a table in the job queue's
+SQLite file; one that shares with follow=True (the API) reads the other
+processes' events back from it, so transitions made in external workers
+reach its subscribers within FOLLOW_INTERVAL_SECONDS. Subscribers should
+still fall back to the stored status now and then (see
+app.session_events), for events published before they subscribed.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import jobs
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# how often a following process reads new events from the log
+FOLLOW_INTERVAL_SECONDS = 0.25
+# logged events are kept this long, for followers that fall behind
+LOG_RETENTION_SECONDS = 300
+
+# tags this process's log rows, so its follower skips them
+_ORIGIN = f"{socket.gethostname()}:{os.getpid()}"
+
+_lock = threading.Lock()
+# session_id → [(subscriber's event loop, its queue)]
+_subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+
+class EventLog(jobs.SQLiteFile):
+    """``session_events`` rows: events published by every sharing process."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "origin TEXT NOT NULL, "
+            "event TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_session_events_created "
+            "ON session_events (created_at)"
+        )
+
+    def append(self, event: Dict[str, Any]) -> None:
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO session_events (origin, event, created_at) "
+                "VALUES (?, ?, ?)",
+                (_ORIGIN, json.dumps(event, default=str), time.time()),
+            )
+
+    def last_id(self) -> int:
+        row = self._conn().execute("SELECT MAX(id) FROM session_events").fetchone()
+        return row[0] or 0
+
+    def read_after(self, last_id: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Events other processes logged after row ``last_id``, oldest first,
+        and the id to read after next time.
+        """
+        rows = self._conn().execute(
+            "SELECT id, origin, event FROM session_events WHERE id > ? ORDER BY id",
+            (last_id,),
+        )
+        found = []
+        for last_id, origin, event in rows:
+            if origin != _ORIGIN:
+                found.append(json.loads(event))
+        return last_id, found
+
+    def prune(self, before: float) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM session_events WHERE created_at < ?", (before,))
+
+
+_log: Optional[EventLog] = None
+
+
+def subscribe(session_id: str) -> asyncio.Queue:
+    """Start queueing ``session_id``'s events. Call from the event loop."""
+    queue: asyncio.Queue = asyncio.Queue()
+    with _lock:
+        _subscribers.setdefault(session_id, []).append(
+            (asyncio.get_running_loop(), queue)
+        )
+    return queue
+
+
+def unsubscribe(session_id: str, queue: asyncio.Queue) -> None:
+    with _lock:
+        subscribers = [s for s in _subscribers.get(session_id, []) if s[1] is not queue]
+        if subscribers:
+            _subscribers[session_id] = subscribers
+        else:
+            _subscribers.pop(session_id, None)
+
+
+def publish(session_id: str, status: str, **fields: Any) -> None:
+    """
+    Send {"session_id", "status", **fields} to every subscriber of the
+    session, and to the event log once share() was called. Safe to call
+    from any thread.
+    """
+    event = {"session_id": session_id, "status": status, **fields}
+    _deliver(event)
+    if _log is not None:
+        try:
+            _log.append(event)
+        except sqlite3.Error:
+            # subscribers elsewhere fall back to the stored status
+            logger.exception("Could not log a session event")
+
+
+def _deliver(event: Dict[str, Any]) -> None:
+    """Queue ``event`` for this process's subscribers of its session."""
+    with _lock:
+        subscribers = list(_subscribers.get(event["session_id"], ()))
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:
+            # the subscriber's loop has shut down
+            pass
+
+
+def _follow(log: EventLog) -> None:
+    last_id = log.last_id()
+    pruned_at = time.monotonic()
+    while True:
+        time.sleep(FOLLOW_INTERVAL_SECONDS)
+        try:
+            last_id, found = log.read_after(last_id)
+            for event in found:
+                _deliver(event)
+            if time.monotonic() - pruned_at >= LOG_RETENTION_SECONDS:
+                log.prune(time.time() - LOG_RETENTION_SECONDS)
+                pruned_at = time.monotonic()
+        except Exception:
+            logger.exception("Reading the event log failed")
+
+
+def share(follow: bool = False) -> None:
+    """
+    Log this process's events for the others on the host; with ``follow``,
+    also deliver theirs to subscribers here, from a daemon thread. Call once
+    at startup.
+    """
+    global _log
+    _log = EventLog(jobs.JOBS_DB)
+    if follow:
+        threading.Thread(
+            target=_follow, args=(_log,), name="aice-events", daemon=True
+        ).start()
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode an event as one text/event-stream message."""
+    return f"data: {json.dumps(event, default=str)}\n\n"
@@ -1,12 +1,21 @@
+import asyncio
+import contextlib
+import datetime
 import json
 import logging
-from typing import Any, Dict
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, Optional
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 import db as db
+import events
+import jobs
+import metrics
+import sentiment
 from crew import (
     cost_breakdown_crew,
     create_dynamic_checklist_crew,
@@ -16,6 +25,117 @@ from crew import (
     create_timeline_generator_crew,
 )
 
+# flow_type → collection holding that flow's session records
+SESSION_COLLECTIONS = {
+    "essay": "essay_writing_sessions",
+    "program_analysis": "program_analysis_sessions",
+    "dynamic_checklist": "checklist_sessions",
+    "cost_breakdown": "cost_breakdown_sessions",
+    "timeline": "timeline_sessions",
+    "interview_prep": "interview_prep_sessions",
+    "sentiment": "sentiment_sessions",
+}
+# session collection → API flow name (db.FLOWS key), for metric labels
+API_FLOWS = {collection: flow for flow, (collection, _) in db.FLOWS.items()}
+
+
+def _set_status(
+    flow: str, session_id: str, status: str, error: Optional[str] = None
+) -> None:
+    """
+    Persist a status transition and announce it on the event bus, unless
+    the session was cancelled (or otherwise finished) meanwhile: raises
+    jobs.Cancelled then, which stops the run.
+    """
+    jobs.check_cancelled()
+    collection = SESSION_COLLECTIONS[flow]
+    try:
+        db.set_session_status(collection, session_id, status, error=error)
+    except db.SessionClosed:
+        raise jobs.Cancelled() from None
+    if error is None:
+        events.publish(session_id, status)
+    else:
+        events.publish(session_id, status, error=error)
+
+
+@contextlib.contextmanager
+def _completing(session_id: str) -> Iterator[None]:
+    """
+    Wrap the save_* call(s) that store a session's results and mark it
+    completed, then announce completion. Like _set_status, raises
+    jobs.Cancelled instead if the session finished meanwhile.
+    """
+    jobs.check_cancelled()
+    try:
+        yield
+    except db.SessionClosed:
+        raise jobs.Cancelled() from None
+    events.publish(session_id, "completed")
+
+
+def _task_progress(session_id: str) -> Callable[[Any], None]:
+    """
+    Crew task_callback publishing each finished task as a progress event and
+    timing it (tasks run in sequence, so from the previous one's end).
+    """
+    completed = 0
+    last = time.monotonic()
+
+    def callback(output: Any) -> None:
+        nonlocal completed, last
+        now = time.monotonic()
+        metrics.TASK_SECONDS.labels(
+            getattr(output, "agent", None) or "unknown"
+        ).observe(now - last)
+        completed += 1
+        last = now
+        task = {"agent": getattr(output, "agent", None), "completed": completed}
+        events.publish(session_id, "in_progress", task=task)
+
+    return callback
+
+
+def _check_cancelled(step: Any) -> None:
+    """Crew step_callback: stop the crew at its next step once cancelled."""
+    jobs.check_cancelled()
+
+
+def _run_crew(build: Callable[..., tuple], session_id: str, **kwargs: Any) -> tuple:
+    """
+    Run a crew via its create_*_crew function, checkpointing the task
+    outputs on the job once the whole crew has finished. A rerun skips the
+    crew only if an earlier attempt completed it (and then crashed before
+    saving the results); one that died mid-crew reruns every task.
+    """
+    saved = jobs.load_checkpoint(session_id)
+    if saved is not None:
+        logger.info(f"Reusing checkpointed crew output for session {session_id}")
+        return None, [
+            SimpleNamespace(
+                description=t["description"],
+                agent=SimpleNamespace(role=t["role"]),
+                output=SimpleNamespace(raw=t["raw"]),
+            )
+            for t in saved
+        ]
+    result, tasks = build(
+        session_id=session_id,
+        task_callback=_task_progress(session_id),
+        step_callback=_check_cancelled,
+        **kwargs,
+    )
+    # don't save results over a cancellation that came in as the crew ended
+    jobs.check_cancelled()
+    jobs.save_checkpoint(
+        session_id,
+        [
+            {"description": t.description, "role": t.agent.role, "raw": t.output.raw}
+            for t in tasks
+        ],
+    )
+    return result, tasks
+
 
 def generate_college_exploration_background(
     session_id: str,
@@ -31,14 +151,11 @@ def generate_college_exploration_background(
     try:
         if flow == "essay":
             # mark in-progress
-            sess = db.get_essay_session(session_id)
-            sess["status"] = "in_progress"
-            all_db = db.read_db()
-            all_db["essay_writing_sessions"][session_id] = sess
-            db.update_db(all_db)
+            _set_status(flow, session_id, "in_progress")
 
             # kickoff Essay Writing Crew, now using essay_text
-            result, tasks = create_essay_writing_crew(
+            result, tasks = _run_crew(
+                create_essay_writing_crew,
                 session_id=session_id,
                 essay_text=session_data["essay_text"],  # ← changed
                 target_university=session_data["target_university"],
@@ -57,17 +174,14 @@ def generate_college_exploration_background(
                     refined = json.loads(raw) if _is_json(raw) else raw
 
             # save to DB (also marks session completed)
-            db.save_essay_results(session_id, outline, refined)
+            with _completing(session_id):
+                db.save_essay_results(session_id, outline, refined)
 
         elif flow == "program_analysis":
-            # unchanged…
-            sess = db.get_program_analysis_session(session_id)
-            sess["status"] = "in_progress"
-            all_db = db.read_db()
-            all_db["program_analysis_sessions"][session_id] = sess
-            db.update_db(all_db)
-
-            result, tasks = create_program_analysis_crew(
+            _set_status(flow, session_id, "in_progress")
+
+            result, tasks = _run_crew(
+                create_program_analysis_crew,
                 session_id=session_id,
                 university_list=session_data["university_list"],
                 comparison_criteria=session_data["comparison_criteria"],
@@ -89,30 +203,19 @@ def generate_college_exploration_background(
                     report = {"comparison_report": raw}
                     break
 
-            # save each stage
-            db.save_raw_admissions_data(session_id, raw_data)
-            db.save_structured_admissions_data(session_id, structured)
-            db.save_program_comparison_report(session_id, report)
+            # save each stage in one commit
+            with _completing(session_id), db.transaction():
+                db.save_raw_admissions_data(session_id, raw_data)
+                db.save_structured_admissions_data(session_id, structured)
+                db.save_program_comparison_report(session_id, report)
 
         else:
             raise ValueError(f"Unknown flow_type: {flow}")
 
     except Exception as e:
         # mark failed
-        if flow == "essay":
-            sess = db.get_essay_session(session_id)
-            sess["status"] = "failed"
-            sess["error"] = str(e)
-            d = db.read_db()
-            d["essay_writing_sessions"][session_id] = sess
-            db.update_db(d)
-        elif flow == "program_analysis":
-            sess = db.get_program_analysis_session(session_id)
-            sess["status"] = "failed"
-            sess["error"] = str(e)
-            d = db.read_db()
-            d["program_analysis_sessions"][session_id] = sess
-            db.update_db(d)
+        if flow in ("essay", "program_analysis"):
+            _set_status(flow, session_id, "failed", error=str(e))
         else:
             # fallback for unrecognized flow
             raise
@@ -131,14 +234,11 @@ def generate_application_planning_background(
         if flow == "dynamic_checklist":
             logger.info("Flow type is 'dynamic_checklist'")
 
-            sess = db.get_checklist_session(session_id)
-            sess["status"] = "in_progress"
-            logger.info(f"Checklist session marked in progress: {sess}")
-            all_db = db.read_db()
-            all_db["checklist_sessions"][session_id] = sess
-            db.update_db(all_db)
+            _set_status(flow, session_id, "in_progress")
+            logger.info(f"Checklist session marked in progress: {session_id}")
 
-            result, tasks = create_dynamic_checklist_crew(
+            result, tasks = _run_crew(
+                create_dynamic_checklist_crew,
                 session_id=session_id,
                 nationality=session_data["nationality"],
                 program_level=session_data["program_level"],
@@ -156,20 +256,18 @@ def generate_application_planning_background(
                     logger.info(f"Checklist generated: {checklist}")
                     break
 
-            db.save_dynamic_checklist(session_id, checklist)
+            with _completing(session_id):
+                db.save_dynamic_checklist(session_id, checklist)
             logger.info("Checklist saved to DB")
 
         elif flow == "cost_breakdown":
             logger.info("Flow type is 'cost_breakdown'")
 
-            sess = db.get_cost_breakdown_session(session_id)
-            sess["status"] = "in_progress"
-            logger.info(f"Cost breakdown session marked in progress: {sess}")
-            all_db = db.read_db()
-            all_db["cost_breakdown_sessions"][session_id] = sess
-            db.update_db(all_db)
+            _set_status(flow, session_id, "in_progress")
+            logger.info(f"Cost breakdown session marked in progress: {session_id}")
 
-            result, tasks = cost_breakdown_crew(
+            result, tasks = _run_crew(
+                cost_breakdown_crew,
                 session_id=session_id,
                 university=session_data["university"],
                 course=session_data["course"],
@@ -187,20 +285,18 @@ def generate_application_planning_background(
                 if task.agent.role == "Cost Breakdown Generator":
                     breakdown = json.loads(raw) if _is_json(raw) else raw
                     logger.info(f"Breakdown generated: {breakdown}")
-            db.save_cost_breakdown(session_id, breakdown)
+            with _completing(session_id):
+                db.save_cost_breakdown(session_id, breakdown)
             logger.info("Cost breakdown saved to DB")
 
         elif flow == "timeline":
             logger.info("Flow type is 'timeline'")
 
-            sess = db.get_timeline_session(session_id)
-            sess["status"] = "in_progress"
-            logger.info(f"Timeline session marked in progress: {sess}")
-            all_db = db.read_db()
-            all_db["timeline_sessions"][session_id] = sess
-            db.update_db(all_db)
+            _set_status(flow, session_id, "in_progress")
+            logger.info(f"Timeline session marked in progress: {session_id}")
 
-            result, tasks = create_timeline_generator_crew(
+            result, tasks = _run_crew(
+                create_timeline_generator_crew,
                 session_id=session_id,
                 universities=session_data["universities"],
                 level=session_data["level"],
@@ -225,18 +321,16 @@ def generate_application_planning_background(
                     timeline = json.loads(raw) if _is_json(raw) else raw
                     logger.info(f"Timeline generated: {timeline}")
 
-            db.save_timeline(session_id, deadlines, timeline)
+            with _completing(session_id):
+                db.save_timeline(session_id, deadlines, timeline)
             logger.info("Timeline data saved to DB")
 
         elif flow == "interview_prep":
             logger.info("Flow type is 'interview_prep'")
-            sess = db.get_interview_prep_session(session_id)
-            sess["status"] = "in_progress"
-            all_db = db.read_db()
-            all_db["interview_prep_sessions"][session_id] = sess
-            db.update_db(all_db)
+            _set_status(flow, session_id, "in_progress")
 
-            result, tasks = create_interview_prep_crew(
+            result, tasks = _run_crew(
+                create_interview_prep_crew,
                 session_id=session_id,
                 university_name=session_data["university_name"],
                 course_name=session_data["course_name"],
@@ -247,7 +341,8 @@ def generate_application_planning_background(
                 if task.agent.role == "Interview Preparation Generator":
                     raw = task.output.raw
                     interview_QA = json.loads(raw) if _is_json(raw) else raw
-            db.save_interview_prep(session_id, interview_QA)
+            with _completing(session_id):
+                db.save_interview_prep(session_id, interview_QA)
             logger.info("Interview preparation data saved to DB")
 
         else:
@@ -258,29 +353,71 @@ def generate_application_planning_background(
             f"Error occurred during flow '{flow}' for session '{session_id}': {e}",
             exc_info=True,
         )
-        if flow == "dynamic_checklist":
-            sess = db.get_checklist_session(session_id)
-            key = "checklist_sessions"
-        elif flow == "cost_breakdown":
-            sess = db.get_cost_breakdown_session(session_id)
-            key = "cost_breakdown_sessions"
-        elif flow == "timeline":
-            sess = db.get_timeline_session(session_id)
-            key = "timeline_sessions"
-        elif flow == "interview_prep":
-            sess = db.get_interview_prep_session(session_id)
-            key = "interview_prep_sessions"
-        else:
+        if flow not in (
+            "dynamic_checklist",
+            "cost_breakdown",
+            "timeline",
+            "interview_prep",
+        ):
             raise
 
-        sess["status"] = "failed"
-        sess["error"] = str(e)
-        d = db.read_db()
-        d[key][session_id] = sess
-        db.update_db(d)
+        _set_status(flow, session_id, "failed", error=str(e))
         logger.info(f"Marked session {session_id} as failed and saved error")
 
 
+def generate_sentiment_background(
+    session_id: str,
+    session_data: Dict[str, Any],
+) -> None:
+    """Run a sentiment-analysis session; the result also goes to the cache."""
+    flow = "sentiment"
+    try:
+        _set_status(flow, session_id, "in_progress")
+        reviews = session_data["reviews"]
+        result = jobs.interruptible(lambda: asyncio.run(sentiment.summarize(reviews)))
+        with _completing(session_id):
+            db.save_sentiment_result(session_id, result)
+    except Exception as e:
+        logger.error(f"Sentiment analysis failed for session '{session_id}': {e}")
+        # sentiment_utils raises HTTPException, whose message is its detail
+        _set_status(flow, session_id, "failed", error=getattr(e, "detail", str(e)))
+
+
+def run_session(session_id: str, session_data: Dict[str, Any]) -> None:
+    """Run a queued session with the background function for its flow_type."""
+    flow = session_data.get("flow_type")
+    start = time.monotonic()
+    try:
+        if flow in ("essay", "program_analysis"):
+            generate_college_exploration_background(session_id, session_data)
+        elif flow == "sentiment":
+            generate_sentiment_background(session_id, session_data)
+        else:
+            generate_application_planning_background(session_id, session_data)
+    finally:
+        _observe_session(flow, session_id, time.monotonic() - start)
+
+
+def _observe_session(flow: Optional[str], session_id: str, elapsed: float) -> None:
+    """Record a run's duration and its session's age, by final status."""
+    api_flow = API_FLOWS.get(SESSION_COLLECTIONS.get(flow or ""))
+    if api_flow is None:
+        return
+    try:
+        record = db.get_sessions([(api_flow, session_id)]).get((api_flow, session_id))
+    except Exception:
+        logger.exception(f"Could not record metrics for session {session_id}")
+        return
+    if not isinstance(record, dict):
+        return
+    status = record.get("status") or "unknown"
+    metrics.SESSION_RUN_SECONDS.labels(api_flow, status).observe(elapsed)
+    if record.get("created_at"):
+        created_at = datetime.datetime.fromisoformat(record["created_at"])
+        age = datetime.datetime.utcnow() - created_at
+        metrics.SESSION_SECONDS.labels(api_flow, status).observe(age.total_seconds())
+
+
 def _is_json(s: str) -> bool:
     """Utility to detect whether a string can be parsed as JSON."""
     try:
@@ -0,0 +1,265 @@
+"""
+Duplicate suppression for session creation.
+
+A POST /sessions/* request may carry an ``Idempotency-Key`` header. The first
+request with a given key (per user and flow) creates the session; repeats
+within key_ttl_seconds get that session back instead of starting another
+crew, and reusing the key for a different payload is refused.
+
+Without a key, identical payloads (compared after normalize()) from the same
+user to the same flow within dedupe_window_seconds are treated the same
+way, as long as the earlier session has not failed or been cancelled. A
+double-clicked Submit therefore runs one crew. Set the window to 0 to turn
+this off.
+
+Keys are recorded in the job queue's SQLite file (data/jobs.sqlite3, or
+AICE_JOBS_DB), so every API process on the host sees them. Settings live
+under "idempotency" in config/config.json.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import db
+import jobs
+from utils import load_config
+
+DEFAULT_CONFIG = {
+    # how long an Idempotency-Key keeps returning its session
+    "key_ttl_seconds": 86400,
+    # identical payloads within this many seconds are one submission (0 = off)
+    "dedupe_window_seconds": 30,
+}
+
+# a reservation whose request never finished (crashed process) lapses after
+RESERVATION_SECONDS = 60
+# how long a duplicate waits for the first request to create its session
+IN_FLIGHT_WAIT_SECONDS = 5.0
+IN_FLIGHT_POLL_SECONDS = 0.1
+
+# a duplicate payload is not pointed at a session that ended like this
+RETRYABLE_STATUSES = ("failed", "cancelled")
+
+
+class KeyReused(Exception):
+    """An Idempotency-Key was sent again with a different payload."""
+
+
+class InFlight(Exception):
+    """The original request is still creating its session."""
+
+
+def load_idempotency_config() -> Dict[str, Any]:
+    """Return DEFAULT_CONFIG overlaid with the "idempotency" config section."""
+    config = dict(DEFAULT_CONFIG)
+    config.update(load_config().get("idempotency", {}))
+    return config
+
+
+def normalize(value: Any) -> Any:
+    """
+    Canonical form of a payload for duplicate detection: whitespace runs in
+    strings collapsed and trimmed, None-valued fields dropped.
+    """
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    return value
+
+
+def fingerprint(flow: str, payload: Dict[str, Any]) -> str:
+    canonical = json.dumps([flow, normalize(payload)], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# (key, payload fingerprint, seconds the key lives once bound)
+Claim = Tuple[str, str, float]
+
+
+class SubmissionStore(jobs.SQLiteFile):
+    """
+    ``submissions`` rows: key → the session created for it. A row with no
+    session_id is a reservation held by a request still creating one.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS submissions ("
+            "key TEXT PRIMARY KEY, "
+            "fingerprint TEXT NOT NULL, "
+            "session_id TEXT, "
+            "ttl REAL NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_submissions_expires "
+            "ON submissions (expires_at)"
+        )
+
+    def reserve(self, claims: List[Claim]) -> Dict[str, Tuple[str, Optional[str]]]:
+        """
+        Reserve every key in ``claims``, or none of them if any is already
+        taken: returns {} on success, else the taken keys' {key:
+        (fingerprint, session_id)}.
+        """
+        now = time.time()
+        keys = [key for key, _, _ in claims]
+        marks = ", ".join("?" * len(keys))
+        with self._write() as conn:
+            conn.execute("DELETE FROM submissions WHERE expires_at < ?", (now,))
+            taken = {
+                key: (found, session_id)
+                for key, found, session_id in conn.execute(
+                    "SELECT key, fingerprint, session_id FROM submissions "
+                    f"WHERE key IN ({marks})",
+                    keys,
+                )
+            }
+            if not taken:
+                conn.executemany(
+                    "INSERT INTO submissions (key, fingerprint, ttl, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (key, digest, ttl, now + RESERVATION_SECONDS)
+                        for key, digest, ttl in claims
+                    ],
+                )
+        return taken
+
+    def bind(self, keys: List[str], session_id: str) -> None:
+        """Point reserved keys at the session created for them."""
+        with self._write() as conn:
+            conn.executemany(
+                "UPDATE submissions SET session_id = ?, expires_at = ? + ttl "
+                "WHERE key = ?",
+                [(session_id, time.time(), key) for key in keys],
+            )
+
+    def adopt(self, claims: List[Claim], session_id: str) -> None:
+        """Bind those of ``claims`` nobody holds straight to ``session_id``."""
+        now = time.time()
+        with self._write() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO submissions "
+                "(key, fingerprint, session_id, ttl, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, digest, session_id, ttl, now + ttl)
+                    for key, digest, ttl in claims
+                ],
+            )
+
+    def release(self, keys: List[str]) -> None:
+        """Forget keys, so the next request with them starts afresh."""
+        with self._write() as conn:
+            conn.executemany(
+                "DELETE FROM submissions WHERE key = ?", [(key,) for key in keys]
+            )
+
+
+class Submission:
+    """
+    One session-creating request, used as a context manager around creating
+    and queueing the session. ``duplicate_of`` is the session an earlier
+    identical request created, if any. Otherwise the request holds its keys:
+    set ``session_id`` to keep them pointing at the new session; leaving it
+    unset, or raising, releases them.
+    """
+
+    def __init__(
+        self,
+        store: SubmissionStore,
+        claims: List[Claim],
+        duplicate_of: Optional[str] = None,
+    ):
+        self.store = store
+        self.keys = [key for key, _, _ in claims]
+        self.duplicate_of = duplicate_of
+        self.session_id: Optional[str] = None
+
+    def __enter__(self) -> "Submission":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.duplicate_of is not None or not self.keys:
+            return
+        if exc_type is None and self.session_id is not None:
+            self.store.bind(self.keys, self.session_id)
+        else:
+            self.store.release(self.keys)
+
+
+_config: Optional[Dict[str, Any]] = None
+_store: Optional[SubmissionStore] = None
+
+
+def _submissions() -> Tuple[SubmissionStore, Dict[str, Any]]:
+    global _config, _store
+    if _store is None:
+        _config = load_idempotency_config()
+        _store = SubmissionStore(jobs.JOBS_DB)
+    return _store, _config
+
+
+def _session_status(flow: str, session_id: str) -> Optional[str]:
+    record = db.get_sessions([(flow, session_id)]).get((flow, session_id))
+    return None if record is None else record.get("status")
+
+
+def submission(
+    flow: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None
+) -> Submission:
+    """
+    Check a new ``flow`` session request against earlier ones and reserve
+    its keys. Raises KeyReused if ``idempotency_key`` came with another
+    payload before, or InFlight if the original request has not created its
+    session after IN_FLIGHT_WAIT_SECONDS.
+    """
+    store, config = _submissions()
+    user_id = payload.get("user_id")
+    digest = fingerprint(flow, payload)
+    claims: List[Claim] = []
+    if idempotency_key:
+        scoped = json.dumps([user_id, flow, idempotency_key])
+        key = "key:" + hashlib.sha256(scoped.encode("utf-8")).hexdigest()
+        claims.append((key, digest, config["key_ttl_seconds"]))
+    if config["dedupe_window_seconds"]:
+        claims.append(("payload:" + digest, digest, config["dedupe_window_seconds"]))
+    if not claims:
+        return Submission(store, claims)
+
+    deadline = time.monotonic() + IN_FLIGHT_WAIT_SECONDS
+    while True:
+        taken = store.reserve(claims)
+        if not taken:
+            return Submission(store, claims)
+        pending = False
+        for key, (found, session_id) in taken.items():
+            if found != digest:
+                raise KeyReused(
+                    "Idempotency-Key was already used for a different request"
+                )
+            if session_id is None:
+                pending = True
+            elif key.startswith("key:"):
+                return Submission(store, claims, duplicate_of=session_id)
+            elif _session_status(flow, session_id) in (None, *RETRYABLE_STATUSES):
+                # resubmitting after a failure, cancellation or deletion is a
+                # retry, not a duplicate
+                store.release([key])
+            else:
+                # reserve() took nothing, so bind this request's key here, or
+                # a retry with it after the dedupe window would start a crew
+                store.adopt(claims, session_id)
+                return Submission(store, claims, duplicate_of=session_id)
+        if pending and time.monotonic() >= deadline:
+            raise InFlight("An identical request is still being processed")
+        if pending:
+            time.sleep(IN_FLIGHT_POLL_SECONDS)
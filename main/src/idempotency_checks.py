@@ -0,0 +1,71 @@
+"""
+Checks for duplicate suppression in idempotency.py.
+
+Each check runs once, on an in-memory datastore and a fresh submissions
+file in a temporary directory:
+
+    cd main/src
+    python idempotency_checks.py
+
+Exits non-zero if any check fails. Datastore behaviour is covered
+separately, per backend, by db.conformance.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+import db
+import idempotency
+
+PAYLOAD = {"user_id": "u", "country": "LK", "level": "ug", "documents": []}
+
+
+def _submit(key=None) -> str:
+    with idempotency.submission("checklist", PAYLOAD, key) as sub:
+        if sub.duplicate_of is not None:
+            return sub.duplicate_of
+        sub.session_id = db.create_checklist_session("u", "LK", "ug", [])
+        return sub.session_id
+
+
+def check_key_outlives_window() -> None:
+    idempotency._config = {"key_ttl_seconds": 60, "dedupe_window_seconds": 0.2}
+    sid = _submit()
+    # a new key matching a live payload claim is bound to its session
+    assert _submit("retry-key") == sid
+    time.sleep(0.3)
+    assert _submit("retry-key") == sid, "key forgotten after the window"
+
+
+CHECKS = [
+    check_key_outlives_window,
+]
+
+
+def run() -> int:
+    """Run every check; return the number of failures."""
+    failures = 0
+    for check in CHECKS:
+        with tempfile.TemporaryDirectory() as directory:
+            db.use_backend("memory", directory)
+            idempotency._store = idempotency.SubmissionStore(
+                os.path.join(directory, "jobs.sqlite3")
+            )
+            try:
+                check()
+                print(f"PASS {check.__name__}")
+            except Exception:
+                failures += 1
+                print(f"FAIL {check.__name__}")
+                traceback.print_exc()
+            finally:
+                idempotency._store = idempotency._config = None
+                db.close()
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run() else 0)
@@ -0,0 +1,754 @@
+"""
+Durable job queue and worker pools for crew runs.
+
+Jobs are rows in a local SQLite file (data/jobs.sqlite3, or AICE_JOBS_DB),
+so they survive restarts and are shared by the API and any number of worker
+processes on the host. The API only enqueues; workers claim jobs and run
+them, each process with a fixed pool of threads shared by all flows. Once a
+flow has max_queue_depth jobs waiting, submit() raises QueueFull and the
+API answers 429 with Retry-After.
+
+Which job a free thread takes next:
+  - only flows below their max_running cap (counted across all workers);
+  - only flows whose priority class may still start work: each class keeps
+    reserved_workers threads of every pool free for itself and the classes
+    ranked above it, so cheap flows never wait behind long ones;
+  - the best-ranked class first, then the user with the fewest running
+    jobs (fair share), then the oldest job.
+
+cancel() drops a queued job, or deletes a running one's row: its worker
+notices (at once in-process, else within poll_interval_seconds), frees the
+thread and abandons the run, which stops with Cancelled at its next
+check_cancelled() or interruptible() call.
+
+AICE_WORKERS=inline (the default) runs the worker pool inside the API
+process; with AICE_WORKERS=external the API only enqueues and
+``python worker.py`` (the aice-worker service) runs the jobs.
+
+Pool size, priorities and limits live under "jobs" in config/config.json.
+"""
+
+import contextlib
+import json
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import metrics
+from utils import load_config
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = os.getenv("AICE_JOBS_DB", os.path.join("data", "jobs.sqlite3"))
+# "inline": the API process runs the workers; "external": worker.py does
+WORKER_MODE = os.getenv("AICE_WORKERS", "inline").lower()
+
+DEFAULT_CONFIG = {
+    # worker threads per process, shared by every flow
+    "workers": 6,
+    # API flow name → priority class, and optionally the most jobs of that
+    # flow running at once across all workers
+    "flows": {
+        "checklist": {"priority": "interactive"},
+        "cost-breakdown": {"priority": "interactive"},
+        "interview-prep": {"priority": "interactive"},
+        "sentiment": {"priority": "interactive"},
+        "essay": {"priority": "standard"},
+        "timeline": {"priority": "standard"},
+        "program-analysis": {"priority": "batch", "max_running": 2},
+    },
+    # class → rank (0 is served first) and threads per pool that lower-ranked
+    # classes may not take
+    "priority_classes": {
+        "interactive": {"rank": 0, "reserved_workers": 2},
+        "standard": {"rank": 1, "reserved_workers": 1},
+        "batch": {"rank": 2, "reserved_workers": 0},
+    },
+    # queued (not yet running) jobs per flow before submit() refuses more
+    "max_queue_depth": 20,
+    # Retry-After until a flow has finished a job to estimate from
+    "retry_after_seconds": 30,
+    # how often idle workers look for jobs enqueued by another process
+    "poll_interval_seconds": 1.0,
+    # running jobs are stamped this often; one unstamped for stale_after
+    # seconds belonged to a dead worker and is requeued (see recovery.py)
+    "heartbeat_seconds": 15,
+    "stale_after_seconds": 90,
+    # runs per job, counting the first, before recovery gives up on it
+    "max_attempts": 2,
+    # a pending/in_progress session with no job that is older than this was
+    # orphaned by a restart (younger ones may still be on their way in)
+    "orphan_grace_seconds": 300,
+}
+
+# how often a call in interruptible() looks for cancellation
+CANCEL_CHECK_SECONDS = 0.2
+# threads for interruptible() calls; abandoned calls hold one until they end
+OUTBOUND_THREADS = 32
+
+# handler(session_id, session_data) runs one job
+Handler = Callable[[str, Dict[str, Any]], None]
+
+
+class QueueFull(Exception):
+    """A flow's queue is at capacity; retry after ``retry_after`` seconds."""
+
+    def __init__(self, flow: str, retry_after: int):
+        super().__init__(f"Too many queued {flow} sessions, retry later")
+        self.flow = flow
+        self.retry_after = retry_after
+
+
+class Cancelled(BaseException):
+    """
+    Raised inside a job whose session was cancelled. A BaseException, like
+    asyncio.CancelledError, so the ``except Exception`` blocks in crews and
+    tools let it through.
+    """
+
+
+def load_jobs_config() -> Dict[str, Any]:
+    """Return DEFAULT_CONFIG overlaid with the "jobs" config section."""
+    config = dict(DEFAULT_CONFIG)
+    config.update(load_config().get("jobs", {}))
+    if isinstance(config["workers"], dict):
+        # older layout: threads per flow; keep them as per-flow caps
+        per_flow = config["workers"]
+        config["workers"] = sum(per_flow.values())
+        config["flows"] = {
+            flow: {**spec, "max_running": per_flow[flow]} if flow in per_flow else spec
+            for flow, spec in config["flows"].items()
+        }
+    return config
+
+
+class SQLiteFile:
+    """
+    A SQLite file shared by the processes on this host: one WAL-mode
+    connection per thread, and _write() for write transactions.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
+class JobStore(SQLiteFile):
+    """
+    The queue itself: one ``jobs`` row per queued or running session, FIFO
+    by ``id`` within a flow. A claimed row stays (state "running") until
+    finish() deletes it, so a job is never lost between claim and finish.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "session_id TEXT NOT NULL UNIQUE, "
+            "flow TEXT NOT NULL, "
+            "data TEXT NOT NULL, "
+            "state TEXT NOT NULL DEFAULT 'queued', "
+            "enqueued_at REAL NOT NULL, "
+            "started_at REAL, "
+            "worker TEXT)"
+        )
+        # columns added after the first release of this table
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, decl in [
+            ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+            ("heartbeat_at", "REAL"),
+            ("checkpoint", "TEXT"),
+            ("user_id", "TEXT"),
+        ]:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_jobs_user_state ON jobs (user_id, state)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_jobs_flow_state ON jobs (flow, state, id)"
+        )
+        # flow → moving average of job run time, for Retry-After
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS flow_stats ("
+            "flow TEXT PRIMARY KEY, avg_seconds REAL NOT NULL)"
+        )
+        # name → the process holding a host-wide chore, see take_lease()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def enqueue(
+        self,
+        flow: str,
+        session_id: str,
+        session_data: Dict[str, Any],
+        max_depth: int,
+        user_id: Optional[str] = None,
+    ) -> Optional[int]:
+        """
+        Add a job and return its 1-based queue position, or None if the flow
+        already has ``max_depth`` jobs waiting.
+        """
+        with self._write() as conn:
+            (depth,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE flow = ? AND state = 'queued'",
+                (flow,),
+            ).fetchone()
+            if depth >= max_depth:
+                return None
+            conn.execute(
+                "INSERT INTO jobs (session_id, flow, user_id, data, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session_id, flow, user_id, json.dumps(session_data), time.time()),
+            )
+        return depth + 1
+
+    def claim(
+        self, ranks: Dict[str, int], caps: Dict[str, int], worker: str
+    ) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Mark the next job running and return (session_id, flow, data). Only
+        flows in ``ranks`` that are under their cap in ``caps`` qualify; the
+        lowest rank wins, then the user with the fewest running jobs, then
+        the oldest job.
+        """
+        with self._write() as conn:
+            running = dict(
+                conn.execute(
+                    "SELECT flow, COUNT(*) FROM jobs "
+                    "WHERE state = 'running' GROUP BY flow"
+                ).fetchall()
+            )
+            flows = [
+                flow
+                for flow in ranks
+                if flow not in caps or running.get(flow, 0) < caps[flow]
+            ]
+            if not flows:
+                return None
+            in_flows = ", ".join("?" * len(flows))
+            rank_of = " ".join("WHEN ? THEN ?" for _ in flows)
+            params: List[Any] = list(flows)
+            params += [x for flow in flows for x in (flow, ranks[flow])]
+            row = conn.execute(
+                "SELECT j.id, j.session_id, j.flow, j.data, j.enqueued_at FROM jobs j "
+                f"WHERE j.state = 'queued' AND j.flow IN ({in_flows}) "
+                f"ORDER BY CASE j.flow {rank_of} END, "
+                "(SELECT COUNT(*) FROM jobs r "
+                "WHERE r.state = 'running' AND r.user_id = j.user_id), "
+                "j.id LIMIT 1",
+                params,
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET state = 'running', started_at = ?, heartbeat_at = ?, "
+                "worker = ?, attempts = attempts + 1 WHERE id = ?",
+                (now, now, worker, row[0]),
+            )
+        metrics.QUEUE_WAIT_SECONDS.labels(row[2]).observe(now - row[4])
+        return row[1], row[2], json.loads(row[3])
+
+    def heartbeat(self, worker: str) -> None:
+        """Stamp every job ``worker`` is running as still alive."""
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? "
+                "WHERE worker = ? AND state = 'running'",
+                (time.time(), worker),
+            )
+
+    def requeue_stale(
+        self, stale_after: float, max_attempts: int
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """
+        Put running jobs whose heartbeat is older than ``stale_after`` seconds
+        back in the queue, ahead of newer work. Jobs that already ran
+        ``max_attempts`` times are dropped instead. Returns the (flow,
+        session_id) pairs (requeued, dropped).
+        """
+        with self._write() as conn:
+            stale = conn.execute(
+                "SELECT id, flow, session_id, attempts FROM jobs "
+                "WHERE state = 'running' AND heartbeat_at < ?",
+                (time.time() - stale_after,),
+            ).fetchall()
+            requeued, dropped = [], []
+            for job_id, flow, session_id, attempts in stale:
+                if attempts >= max_attempts:
+                    conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                    dropped.append((flow, session_id))
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET state = 'queued', worker = NULL "
+                        "WHERE id = ?",
+                        (job_id,),
+                    )
+                    requeued.append((flow, session_id))
+        return requeued, dropped
+
+    def cancel(self, session_id: str) -> bool:
+        """Drop a session's job, queued or running; False if it had none."""
+        with self._write() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE session_id = ?", (session_id,)
+            )
+        return cursor.rowcount > 0
+
+    def running(self, worker: str) -> Set[str]:
+        """Sessions whose jobs ``worker`` is still recorded as running."""
+        rows = self._conn().execute(
+            "SELECT session_id FROM jobs WHERE worker = ? AND state = 'running'",
+            (worker,),
+        )
+        return {row[0] for row in rows}
+
+    def counts(self) -> Dict[Tuple[str, str], int]:
+        """{(flow, state): number of jobs}, state being queued or running."""
+        rows = self._conn().execute(
+            "SELECT flow, state, COUNT(*) FROM jobs GROUP BY flow, state"
+        )
+        return {(flow, state): count for flow, state, count in rows}
+
+    def take_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """
+        Take or renew lease ``name`` for ``ttl`` seconds; False while another
+        holder's lease on it is unexpired.
+        """
+        now = time.time()
+        with self._write() as conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET "
+                "holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+                (name, holder, now + ttl, now),
+            )
+        return cursor.rowcount > 0
+
+    def session_ids(self) -> Set[str]:
+        """Every session with a queued or running job."""
+        return {row[0] for row in self._conn().execute("SELECT session_id FROM jobs")}
+
+    def save_checkpoint(self, session_id: str, checkpoint: Any) -> None:
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE jobs SET checkpoint = ? WHERE session_id = ?",
+                (json.dumps(checkpoint), session_id),
+            )
+
+    def load_checkpoint(self, session_id: str) -> Any:
+        row = (
+            self._conn()
+            .execute("SELECT checkpoint FROM jobs WHERE session_id = ?", (session_id,))
+            .fetchone()
+        )
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def finish(self, session_id: str, flow: str, elapsed: float) -> None:
+        """Drop a finished job and fold its run time into the flow's average."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM jobs WHERE session_id = ?", (session_id,))
+            conn.execute(
+                "INSERT INTO flow_stats (flow, avg_seconds) VALUES (?, ?) "
+                "ON CONFLICT (flow) DO UPDATE "
+                "SET avg_seconds = 0.8 * avg_seconds + 0.2 * excluded.avg_seconds",
+                (flow, elapsed),
+            )
+
+    def position(self, flow: str, session_id: str) -> Dict[str, int]:
+        """{"queue_position", "queue_depth"} for a queued job, else {}."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE session_id = ? AND state = 'queued'",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return {}
+        ahead, depth = conn.execute(
+            "SELECT SUM(id <= ?), COUNT(*) FROM jobs "
+            "WHERE flow = ? AND state = 'queued'",
+            (row[0], flow),
+        ).fetchone()
+        return {"queue_position": ahead, "queue_depth": depth}
+
+    def avg_seconds(self, flow: str) -> Optional[float]:
+        row = (
+            self._conn()
+            .execute("SELECT avg_seconds FROM flow_stats WHERE flow = ?", (flow,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+
+def flow_ranks(config: Dict[str, Any]) -> Dict[str, int]:
+    """API flow name → rank of its priority class (0 is served first)."""
+    classes = config["priority_classes"]
+    return {
+        flow: classes[spec["priority"]]["rank"]
+        for flow, spec in config["flows"].items()
+    }
+
+
+def flow_caps(config: Dict[str, Any]) -> Dict[str, int]:
+    """API flow name → max_running, for the flows that set one."""
+    return {
+        flow: spec["max_running"]
+        for flow, spec in config["flows"].items()
+        if spec.get("max_running") is not None
+    }
+
+
+class _RunningJob:
+    """A job on its run thread; ``settled`` once it returns or is cancelled."""
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self.settled = threading.Event()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self.settled.set()
+
+
+class WorkerPool:
+    """
+    ``workers`` threads that claim and run jobs of any flow. A thread only
+    considers flows whose class may start while ``busy`` threads are taken:
+    rank r needs busy < workers - reserved_workers of the classes ranked
+    above it, so the last threads always go to the best-ranked classes.
+
+    Each job runs on a thread of its own while the worker thread waits, so
+    a cancelled job's worker can move on without waiting for the run to
+    unwind.
+    """
+
+    def __init__(self, store: JobStore, handler: Handler, config: Dict[str, Any]):
+        self.store = store
+        self.handler = handler
+        self.workers: int = config["workers"]
+        self.poll_interval: float = config["poll_interval_seconds"]
+        self.heartbeat_interval: float = config["heartbeat_seconds"]
+        self.ranks = flow_ranks(config)
+        self.caps = flow_caps(config)
+        classes = config["priority_classes"]
+        # rank → busy threads at which that rank may no longer start a job;
+        # at least one, so a small pool still runs every class
+        self.limits = {
+            rank: max(
+                1,
+                self.workers
+                - sum(
+                    c["reserved_workers"] for c in classes.values() if c["rank"] < rank
+                ),
+            )
+            for rank in set(self.ranks.values())
+        }
+        # unique per start: a restarted container reuses hostname and PID (1),
+        # and must not heartbeat the dead worker's jobs as its own
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._running: Dict[str, _RunningJob] = {}
+
+    def start(self) -> None:
+        metrics.WORKER_THREADS.labels("total").set(self.workers)
+        metrics.WORKER_THREADS.labels("busy").set_function(lambda: self._busy)
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"aice-job-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(
+            target=self._monitor, name="aice-job-monitor", daemon=True
+        ).start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop claiming jobs and wait up to ``timeout`` for running ones."""
+        self._stopping.set()
+        _wakeup.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            if deadline is None:
+                thread.join()
+            else:
+                thread.join(max(0.0, deadline - time.monotonic()))
+
+    def cancel(self, session_id: str) -> bool:
+        """Abandon the session's job if this pool is running it."""
+        with self._lock:
+            job = self._running.get(session_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def _monitor(self) -> None:
+        # heartbeats, and cancels jobs whose rows are gone (cancelled from
+        # another process) or no longer ours (requeued by recovery); keeps
+        # going while stopping, until the last running job is done
+        last_beat = 0.0
+        while any(thread.is_alive() for thread in self._threads):
+            try:
+                if time.monotonic() - last_beat >= self.heartbeat_interval:
+                    self.store.heartbeat(self.name)
+                    last_beat = time.monotonic()
+                with self._lock:
+                    local = list(self._running)
+                if local:
+                    recorded = self.store.running(self.name)
+                    for session_id in local:
+                        if session_id not in recorded and self.cancel(session_id):
+                            logger.info(f"Job for session {session_id} cancelled")
+            except sqlite3.Error:
+                logger.exception("Could not check on running jobs")
+            time.sleep(self.poll_interval)
+
+    def _claim(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        with self._lock:
+            ranks = {
+                flow: rank
+                for flow, rank in self.ranks.items()
+                if self._busy < self.limits[rank]
+            }
+            if not ranks:
+                return None
+            job = self.store.claim(ranks, self.caps, self.name)
+            if job is not None:
+                self._busy += 1
+                self._running[job[0]] = _RunningJob()
+            return job
+
+    def _run(self, session_id: str, flow: str, session_data: Dict[str, Any]) -> bool:
+        """Run the handler on its own thread; False if cancelled first."""
+        with self._lock:
+            job = self._running[session_id]
+
+        def target() -> None:
+            _current.job = job
+            try:
+                self.handler(session_id, session_data)
+            except Cancelled:
+                logger.info(f"Stopped cancelled {flow} session {session_id}")
+            except Exception:
+                logger.exception(f"Job for {flow} session {session_id} failed")
+            finally:
+                job.settled.set()
+
+        threading.Thread(
+            target=target, name=f"aice-run-{session_id}", daemon=True
+        ).start()
+        job.settled.wait()
+        return not job.cancelled
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                # a submit() or finished job in this process sets _wakeup;
+                # other processes' are polled
+                _wakeup.wait(self.poll_interval)
+                _wakeup.clear()
+                continue
+            session_id, flow, session_data = job
+            start = time.monotonic()
+            finished = self._run(session_id, flow, session_data)
+            # forget the job before finishing it, so _monitor never sees a
+            # finished job's missing row as a cancellation
+            with self._lock:
+                del self._running[session_id]
+                self._busy -= 1
+            if finished:
+                self.store.finish(session_id, flow, time.monotonic() - start)
+            _wakeup.set()
+
+
+_config: Optional[Dict[str, Any]] = None
+_store: Optional[JobStore] = None
+_pool: Optional[WorkerPool] = None
+_wakeup = threading.Event()
+# who holds a lease: this process, wherever in it take_lease() is called
+_LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}"
+# .job: the _RunningJob of the job running on this thread, if any
+_current = threading.local()
+_outbound = ThreadPoolExecutor(
+    max_workers=OUTBOUND_THREADS, thread_name_prefix="aice-outbound"
+)
+
+
+def _jobs() -> Tuple[JobStore, Dict[str, Any]]:
+    global _config, _store
+    if _store is None:
+        _config = load_jobs_config()
+        _store = JobStore(JOBS_DB)
+    return _store, _config
+
+
+def submit(
+    flow: str,
+    session_id: str,
+    session_data: Dict[str, Any],
+    user_id: Optional[str] = None,
+) -> int:
+    """
+    Queue a job and return its position; raise QueueFull at capacity.
+    ``user_id`` is what fair sharing balances running jobs across.
+    """
+    store, config = _jobs()
+    position = store.enqueue(
+        flow, session_id, session_data, config["max_queue_depth"], user_id
+    )
+    if position is None:
+        raise QueueFull(flow, retry_after(flow))
+    _wakeup.set()
+    return position
+
+
+def get_config() -> Dict[str, Any]:
+    _, config = _jobs()
+    return config
+
+
+def position(flow: str, session_id: str) -> Dict[str, int]:
+    store, _ = _jobs()
+    return store.position(flow, session_id)
+
+
+def counts() -> Dict[Tuple[str, str], int]:
+    """{(flow, state): number of jobs} in the shared queue."""
+    store, _ = _jobs()
+    return store.counts()
+
+
+def retry_after(flow: str) -> int:
+    """Seconds until a slot is likely to free up for ``flow``."""
+    store, config = _jobs()
+    avg = store.avg_seconds(flow)
+    if avg is None:
+        return config["retry_after_seconds"]
+    slots = flow_caps(config).get(flow, config["workers"])
+    return max(1, math.ceil(avg / max(1, slots)))
+
+
+def start_workers(handler: Handler) -> WorkerPool:
+    """Start this process's worker pool on the shared queue."""
+    global _pool
+    store, config = _jobs()
+    _pool = WorkerPool(store, handler, config)
+    _pool.start()
+    return _pool
+
+
+def cancel(session_id: str) -> bool:
+    """
+    Cancel a session's job: a queued one never runs, a running one frees its
+    worker thread now and stops at its next cancellation check. False if the
+    session had no job.
+    """
+    store, _ = _jobs()
+    found = store.cancel(session_id)
+    if _pool is not None:
+        _pool.cancel(session_id)
+    return found
+
+
+def check_cancelled() -> None:
+    """Raise Cancelled if the job running on this thread was cancelled."""
+    job = getattr(_current, "job", None)
+    if job is not None and job.cancelled:
+        raise Cancelled()
+
+
+def interruptible(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Make a blocking outbound call (HTTP request, LLM call) that cancelling
+    the current job aborts: it runs on an outbound thread and Cancelled is
+    raised as soon as the job is cancelled, leaving the call to finish
+    unobserved. Outside a job this is a plain call.
+    """
+    job = getattr(_current, "job", None)
+    if job is None:
+        return fn(*args, **kwargs)
+    check_cancelled()
+    future = _outbound.submit(fn, *args, **kwargs)
+    while True:
+        try:
+            return future.result(timeout=CANCEL_CHECK_SECONDS)
+        except FutureTimeout:
+            if job.cancelled:
+                future.cancel()
+                raise Cancelled()
+
+
+def requeue_stale() -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Requeue or drop jobs of dead workers; see JobStore.requeue_stale."""
+    store, config = _jobs()
+    return store.requeue_stale(config["stale_after_seconds"], config["max_attempts"])
+
+
+def session_ids() -> Set[str]:
+    store, _ = _jobs()
+    return store.session_ids()
+
+
+def take_lease(name: str, ttl: float) -> bool:
+    """
+    True if this process holds (now or again) the host-wide lease ``name``
+    for the next ``ttl`` seconds; renew it before then to keep it.
+    """
+    store, _ = _jobs()
+    return store.take_lease(name, _LEASE_HOLDER, ttl)
+
+
+def save_checkpoint(session_id: str, checkpoint: Any) -> None:
+    """Keep work done for a job so a rerun after a crash can reuse it."""
+    store, _ = _jobs()
+    store.save_checkpoint(session_id, checkpoint)
+
+
+def load_checkpoint(session_id: str) -> Any:
+    """The job's last saved checkpoint, or None."""
+    store, _ = _jobs()
+    return store.load_checkpoint(session_id)
@@ -0,0 +1,174 @@
+"""
+Prometheus metrics for sessions, crews, the job queue, outbound calls and the
+datastore.
+
+Events are recorded in process as they happen, which costs a lock and an
+addition each; nothing is formatted until something scrapes. Counts that
+live in storage (sessions by status, queued and running jobs) are read only
+at scrape time, by StorageCollector.
+
+The API serves GET /metrics. Jobs run in worker processes when
+AICE_WORKERS=external, so each ``python worker.py`` serves its own job,
+crew and outbound metrics on --metrics-port.
+"""
+
+import contextlib
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+# seconds; crews run for minutes, single calls for milliseconds to a minute
+SESSION_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+CALL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+SESSION_SECONDS = Histogram(
+    "aice_session_seconds",
+    "Time from session creation until its run ended, by final status",
+    ["flow", "status"],
+    buckets=SESSION_BUCKETS,
+)
+SESSION_RUN_SECONDS = Histogram(
+    "aice_session_run_seconds",
+    "Time a worker spent running a session, by final status",
+    ["flow", "status"],
+    buckets=SESSION_BUCKETS,
+)
+TASK_SECONDS = Histogram(
+    "aice_task_seconds",
+    "Crew task duration, by the agent that ran it",
+    ["agent"],
+    buckets=SESSION_BUCKETS,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "aice_queue_wait_seconds",
+    "Time a job waited in the queue before a worker claimed it",
+    ["flow"],
+    buckets=SESSION_BUCKETS,
+)
+WORKER_THREADS = Gauge(
+    "aice_worker_threads", "Worker threads in this process", ["state"]
+)
+OUTBOUND_REQUESTS = Counter(
+    "aice_outbound_requests_total",
+    "Outbound calls made by tools and helpers, by dependency (llm, serper, "
+    "scrape, reddit) and outcome",
+    ["dependency", "outcome"],
+)
+OUTBOUND_SECONDS = Histogram(
+    "aice_outbound_seconds",
+    "Outbound call latency by dependency",
+    ["dependency"],
+    buckets=CALL_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "aice_llm_tokens_total",
+    "LLM tokens used, by flow and kind (prompt or completion)",
+    ["flow", "kind"],
+)
+CREW_LLM_REQUESTS = Counter(
+    "aice_crew_llm_requests_total",
+    "LLM requests made by crews, as crewai reports them once a crew finishes",
+    ["flow"],
+)
+DB_SECONDS = Histogram(
+    "aice_db_seconds",
+    "Datastore call latency by StorageBackend method",
+    ["method"],
+    buckets=DB_BUCKETS,
+)
+
+
+@contextlib.contextmanager
+def outbound(dependency: str) -> Iterator[None]:
+    """
+    Time and count one outbound call. An exception marks it an error, except
+    a job cancellation (a BaseException), which is counted as cancelled.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except Exception:
+        raise
+    except BaseException:
+        outcome = "cancelled"
+        raise
+    finally:
+        OUTBOUND_REQUESTS.labels(dependency, outcome).inc()
+        if outcome != "cancelled":
+            OUTBOUND_SECONDS.labels(dependency).observe(time.perf_counter() - start)
+
+
+def _usage_dict(usage: Any) -> Dict[str, Any]:
+    if usage is None or isinstance(usage, dict):
+        return usage or {}
+    if hasattr(usage, "model_dump"):
+        return usage.model_dump()
+    return vars(usage)
+
+
+def record_crew_usage(flow: str, crew: Any, result: Any = None) -> None:
+    """
+    Count a finished crew's LLM tokens and requests. crewai makes these calls
+    itself, so they are not timed, and not part of the outbound metrics.
+    """
+    usage = _usage_dict(
+        getattr(result, "token_usage", None) or getattr(crew, "usage_metrics", None)
+    )
+    LLM_TOKENS.labels(flow, "prompt").inc(usage.get("prompt_tokens") or 0)
+    LLM_TOKENS.labels(flow, "completion").inc(usage.get("completion_tokens") or 0)
+    CREW_LLM_REQUESTS.labels(flow).inc(usage.get("successful_requests") or 0)
+
+
+def record_message_usage(flow: str, message: Any) -> None:
+    """Count the tokens of one LangChain chat model response."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    LLM_TOKENS.labels(flow, "prompt").inc(usage.get("input_tokens") or 0)
+    LLM_TOKENS.labels(flow, "completion").inc(usage.get("output_tokens") or 0)
+
+
+class StorageCollector:
+    """
+    aice_sessions{flow, status} and aice_jobs{flow, state}, counted from
+    storage on every scrape. Register it in one process only (the API), or
+    the counts are reported twice.
+    """
+
+    def __init__(
+        self,
+        count_sessions: Callable[[], Dict[Tuple[str, str], int]],
+        count_jobs: Callable[[], Dict[Tuple[str, str], int]],
+    ):
+        self.count_sessions = count_sessions
+        self.count_jobs = count_jobs
+
+    def _families(self) -> Tuple[GaugeMetricFamily, GaugeMetricFamily]:
+        return (
+            GaugeMetricFamily(
+                "aice_sessions",
+                "Sessions by flow and status",
+                labels=["flow", "status"],
+            ),
+            GaugeMetricFamily(
+                "aice_jobs",
+                "Queued and running jobs by flow; running ones occupy a worker",
+                labels=["flow", "state"],
+            ),
+        )
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # lets the registry skip a storage read when the collector registers
+        return iter(self._families())
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        sessions, jobs = self._families()
+        for (flow, status), count in sorted(self.count_sessions().items()):
+            sessions.add_metric([flow, status], count)
+        for (flow, state), count in sorted(self.count_jobs().items()):
+            jobs.add_metric([flow, state], count)
+        yield sessions
+        yield jobs
@@ -0,0 +1,139 @@
+"""
+Crash recovery for sessions stuck in pending or in_progress.
+
+A restart can strand sessions two ways:
+  - their job was running in a worker that died. Running jobs are stamped
+    with a heartbeat, so a stale one is requeued (the session goes back to
+    pending) until it has used up max_attempts, then the session fails;
+  - they have no job at all, e.g. they were started before the job queue
+    or the queue file was lost. They are marked failed.
+A stale job whose session already finished (the worker died between saving
+the results and dropping the job) is dropped rather than run again. A rerun
+reuses the crew output of an earlier attempt that completed its crew, so a
+crash while saving the results does not pay for the crew again; one that
+died mid-crew reruns it from the start (see generate_run._run_crew).
+
+Workers (and the API with inline workers) run recover() at startup and
+keep repeating both passes while running; the orphan pass reads every
+active session, so only the process holding the "orphan-sweep" lease in the
+job queue's file repeats it. To run a pass by hand:
+
+    cd main/src
+    python recovery.py
+"""
+
+import datetime
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import db
+import events
+import jobs
+
+logger = logging.getLogger(__name__)
+
+ORPHAN_SWEEP_LEASE = "orphan-sweep"
+
+INTERRUPTED_ERROR = "Interrupted by a server restart, please submit it again"
+GAVE_UP_ERROR = "Interrupted by server restarts too many times, please submit it again"
+
+
+def _set_status(
+    flow: str, session_id: str, status: str, error: Optional[str] = None
+) -> bool:
+    """Set and announce a status; False if the session is gone or finished."""
+    try:
+        db.set_session_status(db.FLOWS[flow][0], session_id, status, error=error)
+    except (KeyError, db.SessionClosed):
+        # deleted, cancelled or completed in the meantime; nothing to recover
+        return False
+    if error is None:
+        events.publish(session_id, status)
+    else:
+        events.publish(session_id, status, error=error)
+    return True
+
+
+def requeue_stale() -> Dict[str, int]:
+    """
+    Requeue jobs whose worker died; fail those out of attempts, and drop
+    those whose session already finished.
+    """
+    requeued, dropped = jobs.requeue_stale()
+    report = {"requeued": 0, "failed": len(dropped), "finished": 0}
+    for flow, session_id in requeued:
+        if _set_status(flow, session_id, "pending"):
+            logger.warning(f"Requeued {flow} session {session_id} from a dead worker")
+            report["requeued"] += 1
+        else:
+            # finished or deleted before its worker died; don't run it again
+            jobs.cancel(session_id)
+            logger.info(f"Dropped the stale job of finished session {session_id}")
+            report["finished"] += 1
+    for flow, session_id in dropped:
+        logger.warning(f"Gave up on {flow} session {session_id}")
+        _set_status(flow, session_id, "failed", error=GAVE_UP_ERROR)
+    return report
+
+
+def fail_orphans(now: Optional[datetime.datetime] = None) -> int:
+    """
+    Fail pending / in_progress sessions older than orphan_grace_seconds that
+    have no job; return how many.
+    """
+    now = now or datetime.datetime.utcnow()
+    grace = datetime.timedelta(seconds=jobs.get_config()["orphan_grace_seconds"])
+    cutoff = (now - grace).isoformat()
+    with_job = jobs.session_ids()
+    failed = 0
+    for flow, session_id, record in db.find_sessions(db.ACTIVE_STATUSES):
+        if session_id in with_job or (record.get("created_at") or "") > cutoff:
+            continue
+        if _set_status(flow, session_id, "failed", error=INTERRUPTED_ERROR):
+            logger.warning(f"Failed orphaned {flow} session {session_id}")
+            failed += 1
+    return failed
+
+
+def recover(now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+    """Requeue stale jobs and fail orphaned sessions; report the counts."""
+    report = requeue_stale()
+    report["orphans_failed"] = fail_orphans(now)
+    return report
+
+
+def start_monitor() -> threading.Thread:
+    """
+    Run requeue_stale() and, while this process holds the orphan-sweep
+    lease, fail_orphans() periodically in a daemon thread, so sessions
+    stranded while running (not only by a restart) end too.
+    """
+    interval = jobs.get_config()["stale_after_seconds"] / 2
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                requeue_stale()
+                # renewed every pass; lapses to another process if this dies
+                if jobs.take_lease(ORPHAN_SWEEP_LEASE, interval * 2):
+                    fail_orphans()
+            except Exception:
+                logger.exception("Stale job check failed")
+
+    thread = threading.Thread(target=loop, name="aice-recovery", daemon=True)
+    thread.start()
+    return thread
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    db.init_db()
+    print(json.dumps(recover(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Retention and garbage collection for sessions and their artifacts.
+
+Deletes sessions that are past their age limit for their status, or beyond a
+user's session quota, together with their results, their report directory
+(data/report/{session_id}) and crew logs (data/logs/{session_id}). Also
+removes blobs that no session refers to anymore, and optionally artifact
+directories that none does (orphan_artifact_age_days).
+
+The policy lives under "retention" in config/config.json. The API runs the
+sweep in a background thread; to run it by hand:
+
+    cd main/src
+    python retention.py [--dry-run]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import db
+import jobs
+from config.report_paths import LOG_DIR, REPORT_DIR
+from utils import load_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {
+    # status → days after creation when the session expires; statuses not
+    # listed (e.g. pending, in_progress) never expire by age
+    "max_age_days": {"completed": 90, "failed": 14, "cancelled": 14},
+    # keep at most this many finished sessions per user (None = no cap)
+    "max_sessions_per_user": None,
+    # artifact directories with no matching session in the user index are
+    # removed after this many days (None = never, the default: a session
+    # missing from the index would lose its reports)
+    "orphan_artifact_age_days": None,
+    "sweep_interval_seconds": 3600,
+    "batch_size": 200,
+}
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+RETENTION_SWEEP_LEASE = "retention-sweep"
+
+
+def load_policy() -> Dict[str, Any]:
+    """Return DEFAULT_POLICY overlaid with the "retention" config section."""
+    policy = dict(DEFAULT_POLICY)
+    policy.update(load_config().get("retention", {}))
+    return policy
+
+
+def _artifact_dirs(session_id: str) -> List[str]:
+    return [
+        REPORT_DIR.format(session_id=session_id),
+        LOG_DIR.format(session_id=session_id),
+    ]
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _reclaim_dir(path: str, report: Dict[str, int], dry_run: bool) -> None:
+    """Remove ``path`` if it exists and account for it in ``report``."""
+    if not os.path.isdir(path):
+        return
+    report["artifact_dirs_deleted"] += 1
+    report["bytes_reclaimed"] += _dir_size(path)
+    if not dry_run:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _expired_sessions(
+    policy: Dict[str, Any], now: datetime.datetime
+) -> Tuple[List[Tuple[str, str]], Set[str]]:
+    """Return the (flow, session_id) pairs to delete, and every known session id."""
+    indexed = []  # (user_id, created_at, session_id, flow)
+    for user_id, sessions in db.iter_user_sessions():
+        for session_id, entry in sessions.items():
+            created_at = entry.get("created_at") or ""
+            indexed.append((user_id, created_at, session_id, entry["flow"]))
+    records = db.get_sessions([(flow, sid) for _, _, sid, flow in indexed])
+
+    cutoffs = {
+        status: (now - datetime.timedelta(days=days)).isoformat()
+        for status, days in policy["max_age_days"].items()
+    }
+    quota = policy.get("max_sessions_per_user")
+    kept_per_user: Dict[str, int] = {}
+
+    expired = []
+    # newest first so the quota keeps each user's most recent sessions
+    for user_id, created_at, session_id, flow in sorted(indexed, reverse=True):
+        record = records.get((flow, session_id))
+        if record is None:
+            continue
+        status = record.get("status")
+        if status in cutoffs and created_at < cutoffs[status]:
+            expired.append((flow, session_id))
+        elif quota is not None and status in FINISHED_STATUSES:
+            kept_per_user[user_id] = kept_per_user.get(user_id, 0) + 1
+            if kept_per_user[user_id] > quota:
+                expired.append((flow, session_id))
+    return expired, {session_id for _, _, session_id, _ in indexed}
+
+
+def _orphan_dirs(known: Set[str], min_age: float) -> List[str]:
+    cutoff = time.time() - min_age
+    orphans = []
+    for template in (REPORT_DIR, LOG_DIR):
+        parent = os.path.dirname(template)
+        if not os.path.isdir(parent):
+            continue
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if name not in known and os.path.getmtime(path) < cutoff:
+                orphans.append(path)
+    return orphans
+
+
+def sweep(
+    policy: Optional[Dict[str, Any]] = None,
+    dry_run: bool = False,
+    now: Optional[datetime.datetime] = None,
+) -> Dict[str, int]:
+    """Apply the retention policy once and report what was (or would be) freed."""
+    policy = policy or load_policy()
+    now = now or datetime.datetime.utcnow()
+    report = {
+        "sessions_deleted": 0,
+        "artifact_dirs_deleted": 0,
+        "blobs_deleted": 0,
+        "bytes_reclaimed": 0,
+    }
+
+    expired, known = _expired_sessions(policy, now)
+    batch_size = policy["batch_size"]
+    for i in range(0, len(expired), batch_size):
+        batch = expired[i : i + batch_size]
+        # records first: a crash before the directories go leaves orphans,
+        # which the next sweep collects
+        if dry_run:
+            report["sessions_deleted"] += len(batch)
+        else:
+            report["sessions_deleted"] += db.delete_sessions(batch)
+        for _, session_id in batch:
+            for path in _artifact_dirs(session_id):
+                _reclaim_dir(path, report, dry_run)
+
+    if policy["orphan_artifact_age_days"] is not None:
+        orphan_age = policy["orphan_artifact_age_days"] * 86400
+        for path in _orphan_dirs(known, orphan_age):
+            _reclaim_dir(path, report, dry_run)
+
+    if not dry_run:
+        blobs, freed = db.sweep_blobs()
+        report["blobs_deleted"] += blobs
+        report["bytes_reclaimed"] += freed
+    return report
+
+
+def start_sweeper(
+    policy: Optional[Dict[str, Any]] = None,
+) -> Optional[threading.Thread]:
+    """
+    Run sweep() periodically in a daemon thread while this process holds the
+    retention-sweep lease, so only one API process sweeps; no-op if the
+    interval is 0.
+    """
+    policy = policy or load_policy()
+    interval = policy.get("sweep_interval_seconds")
+    if not interval:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                # renewed every pass; lapses to another process if this dies
+                if jobs.take_lease(RETENTION_SWEEP_LEASE, interval * 2):
+                    logger.info(f"Retention sweep: {sweep(policy)}")
+            except Exception:
+                logger.exception("Retention sweep failed")
+
+    thread = threading.Thread(target=loop, name="aice-retention", daemon=True)
+    thread.start()
+    return thread
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply the AICE retention policy.")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="report without deleting anything"
+    )
+    args = parser.parse_args()
+    print(json.dumps(sweep(dry_run=args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
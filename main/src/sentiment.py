@@ -0,0 +1,120 @@
+"""
+Sentiment analysis as a session flow, with a shared result cache.
+
+POST /sessions/sentiment looks the reviews up first: reviews analysed
+before (compared after normalize_review()) complete the new session at once
+from the cache. Otherwise a job runs summarize() on a worker, which caches
+its result. Reddit searches are cached on their own by query, so different
+reviews that lead to the same search skip the Reddit round-trip.
+
+The cache is a table in the job queue's SQLite file (data/jobs.sqlite3, or
+AICE_JOBS_DB), shared by the API and the workers on the host. Lifetimes
+live under "sentiment" in config/config.json.
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import jobs
+from utils import load_config
+from utils.sentiment_utils import search_reddit, sentiment_reddit_summary
+
+DEFAULT_CONFIG = {
+    # how long a summary is served for the same reviews
+    "result_ttl_seconds": 86400,
+    # how long Reddit search hits are reused for the same query
+    "search_ttl_seconds": 3600,
+}
+
+
+def load_sentiment_config() -> Dict[str, Any]:
+    """Return DEFAULT_CONFIG overlaid with the "sentiment" config section."""
+    config = dict(DEFAULT_CONFIG)
+    config.update(load_config().get("sentiment", {}))
+    return config
+
+
+def normalize_review(text: str) -> str:
+    """Lower-cased words only: case, punctuation and spacing don't matter."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def _key(kind: str, parts: List[str]) -> str:
+    canonical = json.dumps([normalize_review(p) for p in parts])
+    return f"{kind}:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SentimentCache(jobs.SQLiteFile):
+    """``sentiment_cache`` rows: key → JSON value, until expires_at."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Any:
+        """The cached value, or None if missing or expired."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT value FROM sentiment_cache WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        with self._write() as conn:
+            conn.execute("DELETE FROM sentiment_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO sentiment_cache (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl),
+            )
+
+
+_config: Optional[Dict[str, Any]] = None
+_cache: Optional[SentimentCache] = None
+
+
+def _sentiment() -> Tuple[SentimentCache, Dict[str, Any]]:
+    global _config, _cache
+    if _cache is None:
+        _config = load_sentiment_config()
+        _cache = SentimentCache(jobs.JOBS_DB)
+    return _cache, _config
+
+
+def cached_result(reviews: List[str]) -> Optional[Dict[str, Any]]:
+    """The cached {"reddit_posts", "summary"} for these reviews, or None."""
+    cache, _ = _sentiment()
+    return cache.get(_key("result", reviews))
+
+
+async def _cached_search(query: str) -> List[Dict[str, str]]:
+    cache, config = _sentiment()
+    key = _key("search", [query])
+    posts = await asyncio.to_thread(cache.get, key)
+    if posts is None:
+        posts = await search_reddit(query)
+        await asyncio.to_thread(cache.put, key, posts, config["search_ttl_seconds"])
+    return posts
+
+
+async def summarize(reviews: List[str]) -> Dict[str, Any]:
+    """sentiment_reddit_summary, served from and saved to the cache."""
+    cache, config = _sentiment()
+    key = _key("result", reviews)
+    result = await asyncio.to_thread(cache.get, key)
+    if result is None:
+        result = await sentiment_reddit_summary(reviews, search=_cached_search)
+        await asyncio.to_thread(cache.put, key, result, config["result_ttl_seconds"])
+    return result
@@ -2,9 +2,11 @@ import os
 import re
 from typing import Dict, List
 
+import metrics
 from crewai.tools import BaseTool, tool
 from crewai_tools import FileReadTool, ScrapeWebsiteTool, SerperDevTool
 from dotenv import load_dotenv
+from jobs import interruptible
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_openai import AzureChatOpenAI
 from pydantic import Field
@@ -16,6 +18,12 @@ load_dotenv()
 search = GoogleSerperAPIWrapper(serper_api_key=os.getenv("SERPER_API_KEY"))
 
 
+def _call(dependency: str, fn, *args, **kwargs):
+    """interruptible(fn, ...), counted and timed as a call to ``dependency``."""
+    with metrics.outbound(dependency):
+        return interruptible(fn, *args, **kwargs)
+
+
 class SearchTool(BaseTool):
     name: str = "Search"
     description: str = (
@@ -26,7 +34,7 @@ class SearchTool(BaseTool):
     def _run(self, query: str) -> str:
         """Execute the search query and return results"""
         try:
-            return self.search.run(query)
+            return _call("serper", self.search.run, query)
         except Exception as e:
             return f"Error performing search: {str(e)}"
 
@@ -61,14 +69,15 @@ class UniversitySearchTool(BaseTool):
 
     def _scrape_site(self, url: str) -> str:
         try:
-            return ScrapeWebsiteTool(website_url=url).run()
+            return _call("scrape", ScrapeWebsiteTool(website_url=url).run)
         except Exception as e:
             return f"Error scraping website: {str(e)}"
 
     def _search_url(self, query: str) -> str:
         # Extract the top URL from a search query
         try:
-            url = extract_main_links(search_uni.run(search_query=query))[0]
+            results = _call("serper", search_uni.run, search_query=query)
+            url = extract_main_links(results)[0]
             return url
         except Exception:
             return ""
@@ -85,18 +94,20 @@ class UniversitySearchTool(BaseTool):
 
         result = {}
         for criterion in criteria:
-            query = construct_search_query(university, criterion)
+            query = _call("llm", construct_search_query, university, criterion)
             if self._is_course_related(criterion):
                 url = self._search_url(query)
                 if url:
                     content = self._scrape_site(url)
-                    result[criterion] = extract_essential_info(content, query)
+                    result[criterion] = _call(
+                        "llm", extract_essential_info, content, query
+                    )
                 else:
                     result[criterion] = "No relevant URL found for scraping."
 
             else:
                 try:
-                    content = self.search.run(query)
+                    content = _call("serper", self.search.run, query)
                     result[criterion] = content
                 except Exception as e:
                     result[criterion] = f"Error performing search: {str(e)}"
@@ -155,11 +166,11 @@ def fetch_university_admission_info(
     try:
         result = "No results found"
         search_query = f"{field} for {level} {course} at {university_name}"
-        response = search_uni.run(search_query=search_query)
+        response = _call("serper", search_uni.run, search_query=search_query)
         urls = extract_main_links(response)
         url = urls[0]
         if url:
-            content = ScrapeWebsiteTool(website_url=url).run()
+            content = _call("scrape", ScrapeWebsiteTool(website_url=url).run)
             result = f"url: {url}\n" + content
 
     except Exception as e:
@@ -203,22 +214,24 @@ def fetch_university_fees(
         )
         miscellaneous_expenses_query = f"{university} miscellaneous expenses"
 
-        tf_url = extract_main_links(search_uni.run(search_query=tuition_fee_query))[0]
+        tf_url = extract_main_links(
+            _call("serper", search_uni.run, search_query=tuition_fee_query)
+        )[0]
         me_url = extract_main_links(
-            search_uni.run(search_query=miscellaneous_expenses_query)
+            _call("serper", search_uni.run, search_query=miscellaneous_expenses_query)
         )[0]
 
         if tf_url:
             result["tuition_fees"]["url"] = tf_url
-            result["tuition_fees"]["content"] = ScrapeWebsiteTool(
-                website_url=tf_url
-            ).run()
+            result["tuition_fees"]["content"] = _call(
+                "scrape", ScrapeWebsiteTool(website_url=tf_url).run
+            )
 
         if me_url:
             result["miscellaneous_expenses"]["url"] = me_url
-            result["miscellaneous_expenses"]["content"] = ScrapeWebsiteTool(
-                website_url=me_url
-            ).run()
+            result["miscellaneous_expenses"]["content"] = _call(
+                "scrape", ScrapeWebsiteTool(website_url=me_url).run
+            )
 
         return result["miscellaneous_expenses"]
 
@@ -263,23 +276,23 @@ def fetch_university_deadlines(university: str, origin: str, level: str) -> dict
         )
 
         ud_url = extract_main_links(
-            search_uni.run(search_query=university_deadlines_query)
+            _call("serper", search_uni.run, search_query=university_deadlines_query)
         )[0]
         sd_url = extract_main_links(
-            search_uni.run(search_query=scholarships_deadlines_query)
+            _call("serper", search_uni.run, search_query=scholarships_deadlines_query)
         )[0]
 
         if ud_url:
             result["University deadlines"]["url"] = ud_url
-            result["University deadlines"]["content"] = ScrapeWebsiteTool(
-                website_url=ud_url
-            ).run()
+            result["University deadlines"]["content"] = _call(
+                "scrape", ScrapeWebsiteTool(website_url=ud_url).run
+            )
 
         if ud_url:
             result["Scholarship deadlines"]["url"] = ud_url
-            result["Scholarship deadlines"]["content"] = ScrapeWebsiteTool(
-                website_url=sd_url
-            ).run()
+            result["Scholarship deadlines"]["content"] = _call(
+                "scrape", ScrapeWebsiteTool(website_url=sd_url).run
+            )
 
         return result
 
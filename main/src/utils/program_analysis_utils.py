@@ -1,6 +1,7 @@
 import os
 
 import httpx
+import metrics
 import nltk
 from crewai import LLM
 from dotenv import load_dotenv
@@ -56,6 +57,7 @@ def construct_search_query(university: str, criterion: str) -> str:
     """
 
     response = llm.invoke([HumanMessage(content=prompt)])
+    metrics.record_message_usage("program-analysis", response)
     return response.content.strip()
 
 
@@ -88,4 +90,5 @@ def extract_essential_info(text: str, criteria: str) -> str:
     """
 
     response = llm.invoke([HumanMessage(content=prompt)])
+    metrics.record_message_usage("program-analysis", response)
     return response.content.strip()
@@ -1,7 +1,9 @@
 import ast
 import os
+from typing import Awaitable, Callable
 
 import httpx
+import metrics
 import nltk
 from crewai import LLM
 from dotenv import load_dotenv
@@ -34,10 +36,49 @@ def get_llm_instance() -> AzureChatOpenAI | ChatOpenAI:
         )
 
 
-def sentiment_reddit_summary(reviews: list[str]) -> dict:
+async def search_reddit(query: str) -> list[dict]:
+    """Reddit search hits for query, as [{"title": ..., "url": ...}]."""
+    headers = {"User-Agent": "AICE-App/1.0"}
+    with metrics.outbound("reddit"):
+        try:
+            async with httpx.AsyncClient(headers=headers, timeout=10.0) as client:
+                resp = await client.get(
+                    "https://www.reddit.com/search.json",
+                    params={"q": query, "limit": 25},
+                )
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Reddit search error: {e}")
+
+        if resp.status_code != 200:
+            raise HTTPException(status_code=502, detail="Reddit search failed")
+
+    children = resp.json().get("data", {}).get("children", [])
+    return [
+        {
+            "title": item.get("data", {}).get("title", "")[:200],
+            "url": f"https://reddit.com{item.get('data', {}).get('permalink', '')}",
+        }
+        for item in children
+    ]
+
+
+async def _ask(llm: AzureChatOpenAI | ChatOpenAI, prompt: str):
+    with metrics.outbound("llm"):
+        response = await llm.ainvoke([HumanMessage(content=prompt)])
+    metrics.record_message_usage("sentiment", response)
+    return response
+
+
+async def sentiment_reddit_summary(
+    reviews: list[str],
+    search: Callable[[str], Awaitable[list[dict]]] = search_reddit,
+) -> dict:
     """
     Given a list of student reviews, fetch 5 related Reddit posts,
     then summarize overall sentiment in 3–4 sentences via an LLM.
+    Every LLM and Reddit call is awaited, so the event loop keeps serving
+    other requests meanwhile. ``search`` runs the Reddit query (a cached
+    search can be passed in).
     """
     if not reviews:
         raise HTTPException(status_code=400, detail="Must supply at least one review")
@@ -54,31 +95,11 @@ def sentiment_reddit_summary(reviews: list[str]) -> dict:
 
     Return only the search query. Do not include any extra text or punctuation.
     """
-    refined_query = llm.invoke([HumanMessage(content=query_prompt)]).content.strip()
+    response = await _ask(llm, query_prompt)
+    refined_query = response.content.strip()
 
     # Step 2: Fetch top 5 Reddit posts with the LLM-generated query
-    headers = {"User-Agent": "AICE-App/1.0"}
-    try:
-        resp = httpx.get(
-            "https://www.reddit.com/search.json",
-            params={"q": refined_query, "limit": 25},
-            headers=headers,
-            timeout=10.0,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Reddit search error: {e}")
-
-    if resp.status_code != 200:
-        raise HTTPException(status_code=502, detail="Reddit search failed")
-
-    children = resp.json().get("data", {}).get("children", [])
-    raw_posts = [
-        {
-            "title": item.get("data", {}).get("title", "")[:200],
-            "url": f"https://reddit.com{item.get('data', {}).get('permalink', '')}",
-        }
-        for item in children
-    ]
+    raw_posts = await search(refined_query)
 
     # Ask LLM to pick top 5 most relevant posts
     ranking_prompt = f"""
@@ -98,9 +119,8 @@ def sentiment_reddit_summary(reviews: list[str]) -> dict:
     Reddit posts:
     {chr(10).join(f"- {p['title']}" for p in raw_posts)}
     """
-    top_titles_response = llm.invoke(
-        [HumanMessage(content=ranking_prompt)]
-    ).content.strip()
+    response = await _ask(llm, ranking_prompt)
+    top_titles_response = response.content.strip()
     try:
         top_titles = ast.literal_eval(top_titles_response)
 
@@ -130,6 +150,7 @@ def sentiment_reddit_summary(reviews: list[str]) -> dict:
     and these Reddit discussions, touching on academic quality, campus life,
     student support, career opportunities, and overall satisfaction.
     """
-    summary = llm.invoke([HumanMessage(content=sentiment_prompt)]).content.strip()
+    response = await _ask(llm, sentiment_prompt)
+    summary = response.content.strip()
 
     return {"reddit_posts": posts, "summary": summary}
@@ -0,0 +1,68 @@
+"""
+aice-worker: runs queued crew jobs outside the API process.
+
+    cd main/src
+    python worker.py
+
+Any number of workers can run next to the API on one host; they share the
+job queue (data/jobs.sqlite3) and the datastore with it, and log session
+events in the queue's file for the API's event streams. Start the API with
+AICE_WORKERS=external so it only enqueues. On SIGTERM or Ctrl-C a worker
+stops claiming jobs and waits up to --grace seconds for running ones.
+
+Each worker serves its Prometheus metrics (crew, task, outbound call and
+worker thread metrics) at http://<host>:<--metrics-port>/metrics.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import threading
+
+import db
+import events
+import jobs
+import recovery
+from generate_run import run_session
+from prometheus_client import start_http_server
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run queued AICE crew jobs.")
+    parser.add_argument(
+        "--grace",
+        type=float,
+        default=300.0,
+        help="seconds to let running jobs finish on shutdown",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.getenv("AICE_WORKER_METRICS_PORT", "9101")),
+        help="port serving /metrics, one per worker on a host (0 disables it)",
+    )
+    args = parser.parse_args()
+
+    db.init_db()
+    events.share()
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    logger.info(f"Recovery: {recovery.recover()}")
+    recovery.start_monitor()
+    pool = jobs.start_workers(run_session)
+    logger.info(f"Worker {pool.name} started with {pool.workers} threads")
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    stop.wait()
+
+    logger.info(f"Worker {pool.name} stopping")
+    pool.stop(timeout=args.grace)
+
+
+if __name__ == "__main__":
+    main()